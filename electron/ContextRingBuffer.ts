@@ -0,0 +1,150 @@
+// ContextRingBuffer.ts
+// Fixed-capacity, timestamp-ordered ring buffer for the rolling conversation context
+// Window queries binary-search the start and return a view over the buffer instead of a copy
+
+export interface Timestamped {
+    timestamp: number;
+}
+
+/**
+ * Read-only window over a ContextRingBuffer. It shares the buffer's storage,
+ * so read it before the next push/evict (every caller formats it right away).
+ */
+export class ContextView<T extends Timestamped> implements Iterable<T> {
+    constructor(
+        private readonly slots: Array<T | undefined>,
+        private readonly start: number,     // Physical index of the first item
+        public readonly length: number,
+        public readonly firstSequence: number   // Sequence number of the first item (see ContextRingBuffer.revision)
+    ) { }
+
+    public at(index: number): T | undefined {
+        if (index < 0) index += this.length;
+        if (index < 0 || index >= this.length) return undefined;
+        return this.slots[(this.start + index) % this.slots.length];
+    }
+
+    public map<U>(fn: (item: T, index: number) => U): U[] {
+        const out = new Array<U>(this.length);
+        for (let i = 0; i < this.length; i++) out[i] = fn(this.at(i)!, i);
+        return out;
+    }
+
+    public toArray(): T[] {
+        return this.map(item => item);
+    }
+
+    public *[Symbol.iterator](): Iterator<T> {
+        for (let i = 0; i < this.length; i++) yield this.at(i)!;
+    }
+}
+
+export class ContextRingBuffer<T extends Timestamped> {
+    private slots: Array<T | undefined>;
+    private head = 0;       // Physical index of the oldest item
+    private size = 0;
+    // Items are numbered in order; the oldest kept item is number `dropped`.
+    // The numbering holds until `revision` changes (late insert or clear).
+    private dropped = 0;
+    private revisionCounter = 0;
+
+    constructor(public readonly capacity: number) {
+        this.slots = new Array<T | undefined>(capacity);
+    }
+
+    public get length(): number {
+        return this.size;
+    }
+
+    public get revision(): number {
+        return this.revisionCounter;
+    }
+
+    public at(index: number): T | undefined {
+        if (index < 0) index += this.size;
+        if (index < 0 || index >= this.size) return undefined;
+        return this.slots[this.physical(index)];
+    }
+
+    public last(): T | undefined {
+        return this.at(-1);
+    }
+
+    /**
+     * Add an item, dropping the oldest when full. Items normally arrive in
+     * timestamp order (O(1)); a late one is shifted into place.
+     */
+    public push(item: T): void {
+        if (this.size === this.capacity) {
+            // Full: a late item older than everything kept would be evicted straight away
+            if (item.timestamp < this.slots[this.head]!.timestamp) return;
+            this.dropOldest(1);
+        }
+
+        let index = this.size;
+        this.slots[this.physical(index)] = item;
+        this.size++;
+
+        if (index > 0 && this.at(index - 1)!.timestamp > item.timestamp) {
+            // Later items move up one place, so their sequence numbers change
+            this.revisionCounter++;
+            while (index > 0 && this.at(index - 1)!.timestamp > item.timestamp) {
+                this.slots[this.physical(index)] = this.slots[this.physical(index - 1)];
+                index--;
+            }
+            this.slots[this.physical(index)] = item;
+        }
+    }
+
+    /**
+     * Drop every item older than `cutoff` (binary search, then O(1) per dropped item)
+     */
+    public evictBefore(cutoff: number): number {
+        const count = this.lowerBound(cutoff);
+        this.dropOldest(count);
+        return count;
+    }
+
+    /**
+     * Items with timestamp >= `cutoff`, as a view (no copy)
+     */
+    public since(cutoff: number): ContextView<T> {
+        const offset = this.lowerBound(cutoff);
+        return new ContextView(this.slots, this.physical(offset), this.size - offset, this.dropped + offset);
+    }
+
+    public clear(): void {
+        this.slots = new Array<T | undefined>(this.capacity);
+        this.head = 0;
+        this.size = 0;
+        this.dropped = 0;
+        this.revisionCounter++;
+    }
+
+    private physical(index: number): number {
+        return (this.head + index) % this.capacity;
+    }
+
+    /**
+     * Logical index of the first item with timestamp >= `cutoff`
+     */
+    private lowerBound(cutoff: number): number {
+        let low = 0;
+        let high = this.size;
+        while (low < high) {
+            const mid = (low + high) >>> 1;
+            if (this.slots[this.physical(mid)]!.timestamp < cutoff) low = mid + 1;
+            else high = mid;
+        }
+        return low;
+    }
+
+    private dropOldest(count: number): void {
+        for (let i = 0; i < count; i++) {
+            this.slots[this.head] = undefined;      // Let the text be collected
+            this.head = (this.head + 1) % this.capacity;
+        }
+        this.size -= count;
+        this.dropped += count;
+    }
+}
@@ -0,0 +1,191 @@
+// EncodedImageCache.ts
+// Process-wide cache of base64-encoded screenshots, shared by UI previews and LLM uploads
+// Keyed by path + mtime + size, so an overwritten file is never served stale
+
+import fs from "fs";
+
+export interface EncodedImage {
+    data: string;       // base64
+    mimeType: string;
+}
+
+export interface EncodedImageCacheStats {
+    entries: number;
+    bytes: number;
+    maxBytes: number;
+    hits: number;
+    misses: number;
+    evictions: number;
+    diskReads: number;
+}
+
+interface CacheSlot {
+    value: EncodedImage;
+    bytes: number;
+    sharesOriginal: string | null;  // Key of the original slot whose base64 this variant reuses (counted once)
+}
+
+const ORIGINAL_VARIANT = "original";
+
+export class EncodedImageCache {
+    private slots = new Map<string, CacheSlot>();       // Map order = LRU order
+    private inFlight = new Map<string, Promise<EncodedImage>>();
+    private totalBytes = 0;
+    private readonly maxBytes: number;
+
+    private hits = 0;
+    private misses = 0;
+    private evictions = 0;
+    private diskReads = 0;
+
+    constructor(maxBytes: number = (Number(process.env.IMAGE_CACHE_MAX_MB) || 96) * 1024 * 1024) {
+        this.maxBytes = maxBytes;
+    }
+
+    /**
+     * The file's original bytes as base64 (used for UI data URLs)
+     */
+    public async getOriginal(filePath: string): Promise<EncodedImage> {
+        return this.getOrEncode(filePath, ORIGINAL_VARIANT, async (_raw, original) => original);
+    }
+
+    /**
+     * Return the cached encoding of `filePath` for `variant`, or produce it once.
+     * Concurrent callers for the same key share one encode. The file is read at most
+     * once: reading it for any variant caches the original too, and later variants
+     * are derived from that. `encode` gets the raw bytes and the original's base64;
+     * a variant that returns the latter unchanged shares it instead of a copy.
+     */
+    public async getOrEncode<T extends EncodedImage>(
+        filePath: string,
+        variant: string,
+        encode: (raw: Buffer, original: EncodedImage) => Promise<T>
+    ): Promise<T> {
+        const stats = await fs.promises.stat(filePath);
+        const key = this.buildKey(filePath, stats, variant);
+
+        const slot = this.slots.get(key);
+        if (slot) {
+            // A shared variant keeps its original just as fresh, so they are evicted together
+            if (slot.sharesOriginal) this.touch(slot.sharesOriginal);
+            this.touch(key);
+            this.hits++;
+            return slot.value as T;
+        }
+
+        const pending = this.inFlight.get(key);
+        if (pending) {
+            this.hits++;
+            return pending as Promise<T>;
+        }
+
+        this.misses++;
+        const work = (async () => {
+            const originalKey = this.buildKey(filePath, stats, ORIGINAL_VARIANT);
+            const { raw, original } = await this.readOriginal(filePath, originalKey);
+            const value = await encode(raw, original);
+            if (key !== originalKey) {
+                this.store(key, value, value.data === original.data ? originalKey : null);
+            }
+            return value;
+        })();
+
+        this.inFlight.set(key, work);
+        try {
+            return await work;
+        } finally {
+            this.inFlight.delete(key);
+        }
+    }
+
+    /**
+     * Drop every cached variant of a file (e.g. after deletion)
+     */
+    public invalidate(filePath: string): void {
+        const prefix = `${filePath}|`;
+        for (const key of [...this.slots.keys()]) {
+            if (key.startsWith(prefix)) this.remove(key);
+        }
+    }
+
+    public clear(): void {
+        this.slots.clear();
+        this.totalBytes = 0;
+    }
+
+    public getStats(): EncodedImageCacheStats {
+        return {
+            entries: this.slots.size,
+            bytes: this.totalBytes,
+            maxBytes: this.maxBytes,
+            hits: this.hits,
+            misses: this.misses,
+            evictions: this.evictions,
+            diskReads: this.diskReads,
+        };
+    }
+
+    private buildKey(filePath: string, stats: fs.Stats, variant: string): string {
+        return `${filePath}|${stats.mtimeMs}|${stats.size}|${variant}`;
+    }
+
+    /**
+     * The file's bytes and their base64, from the original slot when cached,
+     * otherwise from disk (caching the original for the next variant or preview)
+     */
+    private async readOriginal(filePath: string, originalKey: string): Promise<{ raw: Buffer; original: EncodedImage }> {
+        const slot = this.slots.get(originalKey);
+        if (slot) {
+            this.touch(originalKey);
+            return { raw: Buffer.from(slot.value.data, "base64"), original: slot.value };
+        }
+
+        this.diskReads++;
+        const raw = await fs.promises.readFile(filePath);
+        const original: EncodedImage = { data: raw.toString("base64"), mimeType: "image/png" };
+        this.store(originalKey, original, null);
+        return { raw, original };
+    }
+
+    private store(key: string, value: EncodedImage, sharesOriginal: string | null): void {
+        // A variant sharing the original's string costs nothing extra while the original is cached
+        const shared = sharesOriginal !== null && this.slots.has(sharesOriginal);
+        const bytes = shared ? 0 : value.data.length;
+        if (bytes > this.maxBytes) return;
+
+        if (this.slots.has(key)) this.remove(key);
+
+        this.slots.set(key, { value, bytes, sharesOriginal: shared ? sharesOriginal : null });
+        this.totalBytes += bytes;
+
+        while (this.totalBytes > this.maxBytes) {
+            this.remove(this.slots.keys().next().value as string);
+            this.evictions++;
+        }
+    }
+
+    /**
+     * Drop a slot; dropping an original also drops the variants sharing its string,
+     * which would otherwise keep it alive uncounted
+     */
+    private remove(key: string): void {
+        const slot = this.slots.get(key);
+        if (!slot) return;
+        this.slots.delete(key);
+        this.totalBytes -= slot.bytes;
+
+        for (const [otherKey, other] of [...this.slots]) {
+            if (other.sharesOriginal === key) this.slots.delete(otherKey);
+        }
+    }
+
+    private touch(key: string): void {
+        const slot = this.slots.get(key);
+        if (!slot) return;
+        this.slots.delete(key);
+        this.slots.set(key, slot);
+    }
+}
+
+// Shared by ScreenshotHelper (previews) and LLMHelper (uploads)
+export const encodedImageCache = new EncodedImageCache();
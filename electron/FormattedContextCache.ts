@@ -0,0 +1,101 @@
+// FormattedContextCache.ts
+// Rendered context string per window length, kept in step with the ContextRingBuffer
+// New turns are appended and evicted ones cut off the front, instead of re-joining the whole window per call
+
+import { ContextView, Timestamped } from "./ContextRingBuffer";
+
+export interface FormattedContextCacheStats {
+    windows: number;
+    hits: number;           // Window unchanged since the last render
+    appended: number;       // Lines appended to a cached rendering
+    trimmed: number;        // Lines cut from the front of a cached rendering
+    rebuilds: number;       // Full renders (first use, late insert, reset)
+}
+
+interface RenderedWindow {
+    revision: number;
+    start: number;          // Sequence number of the first rendered item
+    end: number;            // One past the last rendered item
+    text: string;
+    lineLengths: number[];  // Queue of rendered line lengths, read from `head`
+    head: number;
+}
+
+export class FormattedContextCache<T extends Timestamped> {
+    private windows = new Map<number, RenderedWindow>();
+
+    private hits = 0;
+    private appended = 0;
+    private trimmed = 0;
+    private rebuilds = 0;
+
+    constructor(private readonly formatLine: (item: T) => string) { }
+
+    /**
+     * Render `view` (one line per item, newline-joined), reusing what was
+     * rendered for the same `key` last time. `revision` is the buffer's.
+     */
+    public render(key: number, view: ContextView<T>, revision: number): string {
+        const start = view.firstSequence;
+        const end = start + view.length;
+
+        let window = this.windows.get(key);
+        if (!window || window.revision !== revision || start < window.start || end < window.end) {
+            window = { revision, start, end: start, text: "", lineLengths: [], head: 0 };
+            this.windows.set(key, window);
+            this.rebuilds++;
+        } else if (start === window.start && end === window.end) {
+            this.hits++;
+            return window.text;
+        }
+
+        // Cut the lines that left the window off the front
+        const drop = Math.min(start, window.end) - window.start;
+        if (drop > 0) {
+            const kept = window.lineLengths.length - window.head - drop;
+            if (kept === 0) {
+                window.text = "";
+            } else {
+                let chars = 0;
+                for (let i = 0; i < drop; i++) chars += window.lineLengths[window.head + i] + 1;
+                window.text = window.text.slice(chars);
+            }
+            window.head += drop;
+            this.trimmed += drop;
+            this.compact(window);
+        }
+        window.start = start;
+        if (window.end < start) window.end = start;
+
+        // Append the new ones
+        for (let i = window.end - start; i < view.length; i++) {
+            const line = this.formatLine(view.at(i)!);
+            window.text = window.text ? `${window.text}\n${line}` : line;
+            window.lineLengths.push(line.length);
+            this.appended++;
+        }
+        window.end = end;
+        return window.text;
+    }
+
+    public clear(): void {
+        this.windows.clear();
+    }
+
+    public getStats(): FormattedContextCacheStats {
+        return {
+            windows: this.windows.size,
+            hits: this.hits,
+            appended: this.appended,
+            trimmed: this.trimmed,
+            rebuilds: this.rebuilds,
+        };
+    }
+
+    private compact(window: RenderedWindow): void {
+        if (window.head > 256 && window.head * 2 > window.lineLengths.length) {
+            window.lineLengths = window.lineLengths.slice(window.head);
+            window.head = 0;
+        }
+    }
+}
@@ -5,8 +5,15 @@
 import { EventEmitter } from 'events';
 import { TranscriptSegment, SuggestionTrigger } from './NativeAudioClient';
 import { LLMHelper } from './LLMHelper';
-import { AnswerLLM, AssistLLM, FollowUpLLM, RecapLLM, FollowUpQuestionsLLM, WhatToAnswerLLM, prepareTranscriptForWhatToAnswer } from './llm';
-import * as fs from 'fs';
+import { AnswerLLM, AssistLLM, FollowUpLLM, RecapLLM, FollowUpQuestionsLLM, WhatToAnswerLLM, prepareTranscriptForWhatToAnswer, SingleFlight, singleFlightKey } from './llm';
+import type { SingleFlightStats } from './llm';
+import { ContextRingBuffer, ContextView } from './ContextRingBuffer';
+import { FormattedContextCache } from './FormattedContextCache';
+import type { FormattedContextCacheStats } from './FormattedContextCache';
+import { TranscriptLogWriter } from './TranscriptLogWriter';
+import type { TranscriptLogWriterStats } from './TranscriptLogWriter';
+import { ModeScheduler } from './ModeScheduler';
+import type { ModeSchedulerStats } from './ModeScheduler';
 import * as path from 'path';
 import { app, shell } from 'electron';
 import * as os from 'os';
@@ -44,9 +51,27 @@ export interface ContextItem {
     timestamp: number;
 }
 
+function formatContextLine(item: ContextItem): string {
+    const label = item.role === 'interviewer' ? 'INTERVIEWER' :
+        item.role === 'user' ? 'ME' :
+            'ASSISTANT (PREVIOUS SUGGESTION)';
+    return `[${label}]: ${item.text}`;
+}
+
 // Mode types
 export type IntelligenceMode = 'idle' | 'assist' | 'what_to_say' | 'follow_up' | 'recap' | 'manual' | 'follow_up_questions';
 
+// Modes that run an LLM request, and which one wins when they compete for the scheduler
+export type ScheduledMode = Exclude<IntelligenceMode, 'idle'>;
+export const MODE_PRIORITIES: Record<ScheduledMode, number> = {
+    manual: 5,
+    what_to_say: 4,
+    follow_up: 3,
+    recap: 2,
+    follow_up_questions: 1,
+    assist: 0,
+};
+
 // Events emitted by IntelligenceManager
 export interface IntelligenceModeEvents {
     'assist_update': (insight: string) => void;
@@ -77,16 +102,22 @@ export interface IntelligenceModeEvents {
  */
 export class IntelligenceManager extends EventEmitter {
     // Context management (mirrors Swift ContextManager)
-    private contextItems: ContextItem[] = [];
     private readonly contextWindowDuration: number = 120; // 120 seconds
     private readonly maxContextItems: number = 500;
+    // Timestamp-ordered; the oldest item is dropped when full
+    private contextItems = new ContextRingBuffer<ContextItem>(this.maxContextItems);
+    // Rendered context per window length, updated incrementally as turns arrive and expire
+    private formattedContext = new FormattedContextCache<ContextItem>(formatContextLine);
 
     // Last assistant message for follow-up mode
     private lastAssistantMessage: string | null = null;
 
     // Mode state
     private activeMode: IntelligenceMode = 'idle';
-    private assistCancellationToken: AbortController | null = null;
+    // Mode requests run through a priority scheduler; aborting one closes the underlying HTTP stream
+    private scheduler = new ModeScheduler<ScheduledMode>(MODE_PRIORITIES, mode => this.setMode(mode ?? 'idle'));
+    // Identical runs already in flight are shared rather than regenerated
+    private singleFlight = new SingleFlight();
 
     // Mode-specific LLMs (new architecture)
     private answerLLM: AnswerLLM | null = null;
@@ -107,6 +138,7 @@ export class IntelligenceManager extends EventEmitter {
 
     // Transcript logging
     private transcriptPath: string;
+    private transcriptLog: TranscriptLogWriter;
 
     constructor(llmHelper: LLMHelper) {
         super();
@@ -129,23 +161,27 @@ export class IntelligenceManager extends EventEmitter {
 
     private initializeTranscriptFile(): void {
         const header = `Natively Session Transcript - ${new Date().toLocaleString()}\n----------------------------------------\n\n`;
-        try {
-            fs.writeFileSync(this.transcriptPath, header, 'utf8');
-            console.log(`[IntelligenceManager] Transcript log created at: ${this.transcriptPath}`);
-        } catch (err) {
-            console.error(`[IntelligenceManager] Failed to create transcript log at ${this.transcriptPath}:`, err);
-        }
+        // Written asynchronously in batches; a slow or synced Documents folder must not stall the main thread
+        this.transcriptLog = new TranscriptLogWriter(this.transcriptPath);
+        this.transcriptLog.start(header);
+        console.log(`[IntelligenceManager] Transcript log at: ${this.transcriptPath}`);
     }
 
     private appendToLog(role: string, text: string): void {
         const time = new Date().toLocaleTimeString();
         const entry = `[${time}] ${role.toUpperCase()}: ${text}\n\n`;
-        try {
-            fs.appendFileSync(this.transcriptPath, entry, 'utf8');
-            console.log(`[IntelligenceManager] Appended to log: ${text.substring(0, 30)}...`);
-        } catch (err) {
-            console.warn(`[IntelligenceManager] Failed to write to transcript log:`, err);
-        }
+        this.transcriptLog.append(entry);
+    }
+
+    /**
+     * Write out any buffered transcript lines (on quit, before opening the file)
+     */
+    public async flushTranscriptLog(): Promise<void> {
+        await this.transcriptLog.close();
+    }
+
+    public getTranscriptLogStats(): TranscriptLogWriterStats {
+        return this.transcriptLog.getStats();
     }
 
     /**
@@ -153,6 +189,7 @@ export class IntelligenceManager extends EventEmitter {
      */
     public async openTranscriptFile(): Promise<void> {
         try {
+            await this.transcriptLog.flush();
             await shell.openPath(this.transcriptPath);
             console.log(`[IntelligenceManager] Opened transcript file`);
         } catch (err) {
@@ -199,7 +236,7 @@ export class IntelligenceManager extends EventEmitter {
         if (!text) return;
 
         // Deduplicate: check if this exact item already exists
-        const lastItem = this.contextItems[this.contextItems.length - 1];
+        const lastItem = this.contextItems.last();
         if (lastItem &&
             lastItem.role === role &&
             Math.abs(lastItem.timestamp - segment.timestamp) < 500 &&
@@ -272,10 +309,11 @@ export class IntelligenceManager extends EventEmitter {
 
     /**
      * Get context items within the last N seconds
+     * (a view over the buffer: read it before adding to the context)
      */
-    getContext(lastSeconds: number = 120): ContextItem[] {
+    getContext(lastSeconds: number = 120): ContextView<ContextItem> {
         const cutoff = Date.now() - (lastSeconds * 1000);
-        return this.contextItems.filter(item => item.timestamp >= cutoff);
+        return this.contextItems.since(cutoff);
     }
 
     /**
@@ -289,13 +327,11 @@ export class IntelligenceManager extends EventEmitter {
      * Get formatted context string for LLM prompts
      */
     getFormattedContext(lastSeconds: number = 120): string {
-        const items = this.getContext(lastSeconds);
-        return items.map(item => {
-            const label = item.role === 'interviewer' ? 'INTERVIEWER' :
-                item.role === 'user' ? 'ME' :
-                    'ASSISTANT (PREVIOUS SUGGESTION)';
-            return `[${label}]: ${item.text}`;
-        }).join('\n');
+        return this.formattedContext.render(lastSeconds, this.getContext(lastSeconds), this.contextItems.revision);
+    }
+
+    getFormattedContextStats(): FormattedContextCacheStats {
+        return this.formattedContext.getStats();
     }
 
     /**
@@ -303,8 +339,9 @@ export class IntelligenceManager extends EventEmitter {
      */
     getLastInterviewerTurn(): string | null {
         for (let i = this.contextItems.length - 1; i >= 0; i--) {
-            if (this.contextItems[i].role === 'interviewer') {
-                return this.contextItems[i].text;
+            const item = this.contextItems.at(i)!;
+            if (item.role === 'interviewer') {
+                return item.text;
             }
         }
         return null;
@@ -317,13 +354,9 @@ export class IntelligenceManager extends EventEmitter {
     }
 
     private evictOldEntries(): void {
+        // The buffer's capacity is the safety limit; only the time window needs enforcing
         const cutoff = Date.now() - (this.contextWindowDuration * 1000);
-        this.contextItems = this.contextItems.filter(item => item.timestamp >= cutoff);
-
-        // Safety limit
-        if (this.contextItems.length > this.maxContextItems) {
-            this.contextItems = this.contextItems.slice(-this.maxContextItems);
-        }
+        this.contextItems.evictBefore(cutoff);
     }
 
     // ============================================
@@ -335,50 +368,43 @@ export class IntelligenceManager extends EventEmitter {
      * Low-priority observational insights
      */
     async runAssistMode(): Promise<string | null> {
-        // Cancel if higher priority mode is active
+        // Passive: skip rather than wait when a higher priority mode is active
         if (this.activeMode !== 'idle' && this.activeMode !== 'assist') {
             return null;
         }
 
-        // Cancel previous assist if running
-        if (this.assistCancellationToken) {
-            this.assistCancellationToken.abort();
-        }
-
-        this.assistCancellationToken = new AbortController();
-        this.setMode('assist');
+        // A newer assist request replaces one still running
+        return this.scheduler.submit('assist', signal => this.executeAssist(signal));
+    }
 
+    private async executeAssist(signal: AbortSignal): Promise<string | null> {
         try {
             if (!this.assistLLM) {
-                this.setMode('idle');
                 return null;
             }
 
             const context = this.getFormattedContext(60); // Last 60 seconds
             if (!context) {
-                this.setMode('idle');
                 return null;
             }
 
-            const insight = await this.assistLLM.generate(context);
+            const insight = await this.assistLLM.generate(context, signal);
 
             // Check if cancelled
-            if (this.assistCancellationToken?.signal.aborted) {
+            if (signal.aborted) {
                 return null;
             }
 
             if (insight) {
                 this.emit('assist_update', insight);
             }
-            this.setMode('idle');
             return insight;
 
         } catch (error) {
-            if ((error as Error).name === 'AbortError') {
+            if ((error as Error).name === 'AbortError' || signal.aborted) {
                 return null;
             }
             this.emit('error', error as Error, 'assist');
-            this.setMode('idle');
             return null;
         }
     }
@@ -389,37 +415,40 @@ export class IntelligenceManager extends EventEmitter {
      * NEVER returns null - always provides a usable response
      */
     async runWhatShouldISay(question?: string, confidence: number = 0.8): Promise<string | null> {
-        const now = Date.now();
-
-        // Cooldown check
-        if (now - this.lastTriggerTime < this.triggerCooldown) {
-            return null;
-        }
+        // A manual click landing while a suggestion_trigger for the same context is in flight
+        // (or a double-press) shares that run; its tokens already reach the same listeners
+        const key = singleFlightKey('what_to_say', question, this.getFormattedContext(180));
+        return this.singleFlight.run(key, async () => {
+            const now = Date.now();
+
+            // Cooldown check (before scheduling, so a skipped trigger never preempts anything)
+            if (now - this.lastTriggerTime < this.triggerCooldown) {
+                return null;
+            }
+            this.lastTriggerTime = now;
 
-        // Cancel assist mode if active
-        if (this.assistCancellationToken) {
-            this.assistCancellationToken.abort();
-            this.assistCancellationToken = null;
-        }
+            return this.scheduler.submit('what_to_say', signal => this.executeWhatShouldISay(question, confidence, signal));
+        });
+    }
 
-        this.setMode('what_to_say');
-        this.lastTriggerTime = now;
+    private async executeWhatShouldISay(question: string | undefined, confidence: number, signal: AbortSignal): Promise<string | null> {
+        // Cancel assist mode if active (it may still hold a slot when concurrency > 1)
+        this.scheduler.cancel('assist');
 
         try {
             // Use WhatToAnswerLLM for clean pipeline
             if (!this.whatToAnswerLLM) {
                 // Fallback to AnswerLLM if not initialized
                 if (!this.answerLLM) {
-                    this.setMode('idle');
                     return "Could you repeat that? I want to make sure I address your question properly.";
                 }
                 const context = this.getFormattedContext(180);
-                const answer = await this.answerLLM.generate(question || '', context);
+                const answer = await this.answerLLM.generate(question || '', context, signal);
+                if (signal.aborted) return null;
                 if (answer) {
                     this.addAssistantMessage(answer);
                     this.emit('suggested_answer', answer, question || 'inferred', confidence);
                 }
-                this.setMode('idle');
                 return answer || "Could you repeat that? I want to make sure I address your question properly.";
             }
 
@@ -442,13 +471,18 @@ export class IntelligenceManager extends EventEmitter {
             // this.emit('suggested_answer_started');
 
             let fullAnswer = "";
-            const stream = this.whatToAnswerLLM.generateStream(preparedTranscript);
+            const stream = this.whatToAnswerLLM.generateStream(preparedTranscript, signal);
 
             for await (const token of stream) {
                 this.emit('suggested_answer_token', token, question || 'inferred', confidence);
                 fullAnswer += token;
             }
 
+            // Cancelled (reset / superseded): drop the partial answer instead of storing it
+            if (signal.aborted) {
+                return null;
+            }
+
             // Sanity check final answer
             if (!fullAnswer || fullAnswer.trim().length < 5) {
                 fullAnswer = "Could you repeat that? I want to make sure I address your question properly.";
@@ -463,12 +497,13 @@ export class IntelligenceManager extends EventEmitter {
             // Emit completion event (legacy consumers + done signal)
             this.emit('suggested_answer', fullAnswer, question || 'inferred from context', confidence);
 
-            this.setMode('idle');
             return fullAnswer;
 
         } catch (error) {
+            if (signal.aborted) {
+                return null;
+            }
             this.emit('error', error as Error, 'what_to_say');
-            this.setMode('idle');
             // Never fail silently - return a usable fallback
             return "Could you repeat that? I want to make sure I address your question properly.";
         }
@@ -483,18 +518,20 @@ export class IntelligenceManager extends EventEmitter {
      * Modify the last assistant message
      */
     async runFollowUp(intent: string, userRequest?: string): Promise<string | null> {
+        const key = singleFlightKey('follow_up', intent, userRequest, this.lastAssistantMessage, this.getFormattedContext(60));
+        return this.singleFlight.run(key, () => this.scheduler.submit('follow_up', signal => this.executeFollowUp(intent, userRequest, signal)));
+    }
+
+    private async executeFollowUp(intent: string, userRequest: string | undefined, signal: AbortSignal): Promise<string | null> {
         console.log(`[IntelligenceManager] runFollowUp called with intent: ${intent}`);
         if (!this.lastAssistantMessage) {
             console.warn('[IntelligenceManager] No lastAssistantMessage found for follow-up');
             return null;
         }
 
-        this.setMode('follow_up');
-
         try {
             if (!this.followUpLLM) {
                 console.error('[IntelligenceManager] FollowUpLLM not initialized');
-                this.setMode('idle');
                 return null;
             }
 
@@ -505,7 +542,8 @@ export class IntelligenceManager extends EventEmitter {
             const stream = this.followUpLLM.generateStream(
                 this.lastAssistantMessage,
                 refinementRequest,
-                context
+                context,
+                signal
             );
 
             for await (const token of stream) {
@@ -513,18 +551,22 @@ export class IntelligenceManager extends EventEmitter {
                 fullRefined += token;
             }
 
+            if (signal.aborted) {
+                return null;
+            }
+
             if (fullRefined) {
                 // Store refined answer
                 this.addAssistantMessage(fullRefined);
                 this.emit('refined_answer', fullRefined, intent);
             }
 
-            this.setMode('idle');
             return fullRefined;
 
         } catch (error) {
-            this.emit('error', error as Error, 'follow_up');
-            this.setMode('idle');
+            if (!signal.aborted) {
+                this.emit('error', error as Error, 'follow_up');
+            }
             return null;
         }
     }
@@ -534,40 +576,46 @@ export class IntelligenceManager extends EventEmitter {
      * Neutral conversation summary
      */
     async runRecap(): Promise<string | null> {
+        const key = singleFlightKey('recap', this.getFormattedContext(120));
+        return this.singleFlight.run(key, () => this.scheduler.submit('recap', signal => this.executeRecap(signal)));
+    }
+
+    private async executeRecap(signal: AbortSignal): Promise<string | null> {
         console.log('[IntelligenceManager] runRecap called');
-        this.setMode('recap');
 
         try {
             if (!this.recapLLM) {
                 console.error('[IntelligenceManager] RecapLLM not initialized');
-                this.setMode('idle');
                 return null;
             }
 
             const context = this.getFormattedContext(120);
             if (!context) {
                 console.warn('[IntelligenceManager] No context available for recap');
-                this.setMode('idle');
                 return null;
             }
 
             let fullSummary = "";
-            const stream = this.recapLLM.generateStream(context);
+            const stream = this.recapLLM.generateStream(context, signal);
 
             for await (const token of stream) {
                 this.emit('recap_token', token);
                 fullSummary += token;
             }
 
+            if (signal.aborted) {
+                return null;
+            }
+
             if (fullSummary) {
                 this.emit('recap', fullSummary);
             }
-            this.setMode('idle');
             return fullSummary;
 
         } catch (error) {
-            this.emit('error', error as Error, 'recap');
-            this.setMode('idle');
+            if (!signal.aborted) {
+                this.emit('error', error as Error, 'recap');
+            }
             return null;
         }
     }
@@ -577,40 +625,46 @@ export class IntelligenceManager extends EventEmitter {
      * Suggest strategic questions for the user to ask
      */
     async runFollowUpQuestions(): Promise<string | null> {
+        const key = singleFlightKey('follow_up_questions', this.getFormattedContext(120));
+        return this.singleFlight.run(key, () => this.scheduler.submit('follow_up_questions', signal => this.executeFollowUpQuestions(signal)));
+    }
+
+    private async executeFollowUpQuestions(signal: AbortSignal): Promise<string | null> {
         console.log('[IntelligenceManager] runFollowUpQuestions called');
-        this.setMode('follow_up_questions');
 
         try {
             if (!this.followUpQuestionsLLM) {
                 console.error('[IntelligenceManager] FollowUpQuestionsLLM not initialized');
-                this.setMode('idle');
                 return null;
             }
 
             const context = this.getFormattedContext(120);
             if (!context) {
                 console.warn('[IntelligenceManager] No context available for follow-up questions');
-                this.setMode('idle');
                 return null;
             }
 
             let fullQuestions = "";
-            const stream = this.followUpQuestionsLLM.generateStream(context);
+            const stream = this.followUpQuestionsLLM.generateStream(context, signal);
 
             for await (const token of stream) {
                 this.emit('follow_up_questions_token', token);
                 fullQuestions += token;
             }
 
+            if (signal.aborted) {
+                return null;
+            }
+
             if (fullQuestions) {
                 this.emit('follow_up_questions_update', fullQuestions);
             }
-            this.setMode('idle');
             return fullQuestions;
 
         } catch (error) {
-            this.emit('error', error as Error, 'follow_up_questions');
-            this.setMode('idle');
+            if (!signal.aborted) {
+                this.emit('error', error as Error, 'follow_up_questions');
+            }
             return null;
         }
     }
@@ -620,18 +674,25 @@ export class IntelligenceManager extends EventEmitter {
      * Explicit bypass when auto-detection fails
      */
     async runManualAnswer(question: string): Promise<string | null> {
+        const key = singleFlightKey('manual', question, this.getFormattedContext(120));
+        return this.singleFlight.run(key, () => this.scheduler.submit('manual', signal => this.executeManualAnswer(question, signal)));
+    }
+
+    private async executeManualAnswer(question: string, signal: AbortSignal): Promise<string | null> {
         this.emit('manual_answer_started');
-        this.setMode('manual');
 
         try {
             if (!this.answerLLM) {
-                this.setMode('idle');
                 return null;
             }
 
             // Use AnswerLLM with manual question
             const context = this.getFormattedContext(120);
-            const answer = await this.answerLLM.generate(question, context);
+            const answer = await this.answerLLM.generate(question, context, signal);
+
+            if (signal.aborted) {
+                return null;
+            }
 
             if (answer) {
                 // Store in context
@@ -639,12 +700,12 @@ export class IntelligenceManager extends EventEmitter {
                 this.emit('manual_answer_result', answer, question);
             }
 
-            this.setMode('idle');
             return answer;
 
         } catch (error) {
-            this.emit('error', error as Error, 'manual');
-            this.setMode('idle');
+            if (!signal.aborted) {
+                this.emit('error', error as Error, 'manual');
+            }
             return null;
         }
     }
@@ -688,17 +749,37 @@ export class IntelligenceManager extends EventEmitter {
         return this.activeMode;
     }
 
+    getSingleFlightStats(): SingleFlightStats {
+        return this.singleFlight.getStats();
+    }
+
+    getModeSchedulerStats(): ModeSchedulerStats {
+        return this.scheduler.getStats();
+    }
+
+    /**
+     * How many mode requests may stream at once (the rest queue by priority)
+     */
+    setModeConcurrency(concurrency: number): void {
+        this.scheduler.setConcurrency(concurrency);
+    }
+
+    /**
+     * Abort every in-flight LLM request (streams stop and their sockets close)
+     */
+    cancelAll(): void {
+        this.scheduler.cancelAll();
+    }
+
     /**
      * Clear all context and reset state
      */
     reset(): void {
-        this.contextItems = [];
+        this.contextItems.clear();
+        this.formattedContext.clear();
         this.lastAssistantMessage = null;
         this.activeMode = 'idle';
-        if (this.assistCancellationToken) {
-            this.assistCancellationToken.abort();
-            this.assistCancellationToken = null;
-        }
+        this.cancelAll();
     }
 
     /**
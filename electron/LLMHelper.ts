@@ -1,16 +1,98 @@
-import { GoogleGenAI } from "@google/genai"
-import fs from "fs"
+import { GoogleGenAI, Schema } from "@google/genai"
+import { app } from "electron"
+import path from "path"
 import { HARD_SYSTEM_PROMPT } from "./llm/prompts"
+import { OllamaTransport, OllamaPoolStats } from "./llm/OllamaTransport"
+import { streamOllamaTokens, promptEvalTracker, PromptEvalStats } from "./llm/ollamaStream"
+import { ResponseCache, ResponseCacheStats, buildCacheKey } from "./llm/ResponseCache"
+import { LatencyTracker, HedgeAttempt, HedgeOutcome, computeHedgeDelay, runHedged, createAbortError } from "./llm/hedging"
+import { ModelRouter, ModelHealth } from "./llm/ModelRouter"
+import { HEDGE_BUDGETS, HedgeBudget, HedgeMode, PromptMode } from "./llm/types"
+import { ImagePreprocessor, ImagePart } from "./llm/ImagePreprocessor"
+import { PromptCacheManager, PromptCacheStats } from "./llm/PromptCacheManager"
+import { SingleFlight, SingleFlightStats, singleFlightKey } from "./llm/SingleFlight"
+import { decodeGeminiStream, runStreamPipeline } from "./llm/streamPipeline"
+import { estimateTokens } from "./llm/promptBudget"
+import { ConnectionWarmer, ConnectionWarmerStats, ConnectionState, WarmerEndpoint } from "./llm/ConnectionWarmer"
+import { OllamaResidency, ModelResidencyStatus } from "./llm/OllamaResidency"
+import { OllamaChatSession, OllamaChatSessionStats, OllamaChatMessage } from "./llm/OllamaChatSession"
+import { OllamaOptionsPlanner, OllamaOptionsStats } from "./llm/ollamaOptions"
+import { PROBLEM_INFO_SCHEMA, SOLUTION_SCHEMA, StructuredUpdate, isPartialResult, parseStructuredJson, streamStructuredFields, toJsonSchema } from "./llm/structuredOutput"
 
 interface OllamaResponse {
   response: string
   done: boolean
+  prompt_eval_count?: number
+  prompt_eval_duration?: number
+}
+
+interface OllamaChatResponse {
+  message?: { role: string; content: string }
+  done: boolean
+  prompt_eval_count?: number
+  prompt_eval_duration?: number
 }
 
 // Model constant for Gemini 3 Flash
 const GEMINI_FLASH_MODEL = "gemini-3-flash-preview"
 const GEMINI_PRO_MODEL = "gemini-3-pro-preview"
 const MAX_OUTPUT_TOKENS = 65536
+const GEMINI_API_VERSION = "v1alpha"
+const GEMINI_DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com"
+// Structured answers carry code; the per-mode chat budgets would cut them off
+const OLLAMA_STRUCTURED_OUTPUT_TOKENS = 2048
+
+function otherGeminiModel(model: string): string {
+  return model === GEMINI_PRO_MODEL ? GEMINI_FLASH_MODEL : GEMINI_PRO_MODEL
+}
+
+/**
+ * Per-call options for the cached LLMHelper entry points
+ */
+export interface LLMCallOptions {
+  bypassCache?: boolean   // Always go to the network and don't store the result
+  signal?: AbortSignal    // Cancels the in-flight HTTP request(s)
+}
+
+/**
+ * Chat prompt split so the static system prompt can be sent as a (cached)
+ * systemInstruction; Ollama and the response cache see the flattened text
+ */
+interface ChatPrompt {
+  systemInstruction: string | null
+  text: string
+  message: string
+  context?: string
+}
+
+function flattenChatPrompt(prompt: ChatPrompt): string {
+  return prompt.systemInstruction ? `${prompt.systemInstruction}\n\n${prompt.text}` : prompt.text
+}
+
+function estimateChatTokens(messages: OllamaChatMessage[]): number {
+  return messages.reduce((sum, message) => sum + estimateTokens(message.content) + 4, 0)
+}
+
+/**
+ * Which model answered a hedged request and why (value omitted)
+ */
+export type HedgeSummary = Omit<HedgeOutcome<unknown>, "value">
+
+/**
+ * A Gemini response is usable if any candidate text is non-empty
+ */
+function isValidGeminiResponse(response: any): boolean {
+  const candidate = response?.candidates?.[0];
+  if (!candidate) return false;
+  if (response.text && response.text.trim().length > 0) return true;
+  if (candidate.content?.parts?.[0]?.text && candidate.content.parts[0].text.trim().length > 0) return true;
+  if (typeof candidate.content === 'string' && candidate.content.trim().length > 0) return true;
+  return false;
+}
+
+const CHAT_FAILURE_MESSAGE = "I apologize, but I couldn't generate a response. Please try again."
+// Thrown (never returned, so never cached) when a generation hits MAX_TOKENS before any text
+const TRUNCATED_RESPONSE_MESSAGE = "Response was truncated due to length limit. Please try a shorter question or break it into parts."
 
 // Simple prompt for image analysis (not interview copilot - kept separate)
 const IMAGE_ANALYSIS_PROMPT = `Analyze concisely. Be direct. No markdown formatting. Return plain text only.`
@@ -22,12 +104,32 @@ export class LLMHelper {
   private ollamaModel: string = "llama3.2"
   private ollamaUrl: string = "http://localhost:11434"
   private geminiModel: string = GEMINI_FLASH_MODEL
+  private ollamaTransport: OllamaTransport
+  private ollamaResidency: OllamaResidency
+  private ollamaChatSession = new OllamaChatSession()
+  private ollamaOptions = new OllamaOptionsPlanner()
+  private responseCache: ResponseCache<any>
+  private latencyTracker = new LatencyTracker()
+  private modelRouter = new ModelRouter()
+  private hedgeBudgets: Record<HedgeMode, HedgeBudget> = { ...HEDGE_BUDGETS }
+  private lastHedgeOutcome: HedgeSummary | null = null
+  private imagePreprocessor = new ImagePreprocessor()
+  private promptCache = new PromptCacheManager(() => this.client)
+  private singleFlight = new SingleFlight()
+  private connectionWarmer = new ConnectionWarmer(() => this.getWarmerEndpoint())
 
   constructor(apiKey?: string, useOllama: boolean = false, ollamaModel?: string, ollamaUrl?: string) {
     this.useOllama = useOllama
+    if (ollamaUrl) this.ollamaUrl = ollamaUrl
+    this.ollamaTransport = new OllamaTransport(this.ollamaUrl)
+    this.ollamaResidency = new OllamaResidency(this.ollamaTransport)
+    this.responseCache = new ResponseCache({
+      diskDir: process.env.LLM_CACHE_DISK === "true"
+        ? path.join(app.getPath("userData"), "llm-response-cache")
+        : null
+    })
 
     if (useOllama) {
-      this.ollamaUrl = ollamaUrl || "http://localhost:11434"
       this.ollamaModel = ollamaModel || "gemma:latest" // Default fallback
       // console.log(`[LLMHelper] Using Ollama with model: ${this.ollamaModel}`)
 
@@ -36,16 +138,28 @@ export class LLMHelper {
     } else if (apiKey) {
       this.apiKey = apiKey
       // Initialize with v1alpha API version for Gemini 3 support
-      this.client = new GoogleGenAI({
-        apiKey: apiKey,
-        httpOptions: { apiVersion: "v1alpha" }
-      })
+      this.client = this.createGeminiClient(apiKey)
+      // The first question of the session shouldn't pay for DNS + TLS setup
+      this.connectionWarmer.start()
       // console.log(`[LLMHelper] Using Google Gemini 3 with model: ${this.geminiModel} (v1alpha API)`)
     } else {
       throw new Error("Either provide Gemini API key or enable Ollama mode")
     }
   }
 
+  /**
+   * GEMINI_BASE_URL points the client at a local stand-in of the REST API (tests, benchmarks)
+   */
+  private createGeminiClient(apiKey: string): GoogleGenAI {
+    return new GoogleGenAI({
+      apiKey: apiKey,
+      httpOptions: {
+        apiVersion: GEMINI_API_VERSION,
+        ...(process.env.GEMINI_BASE_URL ? { baseUrl: process.env.GEMINI_BASE_URL } : {})
+      }
+    })
+  }
+
   private cleanJsonResponse(text: string): string {
     // Remove markdown code block syntax if present
     text = text.replace(/^```(?:json)?\n/, '').replace(/\n```$/, '');
@@ -54,75 +168,175 @@ export class LLMHelper {
     return text;
   }
 
-  private async callOllama(prompt: string): Promise<string> {
+  /**
+   * `format` is a JSON schema the answer must follow (Ollama structured outputs)
+   */
+  private async callOllama(prompt: string, signal?: AbortSignal, mode: PromptMode = "answer", format?: Record<string, unknown>): Promise<string> {
     try {
-      const response = await fetch(`${this.ollamaUrl}/api/generate`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
+      const numPredict = format ? OLLAMA_STRUCTURED_OUTPUT_TOKENS : undefined
+      const data = await this.ollamaTransport.requestJson<OllamaResponse>("/api/generate", {
+        method: "POST",
+        body: {
           model: this.ollamaModel,
           prompt: prompt,
           stream: false,
-          options: {
-            temperature: 0.7,
-            top_p: 0.9,
-          }
-        }),
+          keep_alive: this.ollamaResidency.keepAlive,
+          ...(format ? { format } : {}),
+          options: this.ollamaOptions.forRequest(this.ollamaModel, mode, estimateTokens(prompt), numPredict)
+        },
+        signal,
       })
-
-      if (!response.ok) {
-        throw new Error(`Ollama API error: ${response.status} ${response.statusText}`)
-      }
-
-      const data: OllamaResponse = await response.json()
+      promptEvalTracker.record("/api/generate", data)
       return data.response
     } catch (error: any) {
+      if (signal?.aborted) throw createAbortError()
       // console.error("[LLMHelper] Error calling Ollama:", error)
       throw new Error(`Failed to connect to Ollama: ${error.message}. Make sure Ollama is running on ${this.ollamaUrl}`)
     }
   }
 
+  /**
+   * Stream tokens from Ollama /api/generate as they are produced
+   */
+  private async *streamOllama(prompt: string, signal?: AbortSignal, mode: PromptMode = "answer", format?: Record<string, unknown>): AsyncGenerator<string, void, unknown> {
+    try {
+      const numPredict = format ? OLLAMA_STRUCTURED_OUTPUT_TOKENS : undefined
+      const stream = streamOllamaTokens(this.ollamaTransport, "/api/generate", {
+        model: this.ollamaModel,
+        prompt: prompt,
+        keep_alive: this.ollamaResidency.keepAlive,
+        ...(format ? { format } : {}),
+        options: this.ollamaOptions.forRequest(this.ollamaModel, mode, estimateTokens(prompt), numPredict)
+      }, signal)
+
+      promptEvalTracker.record("/api/generate", yield* stream)
+    } catch (error: any) {
+      if (signal?.aborted) throw createAbortError()
+      throw new Error(`Failed to connect to Ollama: ${error.message}. Make sure Ollama is running on ${this.ollamaUrl}`)
+    }
+  }
+
+  private async callOllamaChat(messages: OllamaChatMessage[], signal?: AbortSignal): Promise<string> {
+    try {
+      const data = await this.ollamaTransport.requestJson<OllamaChatResponse>("/api/chat", {
+        method: "POST",
+        body: {
+          model: this.ollamaModel,
+          messages: messages,
+          stream: false,
+          keep_alive: this.ollamaResidency.keepAlive,
+          options: this.ollamaOptions.forRequest(this.ollamaModel, "answer", estimateChatTokens(messages))
+        },
+        signal,
+      })
+      promptEvalTracker.record("/api/chat", data)
+      return data.message?.content || ""
+    } catch (error: any) {
+      if (signal?.aborted) throw createAbortError()
+      throw new Error(`Failed to connect to Ollama: ${error.message}. Make sure Ollama is running on ${this.ollamaUrl}`)
+    }
+  }
+
+  private async *streamOllamaChat(messages: OllamaChatMessage[], signal?: AbortSignal): AsyncGenerator<string, void, unknown> {
+    try {
+      const stream = streamOllamaTokens(this.ollamaTransport, "/api/chat", {
+        model: this.ollamaModel,
+        messages: messages,
+        keep_alive: this.ollamaResidency.keepAlive,
+        options: this.ollamaOptions.forRequest(this.ollamaModel, "answer", estimateChatTokens(messages))
+      }, signal)
+
+      promptEvalTracker.record("/api/chat", yield* stream)
+    } catch (error: any) {
+      if (signal?.aborted) throw createAbortError()
+      throw new Error(`Failed to connect to Ollama: ${error.message}. Make sure Ollama is running on ${this.ollamaUrl}`)
+    }
+  }
+
+  /**
+   * Chat prompts with the copilot system prompt go through the meeting's /api/chat session;
+   * anything else (custom system prompts, one-off generations) stays stateless
+   */
+  private usesOllamaChatSession(prompt: ChatPrompt): boolean {
+    return this.ollamaChatSession.enabled && prompt.systemInstruction !== null
+  }
+
+  /**
+   * Ollama chat answer. In session mode only the new turn is appended to the meeting's
+   * history, so the server reuses its KV cache for everything said before.
+   */
+  private async askOllama(prompt: ChatPrompt, signal?: AbortSignal): Promise<string> {
+    if (!this.usesOllamaChatSession(prompt)) {
+      return this.callOllama(flattenChatPrompt(prompt), signal)
+    }
+
+    const turn = await this.ollamaChatSession.beginTurn(this.ollamaModel, prompt.systemInstruction!, prompt.message, prompt.context, signal)
+    try {
+      const reply = await this.callOllamaChat(turn.messages, signal)
+      if (reply.trim().length > 0) turn.commit(reply)
+      return reply
+    } finally {
+      turn.release()
+    }
+  }
+
+  private async *streamOllamaAnswer(prompt: ChatPrompt, signal?: AbortSignal): AsyncGenerator<string, void, unknown> {
+    if (!this.usesOllamaChatSession(prompt)) {
+      yield* this.streamOllama(flattenChatPrompt(prompt), signal)
+      return
+    }
+
+    const turn = await this.ollamaChatSession.beginTurn(this.ollamaModel, prompt.systemInstruction!, prompt.message, prompt.context, signal)
+    try {
+      let reply = ""
+      for await (const token of this.streamOllamaChat(turn.messages, signal)) {
+        reply += token
+        yield token
+      }
+      // An interrupted answer never makes it into the history
+      if (reply.trim().length > 0) turn.commit(reply)
+    } finally {
+      turn.release()
+    }
+  }
+
   private async checkOllamaAvailable(): Promise<boolean> {
     try {
-      const response = await fetch(`${this.ollamaUrl}/api/tags`)
-      return response.ok
+      await this.ollamaResidency.listModels()
+      return true
     } catch {
       return false
     }
   }
 
+  /**
+   * Resolve the configured Ollama model against the models actually installed,
+   * then load it in the background. No test generation here - a throwaway prompt
+   * on every switch costs a full inference round trip on CPU-only hosts.
+   */
   private async initializeOllamaModel(): Promise<void> {
-    try {
-      const availableModels = await this.getOllamaModels()
-      if (availableModels.length === 0) {
-        // console.warn("[LLMHelper] No Ollama models found")
-        return
-      }
-
-      // Check if current model exists, if not use the first available
-      if (!availableModels.includes(this.ollamaModel)) {
-        this.ollamaModel = availableModels[0]
-        // console.log(`[LLMHelper] Auto-selected first available model: ${this.ollamaModel}`)
-      }
+    const availableModels = await this.getOllamaModels()
+    if (availableModels.length === 0) {
+      // console.warn("[LLMHelper] No Ollama models found")
+      return
+    }
 
-      // Test the selected model works
-      await this.callOllama("Hello")
-      // console.log(`[LLMHelper] Successfully initialized with model: ${this.ollamaModel}`)
-    } catch (error: any) {
-      // console.error(`[LLMHelper] Failed to initialize Ollama model: ${error.message}`)
-      // Try to use first available model as fallback
-      try {
-        const models = await this.getOllamaModels()
-        if (models.length > 0) {
-          this.ollamaModel = models[0]
-          // console.log(`[LLMHelper] Fallback to: ${this.ollamaModel}`)
-        }
-      } catch (fallbackError: any) {
-        // console.error(`[LLMHelper] Fallback also failed: ${fallbackError.message}`)
-      }
+    // Check if current model exists, if not use the first available
+    if (!availableModels.includes(this.ollamaModel)) {
+      this.ollamaModel = availableModels[0]
+      // console.log(`[LLMHelper] Auto-selected first available model: ${this.ollamaModel}`)
     }
+
+    this.preloadOllamaModel()
+  }
+
+  /**
+   * Bring the current model into memory so the first question doesn't pay the load
+   */
+  private preloadOllamaModel(): void {
+    this.ollamaResidency.preload(this.ollamaModel, this.ollamaOptions.forPreload(this.ollamaModel)).catch((error: any) => {
+      console.warn(`[LLMHelper] Failed to preload Ollama model ${this.ollamaModel}:`, error?.message)
+    })
   }
 
   /**
@@ -130,7 +344,7 @@ export class LLMHelper {
    * Used by IntelligenceManager for mode-specific prompts
    * NOTE: Migrated from Pro to Flash for consistency
    */
-  public async generateWithPro(contents: any[]): Promise<string> {
+  public async generateWithPro(contents: any[], signal?: AbortSignal): Promise<string> {
     if (!this.client) throw new Error("Gemini client not initialized")
 
     // console.log(`[LLMHelper] Calling ${GEMINI_FLASH_MODEL}...`)
@@ -140,6 +354,7 @@ export class LLMHelper {
       config: {
         maxOutputTokens: MAX_OUTPUT_TOKENS,
         temperature: 0.3,      // Lower = faster, more focused
+        abortSignal: signal,
       }
     })
     return response.text || ""
@@ -149,19 +364,134 @@ export class LLMHelper {
    * Generate content using Gemini 3 Flash (audio + fast multimodal)
    * CRITICAL: Audio input MUST use this model, not Pro
    */
-  public async generateWithFlash(contents: any[]): Promise<string> {
+  public async generateWithFlash(contents: any[], systemInstruction?: string, signal?: AbortSignal, responseSchema?: Schema): Promise<string> {
     if (!this.client) throw new Error("Gemini client not initialized")
 
     // console.log(`[LLMHelper] Calling ${GEMINI_FLASH_MODEL}...`)
-    const response = await this.client.models.generateContent({
-      model: GEMINI_FLASH_MODEL,
-      contents: contents,
-      config: {
-        maxOutputTokens: MAX_OUTPUT_TOKENS,
-        temperature: 0.3,      // Lower = faster, more focused
+    const config = {
+      systemInstruction,
+      maxOutputTokens: MAX_OUTPUT_TOKENS,
+      temperature: 0.3,      // Lower = faster, more focused
+      abortSignal: signal,
+      // Constrained decoding: the answer is valid JSON of this shape, no fences or prose
+      ...(responseSchema ? { responseMimeType: "application/json", responseSchema } : {}),
+    }
+    const response = await this.withPromptCache(GEMINI_FLASH_MODEL, config, (cfg) =>
+      this.client!.models.generateContent({
+        model: GEMINI_FLASH_MODEL,
+        contents: contents,
+        config: cfg
+      })
+    )
+    const text = response.text || ""
+    if (!text.trim() && response.candidates?.[0]?.finishReason === "MAX_TOKENS") {
+      throw new Error(TRUNCATED_RESPONSE_MESSAGE)
+    }
+    return text
+  }
+
+  /**
+   * Streaming generateWithFlash (no hedging: structured answers are regenerated, not raced)
+   */
+  private async *streamWithFlash(contents: any[], signal?: AbortSignal, responseSchema?: Schema): AsyncGenerator<string, void, unknown> {
+    if (!this.client) throw new Error("Gemini client not initialized")
+
+    const config = {
+      maxOutputTokens: MAX_OUTPUT_TOKENS,
+      temperature: 0.3,
+      abortSignal: signal,
+      ...(responseSchema ? { responseMimeType: "application/json", responseSchema } : {}),
+    }
+    const stream = await this.withPromptCache(GEMINI_FLASH_MODEL, config, (cfg) =>
+      this.client!.models.generateContentStream({
+        model: GEMINI_FLASH_MODEL,
+        contents: contents,
+        config: cfg
+      })
+    )
+    yield* decodeGeminiStream(stream)
+  }
+
+  /**
+   * Send a string systemInstruction as its cachedContent handle when one is live.
+   * If the server no longer knows the handle, drop it and resend with the inline prompt.
+   */
+  private async withPromptCache<T>(model: string, config: any, call: (config: any) => Promise<T>): Promise<T> {
+    // Every Gemini generation passes through here: mark the connection busy and time streams
+    const connection = this.connectionWarmer.noteRequest()
+    const startedAt = Date.now()
+    const timedCall = (cfg: any) => call(cfg).then(result => this.trackFirstChunk(result, connection, startedAt))
+
+    const cachedConfig = this.promptCache.applyToConfig(model, config)
+    if (cachedConfig === config) return timedCall(config)
+
+    try {
+      return await timedCall(cachedConfig)
+    } catch (error) {
+      if (!PromptCacheManager.isCacheError(error)) throw error
+      console.warn(`[LLMHelper] Cached prompt ${cachedConfig.cachedContent} rejected, resending inline`)
+      this.promptCache.invalidate(cachedConfig.cachedContent)
+      return timedCall(config)
+    }
+  }
+
+  /**
+   * Report the first chunk of a streamed result as cold/warm TTFT; other results pass through
+   */
+  private trackFirstChunk<T>(result: T, connection: ConnectionState, startedAt: number): T {
+    const source = result as unknown as AsyncIterable<unknown>
+    if (!source || typeof source[Symbol.asyncIterator] !== "function") return result
+
+    const warmer = this.connectionWarmer
+    return (async function* () {
+      let first = true
+      for await (const chunk of source) {
+        if (first) {
+          first = false
+          warmer.recordTtft(connection, Date.now() - startedAt)
+        }
+        yield chunk
       }
-    })
-    return response.text || ""
+    })() as unknown as T
+  }
+
+  private getWarmerEndpoint(): WarmerEndpoint | null {
+    if (this.useOllama || !this.apiKey) return null
+    return {
+      baseUrl: process.env.GEMINI_BASE_URL || GEMINI_DEFAULT_BASE_URL,
+      apiVersion: GEMINI_API_VERSION,
+      apiKey: this.apiKey
+    }
+  }
+
+  /**
+   * Re-establish the connection now (e.g. after the machine wakes from sleep)
+   */
+  public prewarmConnection(): Promise<void> {
+    return this.connectionWarmer.warm()
+  }
+
+  public getConnectionWarmerStats(): ConnectionWarmerStats {
+    return this.connectionWarmer.getStats()
+  }
+
+  private buildSingleFlightKey(kind: string, message: string, imagePath: string | undefined, context: string | undefined, skipSystemPrompt: boolean): string {
+    return singleFlightKey(kind, this.getCurrentProvider(), this.getCurrentModel(), message, imagePath, context, skipSystemPrompt)
+  }
+
+  public getSingleFlightStats(): SingleFlightStats {
+    return this.singleFlight.getStats()
+  }
+
+  public getPromptCacheStats(): PromptCacheStats {
+    return this.promptCache.getStats()
+  }
+
+  /**
+   * Delete server-side prompt caches (called on quit)
+   */
+  public async disposePromptCache(): Promise<void> {
+    await this.promptCache.dispose()
   }
 
   /**
@@ -194,13 +524,15 @@ export class LLMHelper {
    * Retry logic with exponential backoff
    * Specifically handles 503 Service Unavailable
    */
-  private async withRetry<T>(fn: () => Promise<T>, retries = 3): Promise<T> {
+  private async withRetry<T>(fn: () => Promise<T>, retries = 3, signal?: AbortSignal): Promise<T> {
     let delay = 400;
     for (let i = 0; i < retries; i++) {
+      if (signal?.aborted) throw createAbortError();
       try {
         return await fn();
       } catch (e: any) {
-        // Only retry on 503 or overload errors
+        // Only retry on 503 or overload errors, never after a cancel
+        if (signal?.aborted) throw createAbortError();
         if (!e.message?.includes("503") && !e.message?.includes("overloaded")) throw e;
 
         console.warn(`[LLMHelper] 503 Overload. Retrying in ${delay}ms...`);
@@ -212,23 +544,27 @@ export class LLMHelper {
   }
 
   /**
-   * Generate content using the currently selected model
+   * Generate content using the currently selected model (or an explicit one)
    */
-  private async generateContent(contents: any[]): Promise<string> {
+  private async generateContent(contents: any[], model: string = this.geminiModel, signal?: AbortSignal, systemInstruction?: string | null): Promise<string> {
     if (!this.client) throw new Error("Gemini client not initialized")
 
-    console.log(`[LLMHelper] Calling ${this.geminiModel}...`)
+    console.log(`[LLMHelper] Calling ${model}...`)
+
+    const config = {
+      systemInstruction: systemInstruction || undefined,
+      maxOutputTokens: MAX_OUTPUT_TOKENS,
+      temperature: 0.4,
+      abortSignal: signal,
+    }
 
     return this.withRetry(async () => {
       // @ts-ignore
-      const response = await this.client!.models.generateContent({
-        model: this.geminiModel,
+      const response = await this.withPromptCache(model, config, (cfg) => this.client!.models.generateContent({
+        model: model,
         contents: contents,
-        config: {
-          maxOutputTokens: MAX_OUTPUT_TOKENS,
-          temperature: 0.4,
-        }
-      });
+        config: cfg
+      }));
 
       // Debug: log full response structure
       // console.log(`[LLMHelper] Full response:`, JSON.stringify(response, null, 2).substring(0, 500))
@@ -276,7 +612,7 @@ export class LLMHelper {
         }, null, 2));
 
         if (candidate.finishReason === "MAX_TOKENS") {
-          return "Response was truncated due to length limit. Please try a shorter question or break it into parts.";
+          throw new Error(TRUNCATED_RESPONSE_MESSAGE);
         }
 
         return "";
@@ -284,23 +620,97 @@ export class LLMHelper {
 
       console.log(`[LLMHelper] Extracted text length: ${text.length}`);
       return text;
-    });
+    }, 3, signal);
   }
 
-  public async extractProblemFromImages(imagePaths: string[]) {
-    try {
-      // Build content parts with images
-      const parts: any[] = []
-
-      for (const imagePath of imagePaths) {
-        const imageData = await fs.promises.readFile(imagePath)
-        parts.push({
-          inlineData: {
-            data: imageData.toString("base64"),
-            mimeType: "image/png"
-          }
-        })
+  /**
+   * Content-addressed cache key: normalized prompt + model + raw image bytes
+   */
+  private buildResponseCacheKey(kind: string, model: string, prompt: string, images: ImagePart[] = [], provider: string = this.getCurrentProvider()): string {
+    return buildCacheKey({
+      kind,
+      model: `${provider}:${model}`,
+      prompt,
+      images: images.map(image => image.inlineData.data)
+    })
+  }
+
+  /**
+   * Look up a cached response, or run the generator and cache its result.
+   * Errors and results recovered from a truncated response are never cached.
+   */
+  private async withResponseCache<T>(key: string | null, generate: () => Promise<T>): Promise<T> {
+    if (key) {
+      const cached = await this.responseCache.get(key)
+      if (cached !== undefined) {
+        console.log(`[LLMHelper] Response cache hit (${key.substring(0, 12)})`)
+        return cached as T
       }
+    }
+
+    const result = await generate()
+    const isEmpty = typeof result === "string" && result.trim().length === 0
+    if (key && !isEmpty && !isPartialResult(result)) this.responseCache.set(key, result)
+    return result
+  }
+
+  public getResponseCacheStats(): ResponseCacheStats {
+    return this.responseCache.getStats()
+  }
+
+  public async clearResponseCache(): Promise<void> {
+    await this.responseCache.clear()
+  }
+
+  /**
+   * JSON answer constrained to `schema`: responseSchema on Gemini, `format` on Ollama.
+   * Text-only requests can run on Ollama; anything with images needs Gemini.
+   * A response that still comes back malformed or truncated is repaired rather than re-requested,
+   * as long as every required field made it; a truncated one is flagged so it is not cached.
+   */
+  private async generateStructured<T = any>(kind: string, parts: any[], schema: Schema, signal?: AbortSignal): Promise<T> {
+    const text = this.structuredTarget(parts).provider === "ollama"
+      ? await this.callOllama(parts.map(part => part.text).join("\n\n"), signal, "answer", toJsonSchema(schema))
+      : await this.generateWithFlash(parts, undefined, signal, schema)
+    return parseStructuredJson<T>(kind, text, schema)
+  }
+
+  /**
+   * Where a structured call runs (and what its cache key names)
+   */
+  private structuredTarget(parts: any[]): { provider: "ollama" | "gemini"; model: string } {
+    const textOnly = parts.every(part => typeof part.text === "string")
+    return this.useOllama && textOnly
+      ? { provider: "ollama", model: this.ollamaModel }
+      : { provider: "gemini", model: GEMINI_FLASH_MODEL }
+  }
+
+  private buildStructuredCacheKey(kind: string, parts: any[], prompt: string, images: ImagePart[] = []): string {
+    const { provider, model } = this.structuredTarget(parts)
+    return this.buildResponseCacheKey(kind, model, prompt, images, provider)
+  }
+
+  /**
+   * Streaming generateStructured: field-level updates of the object at `root` as the JSON arrives
+   */
+  private async *generateStructuredStream<T = any>(kind: string, parts: any[], schema: Schema, root: string, signal?: AbortSignal): AsyncGenerator<StructuredUpdate<T>, T, unknown> {
+    const { provider, model } = this.structuredTarget(parts)
+    const source = provider === "ollama"
+      ? this.streamOllama(parts.map(part => part.text).join("\n\n"), signal, "answer", toJsonSchema(schema))
+      : this.streamWithFlash(parts, signal, schema)
+
+    return yield* streamStructuredFields<T>(kind, runStreamPipeline(source, {
+      mode: kind,
+      model,
+      signal,
+    }), root, schema)
+  }
+
+  public async extractProblemFromImages(imagePaths: string[], options: LLMCallOptions = {}) {
+    try {
+      // Build content parts with images (downscaled/recompressed)
+      const images = await this.loadImageParts(imagePaths)
+      const parts: any[] = [...images]
 
       const prompt = `${IMAGE_ANALYSIS_PROMPT}\n\nYou are a wingman. Please analyze these images and extract the following information in JSON format:\n{
   "problem_statement": "A clear statement of the problem or situation depicted in the images.",
@@ -311,17 +721,19 @@ export class LLMHelper {
 
       parts.push({ text: prompt })
 
-      // Use Flash for multimodal (images)
-      const text = await this.generateWithFlash(parts)
-      return JSON.parse(this.cleanJsonResponse(text))
+      const cacheKey = options.bypassCache ? null : this.buildStructuredCacheKey("extract-problem", parts, prompt, images)
+      return await this.withResponseCache(cacheKey, async () => {
+        // Use Flash for multimodal (images)
+        return this.generateStructured("extract-problem", parts, PROBLEM_INFO_SCHEMA, options.signal)
+      })
     } catch (error) {
       // console.error("Error extracting problem from images:", error)
       throw error
     }
   }
 
-  public async generateSolution(problemInfo: any) {
-    const prompt = `${IMAGE_ANALYSIS_PROMPT}\n\nGiven this problem or situation:\n${JSON.stringify(problemInfo, null, 2)}\n\nPlease provide your response in the following JSON format:\n{
+  private buildSolutionPrompt(problemInfo: any): string {
+    return `${IMAGE_ANALYSIS_PROMPT}\n\nGiven this problem or situation:\n${JSON.stringify(problemInfo, null, 2)}\n\nPlease provide your response in the following JSON format:\n{
   "solution": {
     "code": "The code or main answer here.",
     "problem_statement": "Restate the problem or situation.",
@@ -330,82 +742,108 @@ export class LLMHelper {
     "reasoning": "Explanation of why these suggestions are appropriate."
   }
 }\nImportant: Return ONLY the JSON object, without any markdown formatting or code blocks.`
+  }
+
+  private buildDebugPrompt(problemInfo: any, currentCode: string): string {
+    return `${IMAGE_ANALYSIS_PROMPT}\n\nYou are a wingman. Given:\n1. The original problem or situation: ${JSON.stringify(problemInfo, null, 2)}\n2. The current response or approach: ${currentCode}\n3. The debug information in the provided images\n\nPlease analyze the debug information and provide feedback in this JSON format:\n{
+  "solution": {
+    "code": "The code or main answer here.",
+    "problem_statement": "Restate the problem or situation.",
+    "context": "Relevant background/context.",
+    "suggested_responses": ["First possible answer or action", "Second possible answer or action", "..."],
+    "reasoning": "Explanation of why these suggestions are appropriate."
+  }
+}\nImportant: Return ONLY the JSON object, without any markdown formatting or code blocks.`
+  }
+
+  public async generateSolution(problemInfo: any, options: LLMCallOptions = {}) {
+    const prompt = this.buildSolutionPrompt(problemInfo)
 
     // console.log("[LLMHelper] Calling Gemini LLM for solution...");
     try {
-      // Use Flash as default (Pro is experimental)
-      const text = await this.generateWithFlash([{ text: prompt }])
-      // console.log("[LLMHelper] Gemini LLM returned result.");
-      const parsed = JSON.parse(this.cleanJsonResponse(text))
-      // console.log("[LLMHelper] Parsed LLM response:", parsed)
-      return parsed
+      const cacheKey = options.bypassCache ? null : this.buildStructuredCacheKey("solution", [{ text: prompt }], prompt)
+      return await this.withResponseCache(cacheKey, async () => {
+        // Use Flash as default (Pro is experimental)
+        return this.generateStructured("solution", [{ text: prompt }], SOLUTION_SCHEMA, options.signal)
+      })
     } catch (error) {
       // console.error("[LLMHelper] Error in generateSolution:", error);
       throw error;
     }
   }
 
-  public async debugSolutionWithImages(problemInfo: any, currentCode: string, debugImagePaths: string[]) {
-    try {
-      const parts: any[] = []
-
-      for (const imagePath of debugImagePaths) {
-        const imageData = await fs.promises.readFile(imagePath)
-        parts.push({
-          inlineData: {
-            data: imageData.toString("base64"),
-            mimeType: "image/png"
-          }
-        })
+  /**
+   * generateSolution, yielding each `solution` field as it fills in; returns the full result
+   */
+  public async *streamSolution(problemInfo: any, options: LLMCallOptions = {}): AsyncGenerator<StructuredUpdate<any>, any, unknown> {
+    const prompt = this.buildSolutionPrompt(problemInfo)
+    const cacheKey = options.bypassCache ? null : this.buildStructuredCacheKey("solution", [{ text: prompt }], prompt)
+
+    if (cacheKey) {
+      const cached = await this.responseCache.get(cacheKey)
+      if (cached !== undefined) {
+        console.log(`[LLMHelper] Response cache hit (${cacheKey.substring(0, 12)})`)
+        yield { value: cached, fields: { ...cached.solution }, appends: {} }
+        return cached
       }
+    }
 
-      const prompt = `${IMAGE_ANALYSIS_PROMPT}\n\nYou are a wingman. Given:\n1. The original problem or situation: ${JSON.stringify(problemInfo, null, 2)}\n2. The current response or approach: ${currentCode}\n3. The debug information in the provided images\n\nPlease analyze the debug information and provide feedback in this JSON format:\n{
-  "solution": {
-    "code": "The code or main answer here.",
-    "problem_statement": "Restate the problem or situation.",
-    "context": "Relevant background/context.",
-    "suggested_responses": ["First possible answer or action", "Second possible answer or action", "..."],
-    "reasoning": "Explanation of why these suggestions are appropriate."
+    const result = yield* this.generateStructuredStream("solution", [{ text: prompt }], SOLUTION_SCHEMA, "solution", options.signal)
+    if (cacheKey && !isPartialResult(result)) this.responseCache.set(cacheKey, result)
+    return result
   }
-}\nImportant: Return ONLY the JSON object, without any markdown formatting or code blocks.`
 
-      parts.push({ text: prompt })
+  public async debugSolutionWithImages(problemInfo: any, currentCode: string, debugImagePaths: string[], options: LLMCallOptions = {}) {
+    try {
+      const parts: any[] = await this.loadImageParts(debugImagePaths)
+      parts.push({ text: this.buildDebugPrompt(problemInfo, currentCode) })
 
       // Use Flash for multimodal (images)
-      const text = await this.generateWithFlash(parts)
-      const parsed = JSON.parse(this.cleanJsonResponse(text))
-      // console.log("[LLMHelper] Parsed debug LLM response:", parsed)
-      return parsed
+      return await this.generateStructured("debug", parts, SOLUTION_SCHEMA, options.signal)
     } catch (error) {
       // console.error("Error debugging solution with images:", error)
       throw error
     }
   }
 
+  /**
+   * debugSolutionWithImages, yielding each `solution` field as it fills in; returns the full result
+   */
+  public async *streamDebugSolution(problemInfo: any, currentCode: string, debugImagePaths: string[], options: LLMCallOptions = {}): AsyncGenerator<StructuredUpdate<any>, any, unknown> {
+    const parts: any[] = await this.loadImageParts(debugImagePaths)
+    parts.push({ text: this.buildDebugPrompt(problemInfo, currentCode) })
 
+    return yield* this.generateStructuredStream("debug", parts, SOLUTION_SCHEMA, "solution", options.signal)
+  }
 
+  public async analyzeImageFile(imagePath: string, options: LLMCallOptions = {}) {
+    return this.analyzeImageFiles([imagePath], options)
+  }
 
-
-  public async analyzeImageFile(imagePath: string) {
+  /**
+   * Analyze several screenshots (e.g. one problem scrolled across captures) in a single request.
+   * Near-duplicate captures are dropped first; hashes and encodings come from the capture-time cache.
+   */
+  public async analyzeImageFiles(imagePaths: string[], options: LLMCallOptions = {}) {
     try {
-      const imageData = await fs.promises.readFile(imagePath);
-      const prompt = `${HARD_SYSTEM_PROMPT}\n\nDescribe the content of this image in a short, concise answer. If it contains code or a problem, solve it. \n\n${IMAGE_ANALYSIS_PROMPT}`;
-
-      const contents = [
-        { text: prompt },
-        {
-          inlineData: {
-            mimeType: "image/png",
-            data: imageData.toString("base64"),
-          }
-        }
-      ]
+      const { images, dropped } = await this.imagePreprocessor.dedupe(imagePaths)
+      if (dropped.length > 0) {
+        console.log(`[LLMHelper] Dropped ${dropped.length} near-duplicate screenshot(s), sending ${images.length}`)
+      }
+      const imageParts: ImagePart[] = images.map(image => ({ inlineData: { data: image.data, mimeType: image.mimeType } }))
 
+      const prompt = imageParts.length > 1
+        ? `These ${imageParts.length} screenshots were captured in order and may show consecutive parts of the same scrolled page; treat them as one. Describe their content in a short, concise answer. If they contain code or a problem, solve it. \n\n${IMAGE_ANALYSIS_PROMPT}`
+        : `Describe the content of this image in a short, concise answer. If it contains code or a problem, solve it. \n\n${IMAGE_ANALYSIS_PROMPT}`;
+
+      const contents = [{ text: prompt }, ...imageParts]
+
+      const cacheKey = options.bypassCache ? null : this.buildResponseCacheKey("analyze-image", GEMINI_FLASH_MODEL, `${HARD_SYSTEM_PROMPT}\n\n${prompt}`, imageParts)
       // Use Flash for multimodal
-      const text = await this.generateWithFlash(contents)
+      const text = await this.withResponseCache(cacheKey, () => this.generateWithFlash(contents, HARD_SYSTEM_PROMPT, options.signal))
       return { text, timestamp: Date.now() };
     } catch (error) {
-      // console.error("Error analyzing image file:", error);
+      // console.error("Error analyzing image files:", error);
       throw error;
     }
   }
@@ -440,7 +878,7 @@ ANSWER DIRECTLY:`;
 
     try {
       if (this.useOllama) {
-        return await this.callOllama(systemPrompt);
+        return await this.callOllama(systemPrompt, undefined, "whatToAnswer");
       } else if (this.client) {
         // Use Flash model as default (Pro is experimental)
         // Wraps generateWithFlash logic but with retry
@@ -456,71 +894,59 @@ ANSWER DIRECTLY:`;
     }
   }
 
-  public async chatWithGemini(message: string, imagePath?: string, context?: string, skipSystemPrompt: boolean = false): Promise<string> {
+  /**
+   * Chat answer for a message. An identical request already in flight (double-press,
+   * manual click racing an auto-trigger) shares that generation instead of starting another.
+   * Regenerations (bypassCache) always get their own call.
+   */
+  public async chatWithGemini(message: string, imagePath?: string, context?: string, skipSystemPrompt: boolean = false, options: LLMCallOptions = {}): Promise<string> {
+    if (options.bypassCache) {
+      return this.runChat(message, imagePath, context, skipSystemPrompt, options)
+    }
+    const key = this.buildSingleFlightKey("chat", message, imagePath, context, skipSystemPrompt)
+    return this.singleFlight.run(
+      key,
+      (signal) => this.runChat(message, imagePath, context, skipSystemPrompt, { ...options, signal }),
+      options.signal
+    )
+  }
+
+  private async runChat(message: string, imagePath: string | undefined, context: string | undefined, skipSystemPrompt: boolean, options: LLMCallOptions): Promise<string> {
     try {
       console.log(`[LLMHelper] chatWithGemini called with message:`, message.substring(0, 50))
 
-      // Build context-aware prompt
-      let fullMessage = skipSystemPrompt ? message : `${HARD_SYSTEM_PROMPT}\n\n${message}`;
-      if (context) {
-        fullMessage = skipSystemPrompt
-          ? `CONTEXT:\n${context}\n\nUSER QUESTION:\n${message}`
-          : `${HARD_SYSTEM_PROMPT}\n\nCONTEXT:\n${context}\n\nUSER QUESTION:\n${message}`;
-      }
-
-      // Try with current model first
-      let rawResponse = await this.tryGenerateResponse(fullMessage, imagePath);
-
-      // If response is empty/undefined, retry with same model
-      if (!rawResponse || rawResponse.trim().length === 0) {
-        console.warn("[LLMHelper] Empty response, retrying with same model...");
-        rawResponse = await this.tryGenerateResponse(fullMessage, imagePath);
-      }
-
-      // If still empty, retry with Gemini 3 Pro
-      if (!rawResponse || rawResponse.trim().length === 0) {
-        console.warn("[LLMHelper] Still empty after retry, switching to Gemini 3 Pro...");
-        const originalModel = this.geminiModel;
-        this.geminiModel = GEMINI_PRO_MODEL;
-        try {
-          rawResponse = await this.tryGenerateResponse(fullMessage, imagePath);
-        } finally {
-          this.geminiModel = originalModel;
+      const prompt = this.buildChatPrompt(message, context, skipSystemPrompt);
+
+      // A session-mode Ollama turn depends on the meeting's history, which the key doesn't cover,
+      // and a cached reply would never be committed to that history
+      const usesSession = this.useOllama && !imagePath && this.usesOllamaChatSession(prompt);
+      let cacheKey: string | null = null;
+      if (!options.bypassCache && !usesSession) {
+        const images = imagePath ? [await this.imagePreprocessor.toImagePart(imagePath)] : [];
+        cacheKey = this.buildResponseCacheKey("chat", this.getCurrentModel(), flattenChatPrompt(prompt), images);
+        const cached = await this.responseCache.get(cacheKey);
+        if (cached !== undefined) {
+          console.log(`[LLMHelper] Response cache hit (${cacheKey.substring(0, 12)})`);
+          return cached;
         }
       }
 
-      // If still empty after all retries, return error message
-      if (!rawResponse || rawResponse.trim().length === 0) {
-        console.error("[LLMHelper] All retry attempts failed, returning error message");
-        return "I apologize, but I couldn't generate a response. Please try again.";
+      const answer = await this.generateChatAnswer(prompt, imagePath, options.signal);
+      if (answer === null) {
+        return CHAT_FAILURE_MESSAGE;
       }
 
-      try {
-        return this.processResponse(rawResponse);
-      } catch (processError) {
-        // If processResponse throws (e.g., filtered fallback), retry with Pro once
-        console.warn("[LLMHelper] processResponse failed, retrying with Pro model...", processError);
-        const originalModel = this.geminiModel;
-        this.geminiModel = GEMINI_PRO_MODEL;
-        try {
-          const retryResponse = await this.tryGenerateResponse(fullMessage, imagePath);
-          if (retryResponse && retryResponse.trim().length > 0) {
-            try {
-              return this.processResponse(retryResponse);
-            } catch {
-              // If Pro also gets filtered, return full raw response (no truncation)
-              return retryResponse;
-            }
-          }
-        } finally {
-          this.geminiModel = originalModel;
-        }
-        return "I apologize, but I couldn't generate a response. Please try again.";
-      }
+      if (cacheKey) this.responseCache.set(cacheKey, answer);
+      return answer;
     } catch (error: any) {
+      // Cancellation is not a failure to report in the chat
+      if (options.signal?.aborted) throw createAbortError();
       console.error("[LLMHelper] Critical Error in chatWithGemini:", error);
 
       // Return specific English error messages for the UI
+      if (error.message === TRUNCATED_RESPONSE_MESSAGE) {
+        return TRUNCATED_RESPONSE_MESSAGE;
+      }
       if (error.message.includes("503") || error.message.includes("overloaded")) {
         return "The AI service is currently overloaded. Please try again in a moment.";
       }
@@ -531,39 +957,194 @@ ANSWER DIRECTLY:`;
     }
   }
 
-  private async tryGenerateResponse(fullMessage: string, imagePath?: string): Promise<string> {
-    let rawResponse: string;
+  /**
+   * Generate a chat answer.
+   * Gemini requests are hedged: if the primary model hasn't answered by its
+   * latency-budget deadline (or fails/empties before it), the other model is
+   * started and the first usable answer wins; the loser is aborted.
+   * Returns null when every attempt came back empty (nothing worth caching).
+   */
+  private async generateChatAnswer(prompt: ChatPrompt, imagePath?: string, signal?: AbortSignal): Promise<string | null> {
+    // Ollama text chat: single local model, nothing to hedge against
+    if (this.useOllama && !imagePath) {
+      let rawResponse = await this.askOllama(prompt, signal);
+      if (!rawResponse || rawResponse.trim().length === 0) {
+        console.warn("[LLMHelper] Empty Ollama response, retrying once...");
+        rawResponse = await this.askOllama(prompt, signal);
+      }
+      if (!rawResponse || rawResponse.trim().length === 0) return null;
+      try {
+        return this.processResponse(rawResponse);
+      } catch {
+        return rawResponse;
+      }
+    }
 
-    if (imagePath) {
-      const imageData = await fs.promises.readFile(imagePath);
-      const contents = [
-        { text: fullMessage },
-        {
-          inlineData: {
-            mimeType: "image/png",
-            data: imageData.toString("base64")
-          }
-        }
-      ];
+    if (!this.client) throw new Error("No LLM provider configured");
 
-      // Use current model for multimodal (allows Pro fallback)
-      if (this.client) {
-        rawResponse = await this.generateContent(contents);
-      } else {
-        throw new Error("No LLM provider configured");
+    const contents = await this.buildChatContents(prompt.text, imagePath);
+    const systemInstruction = prompt.systemInstruction;
+    const budget = imagePath ? this.hedgeBudgets.multimodal : this.hedgeBudgets.chat;
+
+    const outcome = await this.runRouted<string>(
+      this.geminiModel,
+      budget,
+      (model, attemptSignal) => this.generateContent(contents, model, attemptSignal, systemInstruction),
+      (text) => !!text && text.trim().length > 0,
+      signal
+    );
+
+    if (!outcome) {
+      console.error("[LLMHelper] All hedged attempts returned empty responses");
+      return null;
+    }
+
+    const { value: rawResponse, ...summary } = outcome;
+    this.lastHedgeOutcome = summary;
+    console.log(`[LLMHelper] Chat answered by ${summary.model} (${summary.reason}) in ${summary.latencyMs}ms, hedge deadline ${summary.hedgeDelayMs}ms`);
+
+    try {
+      return this.processResponse(rawResponse);
+    } catch (processError) {
+      // Filtered fallback phrasing: give Pro one chance to answer properly
+      if (summary.model === GEMINI_PRO_MODEL) return rawResponse;
+
+      console.warn("[LLMHelper] processResponse failed, retrying with Pro model...", processError);
+      const retryResponse = await this.generateContent(contents, GEMINI_PRO_MODEL, signal, systemInstruction);
+      if (retryResponse && retryResponse.trim().length > 0) {
+        try {
+          return this.processResponse(retryResponse);
+        } catch {
+          // If Pro also gets filtered, return full raw response (no truncation)
+          return retryResponse;
+        }
       }
-    } else {
-      // Text-only chat
-      if (this.useOllama) {
-        rawResponse = await this.callOllama(fullMessage);
-      } else if (this.client) {
-        rawResponse = await this.generateContent([{ text: fullMessage }])
-      } else {
-        throw new Error("No LLM provider configured");
+      return null;
+    }
+  }
+
+  /**
+   * Run a request on Flash/Pro. The router decides which model goes first (skipping
+   * any whose circuit is open), the hedge scheduler decides when to start the other,
+   * and every attempt's outcome is fed back into the router.
+   */
+  private async runRouted<T>(
+    preferredModel: string,
+    budget: HedgeBudget,
+    run: (model: string, signal: AbortSignal) => Promise<T>,
+    isValid: (value: T) => boolean,
+    signal?: AbortSignal
+  ): Promise<HedgeOutcome<T> | null> {
+    const decision = this.modelRouter.route(preferredModel, otherGeminiModel(preferredModel));
+    if (decision.reason !== "preferred") {
+      console.log(`[LLMHelper] Routing to ${decision.primary} (${decision.reason})`);
+    }
+
+    const hedgeDelayMs = computeHedgeDelay(this.latencyTracker, decision.primary, budget);
+    return runHedged<T>(
+      this.trackedAttempt(decision.primary, run, isValid),
+      decision.backup ? this.trackedAttempt(decision.backup, run, isValid) : null,
+      { hedgeDelayMs, isValid, tracker: this.latencyTracker, signal }
+    );
+  }
+
+  /**
+   * Wrap an attempt so its success/failure/latency reaches the circuit breaker.
+   * Cancelled attempts (hedge losers) are not held against the model.
+   */
+  private trackedAttempt<T>(
+    model: string,
+    run: (model: string, signal: AbortSignal) => Promise<T>,
+    isValid: (value: T) => boolean
+  ): HedgeAttempt<T> {
+    return {
+      model,
+      run: async (signal) => {
+        this.modelRouter.begin(model);
+        const startedAt = Date.now();
+        try {
+          const value = await run(model, signal);
+          if (isValid(value)) {
+            this.modelRouter.recordSuccess(model, Date.now() - startedAt);
+          } else {
+            this.modelRouter.recordFailure(model, "empty response", Date.now() - startedAt);
+          }
+          return value;
+        } catch (error) {
+          if (signal.aborted) {
+            this.modelRouter.recordAborted(model);
+          } else {
+            this.modelRouter.recordFailure(model, error, Date.now() - startedAt);
+          }
+          throw error;
+        }
       }
+    };
+  }
+
+  /**
+   * Circuit state and rolling latency/error stats per Gemini model
+   */
+  public getModelRouterState(): ModelHealth[] {
+    return [GEMINI_FLASH_MODEL, GEMINI_PRO_MODEL].map(model => this.modelRouter.getModelHealth(model));
+  }
+
+  public resetModelRouter(): void {
+    this.modelRouter.reset();
+  }
+
+  /**
+   * HARD_SYSTEM_PROMPT is kept out of the user text so it stays byte-identical across calls
+   */
+  private buildChatPrompt(message: string, context?: string, skipSystemPrompt: boolean = false): ChatPrompt {
+    return {
+      systemInstruction: skipSystemPrompt ? null : HARD_SYSTEM_PROMPT,
+      text: context ? `CONTEXT:\n${context}\n\nUSER QUESTION:\n${message}` : message,
+      message,
+      context
+    }
+  }
+
+  private async buildChatContents(fullMessage: string, imagePath?: string): Promise<any[]> {
+    if (!imagePath) {
+      return [{ text: fullMessage }];
     }
 
-    return rawResponse || "";
+    return [{ text: fullMessage }, await this.imagePreprocessor.toImagePart(imagePath)];
+  }
+
+  /**
+   * Load screenshots as upload-ready parts (resized/recompressed, cached per file)
+   */
+  private async loadImageParts(imagePaths: string[]): Promise<ImagePart[]> {
+    return Promise.all(imagePaths.map(imagePath => this.imagePreprocessor.toImagePart(imagePath)))
+  }
+
+  /**
+   * Encode (and hash) images ahead of a call that will upload them: at capture time,
+   * or to overlap the work with other requests
+   */
+  public async prepareImages(imagePaths: string[]): Promise<void> {
+    try {
+      await this.loadImageParts(imagePaths)
+    } catch (error) {
+      // The call itself will read them again and surface the error
+      console.warn("[LLMHelper] Image preprocessing ahead of upload failed:", error)
+    }
+  }
+
+  /**
+   * Which model answered the most recent hedged chat request, and why
+   */
+  public getLastHedgeOutcome(): HedgeSummary | null {
+    return this.lastHedgeOutcome;
+  }
+
+  /**
+   * Override the latency budget for a hedge mode (e.g. from settings)
+   */
+  public setHedgeBudget(mode: HedgeMode, budget: Partial<HedgeBudget>): void {
+    this.hedgeBudgets[mode] = { ...this.hedgeBudgets[mode], ...budget };
   }
 
   public async chat(message: string): Promise<string> {
@@ -574,66 +1155,82 @@ ANSWER DIRECTLY:`;
    * Stream chat response from Gemini
    * Yields chunks of text as they arrive
    */
-  public async *streamChatWithGemini(message: string, imagePath?: string, context?: string, skipSystemPrompt: boolean = false): AsyncGenerator<string, void, unknown> {
+  public async *streamChatWithGemini(message: string, imagePath?: string, context?: string, skipSystemPrompt: boolean = false, options: LLMCallOptions = {}): AsyncGenerator<string, void, unknown> {
+    // Identical streams in flight share one generation; each subscriber gets every token
+    const key = this.buildSingleFlightKey("chat-stream", message, imagePath, context, skipSystemPrompt)
+    yield* this.singleFlight.stream(
+      key,
+      (signal) => this.runChatStream(message, imagePath, context, skipSystemPrompt, { ...options, signal }),
+      options.signal
+    )
+  }
+
+  private async *runChatStream(message: string, imagePath: string | undefined, context: string | undefined, skipSystemPrompt: boolean, options: LLMCallOptions): AsyncGenerator<string, void, unknown> {
     console.log(`[LLMHelper] streamChatWithGemini called with message:`, message.substring(0, 50));
 
     // Build context-aware prompt
-    // Build context-aware prompt
-    let fullMessage = skipSystemPrompt ? message : `${HARD_SYSTEM_PROMPT}\n\n${message}`;
-    if (context) {
-      fullMessage = skipSystemPrompt
-        ? `CONTEXT:\n${context}\n\nUSER QUESTION:\n${message}`
-        : `${HARD_SYSTEM_PROMPT}\n\nCONTEXT:\n${context}\n\nUSER QUESTION:\n${message}`;
-    }
+    const prompt = this.buildChatPrompt(message, context, skipSystemPrompt);
 
     if (this.useOllama) {
-      // Basic Ollama streaming (simulated for consistency if needed, or implement real streaming)
-      // For now, we'll fall back to non-streaming for Ollama to match current capability
-      // or implement simulated streaming if the user insists.
-      // Given requirements, let's just await the full response and yield it as one chunk for Ollama
-      // UNLESS we want to implement fetch with stream: true for Ollama.
-      // Let's keep it simple: fallback to full response for Ollama for this pass.
-      const response = await this.callOllama(fullMessage);
-      yield response;
+      const fullMessage = flattenChatPrompt(prompt);
+      yield* runStreamPipeline(this.streamOllamaAnswer(prompt, options.signal), {
+        mode: "chat",
+        model: this.ollamaModel,
+        promptTokens: estimateTokens(fullMessage),
+        signal: options.signal,
+      });
       return;
     }
 
     if (!this.client) throw new Error("No LLM provider configured");
 
-    const buildContents = async () => {
-      if (imagePath) {
-        const imageData = await fs.promises.readFile(imagePath);
-        return [
-          { text: fullMessage },
-          {
-            inlineData: {
-              mimeType: "image/png",
-              data: imageData.toString("base64")
-            }
-          }
-        ];
-      }
-      return [{ text: fullMessage }];
-    };
+    const contents = await this.buildChatContents(prompt.text, imagePath);
 
-    const contents = await buildContents();
+    // Skip a model whose circuit is open instead of waiting out its timeout
+    const decision = this.modelRouter.route(this.geminiModel, otherGeminiModel(this.geminiModel));
+    const streamModel = decision.primary;
+    // null when the other model's circuit is open too: no second stream then
+    const streamBackupModel = decision.backup;
 
     try {
-      console.log(`[LLMHelper] [STREAM-V2] Starting stream with model: ${this.geminiModel}`);
+      console.log(`[LLMHelper] [STREAM-V2] Starting stream with model: ${streamModel} (${decision.reason})`);
 
       // Strategy: Race the stream initialization against a timeout
       // If Flash takes > 4000ms to start, we failover to Pro
-      const startStream = async (model: string) => {
-        return await this.client!.models.generateContentStream({
-          model: model,
-          contents: contents,
-          config: {
-            maxOutputTokens: MAX_OUTPUT_TOKENS,
-            temperature: 0.4,
+      const startStream = async (model: string, signal?: AbortSignal) => {
+        const config = {
+          systemInstruction: prompt.systemInstruction || undefined,
+          maxOutputTokens: MAX_OUTPUT_TOKENS,
+          temperature: 0.4,
+          abortSignal: signal,
+        };
+        this.modelRouter.begin(model);
+        const startedAt = Date.now();
+        try {
+          const result = await this.withPromptCache(model, config, (cfg) => this.client!.models.generateContentStream({
+            model: model,
+            contents: contents,
+            config: cfg
+          }));
+          this.modelRouter.recordSuccess(model, Date.now() - startedAt);
+          return result;
+        } catch (error) {
+          if (signal?.aborted) {
+            this.modelRouter.recordAborted(model);
+          } else {
+            this.modelRouter.recordFailure(model, error, Date.now() - startedAt);
           }
-        });
+          throw error;
+        }
       };
 
+      // Aborted when the first model misses its start deadline (or the caller cancels)
+      const timeoutController = new AbortController();
+      const callerSignal = options.signal;
+      const firstSignal = callerSignal ? AbortSignal.any([callerSignal, timeoutController.signal]) : timeoutController.signal;
+
+      const startedAt = Date.now();
+      let servingModel = streamModel;
       let streamResult;
 
       try {
@@ -642,25 +1239,36 @@ ANSWER DIRECTLY:`;
         // We want to failover to Pro QUICKLY if Flash is hanging.
         const timeoutMs = imagePath ? 10000 : 8000;
 
-        console.log(`[LLMHelper] Attempting Flash stream (${this.geminiModel}) with ${timeoutMs}ms timeout...`);
+        console.log(`[LLMHelper] Attempting stream (${streamModel}) with ${timeoutMs}ms timeout...`);
         streamResult = await Promise.race([
-          startStream(this.geminiModel),
+          startStream(streamModel, firstSignal),
           new Promise<'TIMEOUT'>((_, reject) =>
             setTimeout(() => reject(new Error("TIMEOUT")), timeoutMs)
           )
         ]);
       } catch (err: any) {
+        if (callerSignal?.aborted) return;
+
         // If Timeout or Error, try Backup (Pro)
-        console.warn(`[LLMHelper] Flash Stream FAILED. Reason: ${err.message}`);
+        console.warn(`[LLMHelper] ${streamModel} Stream FAILED. Reason: ${err.message}`);
         if (err.message !== "TIMEOUT") {
-          console.error(`[LLMHelper] Full Flash Error Code:`, err);
+          console.error(`[LLMHelper] Full ${streamModel} Error Code:`, err);
+        } else {
+          // A hang counts against the model; cancel it so it can't finish later
+          timeoutController.abort();
+          this.modelRouter.recordFailure(streamModel, err);
         }
 
-        console.warn(`[LLMHelper] Switching to Backup (gemini-3-pro-preview)...`);
-        const GEMINI_PRO_MODEL = "gemini-3-pro-preview";
+        if (!streamBackupModel) {
+          console.warn(`[LLMHelper] No backup model available (${decision.reason}), not retrying`);
+          throw err;
+        }
+
+        console.warn(`[LLMHelper] Switching to Backup (${streamBackupModel})...`);
         try {
-          streamResult = await startStream(GEMINI_PRO_MODEL);
-          console.log(`[LLMHelper] Backup stream (Pro) started successfully.`);
+          streamResult = await startStream(streamBackupModel, callerSignal);
+          servingModel = streamBackupModel;
+          console.log(`[LLMHelper] Backup stream (${streamBackupModel}) started successfully.`);
           // Warn the user via the first token so they know why it was slow? No, seamless is better.
         } catch (backupErr: any) {
           // If Pro also fails, throw original or new error
@@ -669,46 +1277,18 @@ ANSWER DIRECTLY:`;
         }
       }
 
-      // @ts-ignore - SDK typing might be slightly off or version dependent, handle both cases
-      const stream = streamResult.stream || streamResult;
-
-      const streamStartTime = Date.now();
-      let isFirstChunk = true;
-
-      for await (const chunk of stream) {
-        if (isFirstChunk) {
-          const ttfb = Date.now() - streamStartTime;
-          console.log(`[LLMHelper] Stream TTFB: ${ttfb}ms`);
-          isFirstChunk = false;
-        }
-
-        let chunkText = "";
-
-        try {
-          // console.log("[STREAM-DEBUG] Chunk keys:", Object.keys(chunk));
-
-          if (typeof chunk.text === 'function') {
-            chunkText = chunk.text();
-          } else if (typeof chunk.text === 'string') {
-            chunkText = chunk.text;
-          } else if (chunk.candidates?.[0]?.content?.parts?.[0]?.text) {
-            chunkText = chunk.candidates[0].content.parts[0].text;
-          }
-        } catch (err) {
-          console.error("[STREAM-DEBUG] Error extracting text from chunk:", err);
-          console.error("[STREAM-DEBUG] Chunk structure:", JSON.stringify(chunk).substring(0, 200));
-        }
-
-        if (chunkText) {
-          // Check for fallback phrases in the accumulated chunk (simple check)
-          // Real-time filtering is hard, so we do best-effort here.
-          // If we wanted to be strict, we'd buffer, but that adds latency.
-          // We'll yield raw tokens.
-          yield chunkText;
-        }
-      }
+      // TTFT is measured from the first attempt, so a failover shows up in it
+      yield* runStreamPipeline(decodeGeminiStream(streamResult), {
+        mode: "chat",
+        model: servingModel,
+        startedAt,
+        promptTokens: estimateTokens(prompt.text),
+        signal: callerSignal,
+      });
 
     } catch (error: any) {
+      // Caller cancelled: the HTTP stream is already torn down, just stop
+      if (options.signal?.aborted) return;
       console.error("[LLMHelper] Streaming error:", error);
 
       // Simple retry logic for 503s on START (not during stream)
@@ -729,17 +1309,54 @@ ANSWER DIRECTLY:`;
     if (!this.useOllama) return [];
 
     try {
-      const response = await fetch(`${this.ollamaUrl}/api/tags`);
-      if (!response.ok) throw new Error('Failed to fetch models');
-
-      const data = await response.json();
-      return data.models?.map((model: any) => model.name) || [];
+      return await this.ollamaResidency.listModels();
     } catch (error) {
       // console.error("[LLMHelper] Error fetching Ollama models:", error);
       return [];
     }
   }
 
+  /**
+   * Socket pool stats for the shared Ollama transport (reuse, queueing, per-request timings)
+   */
+  public getOllamaPoolStats(): OllamaPoolStats {
+    return this.ollamaTransport.getStats();
+  }
+
+  /**
+   * Whether the current Ollama model is loaded in memory (null when using Gemini)
+   */
+  public async getOllamaResidencyStatus(): Promise<ModelResidencyStatus | null> {
+    if (!this.useOllama) return null;
+    return this.ollamaResidency.getStatus(this.ollamaModel);
+  }
+
+  /**
+   * Prompt evaluation time per Ollama endpoint, and the state of the meeting's chat session
+   */
+  public getOllamaPromptEvalStats(): { endpoints: PromptEvalStats[]; session: OllamaChatSessionStats; options: OllamaOptionsStats } {
+    return {
+      endpoints: promptEvalTracker.getStats(),
+      session: this.ollamaChatSession.getStats(),
+      options: this.ollamaOptions.getStats()
+    };
+  }
+
+  /**
+   * Start the next Ollama chat from an empty history (new meeting)
+   */
+  public resetOllamaChatSession(): void {
+    this.ollamaChatSession.reset();
+  }
+
+  /**
+   * Evict the current Ollama model instead of leaving it pinned for keep_alive after we're gone
+   */
+  public async releaseOllamaModel(): Promise<void> {
+    if (!this.useOllama) return;
+    await this.ollamaResidency.unload(this.ollamaModel);
+  }
+
   public getCurrentProvider(): "ollama" | "gemini" {
     return this.useOllama ? "ollama" : "gemini";
   }
@@ -771,6 +1388,13 @@ ANSWER DIRECTLY:`;
             return this.generateWithFallback(realClient, args);
           };
         }
+        if (prop === 'generateContentStream') {
+          return async (args: any) => {
+            return this.withPromptCache(args.model, args.config, (config) =>
+              realClient.models.generateContentStream({ ...args, config })
+            );
+          };
+        }
         return Reflect.get(target, prop, receiver);
       }
     });
@@ -787,86 +1411,45 @@ ANSWER DIRECTLY:`;
   }
 
   /**
-   * ROBUST GENERATION STRATEGY (SPECULATIVE PARALLEL EXECUTION)
-   * 1. Attempt with original model (Flash).
-   * 2. If it fails/empties:
-   *    - IMMEDIATELY launch two requests in parallel:
-   *      a) Retry Flash (Attempt 2)
-   *      b) Start Pro (Backup)
-   * 3. Return whichever finishes successfully first (prioritizing Flash if both fast).
-   * 4. If both fail, try Flash one last time (Attempt 3).
+   * ROBUST GENERATION STRATEGY (ROUTED + HEDGED EXECUTION)
+   * 1. The router picks the requested model unless its circuit is open, in which
+   *    case the request goes straight to the healthy model (no failure cascade).
+   * 2. If the first model hasn't answered by the "mode" latency budget deadline, or
+   *    fails/empties before then, the other (healthy) model is started in parallel.
+   * 3. Return whichever produces a valid response first; abort the other.
+   * 4. If both fail, try once more on whichever model the router now prefers.
    * 5. If that fails, throw error.
    */
   private async generateWithFallback(client: GoogleGenAI, args: any): Promise<any> {
-    const GEMINI_PRO_MODEL = "gemini-3-pro-preview";
     const originalModel = args.model;
 
-    // Helper to check for valid content
-    const isValidResponse = (response: any) => {
-      const candidate = response.candidates?.[0];
-      if (!candidate) return false;
-      // Check for text content
-      if (response.text && response.text.trim().length > 0) return true;
-      if (candidate.content?.parts?.[0]?.text && candidate.content.parts[0].text.trim().length > 0) return true;
-      if (typeof candidate.content === 'string' && candidate.content.trim().length > 0) return true;
-      return false;
-    };
-
-    // 1. Initial Attempt (Flash)
-    try {
-      const response = await client.models.generateContent({
-        ...args,
-        model: originalModel
-      });
-      if (isValidResponse(response)) return response;
-      console.warn(`[LLMHelper] Initial ${originalModel} call returned empty/invalid response.`);
-    } catch (error: any) {
-      console.warn(`[LLMHelper] Initial ${originalModel} call failed: ${error.message}`);
-    }
-
-    console.log(`[LLMHelper] 🚀 Triggering Speculative Parallel Retry (Flash + Pro)...`);
+    // The mode LLM's own signal cancels every attempt, including the hedge
+    const callerSignal: AbortSignal | undefined = args.config?.abortSignal;
 
-    // 2. Parallel Execution (Retry Flash vs Pro)
-    // We create promises for both but treat them carefully
-    const flashRetryPromise = (async () => {
-      // Small delay before retry to let system settle? No, user said "immediately"
-      try {
-        const res = await client.models.generateContent({ ...args, model: originalModel });
-        if (isValidResponse(res)) return { type: 'flash', res };
-        throw new Error("Empty Flash Response");
-      } catch (e) { throw e; }
-    })();
+    const run = (model: string, signal: AbortSignal) => this.withPromptCache(model, { ...args.config, abortSignal: signal }, (config) =>
+      client.models.generateContent({ ...args, model, config })
+    );
 
-    const proBackupPromise = (async () => {
-      try {
-        // Pro might be slower, but it's the robust backup
-        const res = await client.models.generateContent({ ...args, model: GEMINI_PRO_MODEL });
-        if (isValidResponse(res)) return { type: 'pro', res };
-        throw new Error("Empty Pro Response");
-      } catch (e) { throw e; }
-    })();
-
-    // 3. Race / Fallback Logic
+    // 1-3. Routed, hedged race
     try {
-      // We want Flash if it succeeds, but will accept Pro if Flash fails
-      // If Flash finishes first and success -> return Flash
-      // If Pro finishes first -> wait for Flash? Or return Pro?
-      // User said: "if the gemini 3 flash again fails the gemini 3 pro response can be immediatly displayed"
-      // This implies we prioritize Flash's *result*, but if Flash fails, we want Pro.
-
-      // We use Promise.any to get the first *successful* result
-      const winner = await Promise.any([flashRetryPromise, proBackupPromise]);
-      console.log(`[LLMHelper] Parallel race won by: ${winner.type}`);
-      return winner.res;
-
-    } catch (aggregateError) {
-      console.warn(`[LLMHelper] Both parallel retry attempts failed.`);
+      const outcome = await this.runRouted<any>(originalModel, this.hedgeBudgets.mode, run, isValidGeminiResponse, callerSignal);
+      if (outcome) {
+        if (outcome.reason !== "primary") {
+          console.log(`[LLMHelper] Hedged request won by ${outcome.model} (${outcome.reason}) in ${outcome.latencyMs}ms`);
+        }
+        return outcome.value;
+      }
+      console.warn(`[LLMHelper] All hedged attempts returned empty responses.`);
+    } catch (error: any) {
+      if (callerSignal?.aborted) throw createAbortError();
+      console.warn(`[LLMHelper] All hedged attempts failed: ${error?.message}`);
     }
 
-    // 4. Last Resort: Flash Final Retry
-    console.log(`[LLMHelper] ⚠️ All parallel attempts failed. Trying Flash one last time...`);
+    // 4. Last Resort: Final Retry on the model the router trusts most right now
+    const retryModel = this.modelRouter.route(originalModel, otherGeminiModel(originalModel)).primary;
+    console.log(`[LLMHelper] ⚠️ All hedged attempts failed. Trying ${retryModel} one last time...`);
     try {
-      return await client.models.generateContent({ ...args, model: originalModel });
+      return await this.trackedAttempt(retryModel, run, isValidGeminiResponse).run(callerSignal || new AbortController().signal);
     } catch (finalError) {
       console.error(`[LLMHelper] Final retry failed.`);
       throw finalError;
@@ -874,11 +1457,26 @@ ANSWER DIRECTLY:`;
   }
 
   public async switchToOllama(model?: string, url?: string): Promise<void> {
+    const wasUsingOllama = this.useOllama;
+    const previousModel = this.ollamaModel;
+    const previousUrl = this.ollamaUrl;
+
     this.useOllama = true;
-    if (url) this.ollamaUrl = url;
+    this.connectionWarmer.stop();
+    if (url && url !== previousUrl) {
+      this.ollamaUrl = url;
+      this.ollamaTransport.setBaseUrl(url);
+      this.ollamaResidency.invalidateModels();
+    }
+
+    // Free the memory held by the model we're switching away from
+    if (wasUsingOllama && this.ollamaUrl === previousUrl && model && model !== previousModel) {
+      this.ollamaResidency.unload(previousModel).catch(() => { });
+    }
 
     if (model) {
       this.ollamaModel = model;
+      this.preloadOllamaModel();
     } else {
       // Auto-detect first available model
       await this.initializeOllamaModel();
@@ -893,16 +1491,19 @@ ANSWER DIRECTLY:`;
     }
 
     if (apiKey) {
+      // Handles belong to the previous key's project; reset deletes them through the old client
+      this.promptCache.reset();
       this.apiKey = apiKey;
-      this.client = new GoogleGenAI({
-        apiKey: apiKey,
-        httpOptions: { apiVersion: "v1alpha" }
-      });
+      this.client = this.createGeminiClient(apiKey);
     } else if (!this.client) {
       throw new Error("No Gemini API key provided and no existing client");
     }
 
+    if (this.useOllama) {
+      this.ollamaResidency.unload(this.ollamaModel).catch(() => { });
+    }
     this.useOllama = false;
+    this.connectionWarmer.start();
     // console.log(`[LLMHelper] Switched to Gemini: ${this.geminiModel}`);
   }
 
@@ -913,8 +1514,8 @@ ANSWER DIRECTLY:`;
         if (!available) {
           return { success: false, error: `Ollama not available at ${this.ollamaUrl}` };
         }
-        // Test with a simple prompt
-        await this.callOllama("Hello");
+        // Loading the model proves it works without spending a generation
+        await this.ollamaResidency.preload(this.ollamaModel, this.ollamaOptions.forPreload(this.ollamaModel));
         return { success: true };
       } else {
         if (!this.client) {
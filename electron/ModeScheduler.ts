@@ -0,0 +1,236 @@
+// ModeScheduler.ts
+// Preemptive priority scheduler for the intelligence modes
+// Runs at most `concurrency` mode requests at once; a higher-priority request takes the slot
+// of the lowest-priority one running (aborting its stream), lower ones wait their turn
+
+export interface ModeSchedulerOptions {
+    concurrency: number;
+}
+
+export const DEFAULT_MODE_SCHEDULER_OPTIONS: ModeSchedulerOptions = {
+    // One stream at a time: concurrent modes interleave their tokens in the overlay
+    concurrency: Number(process.env.INTELLIGENCE_CONCURRENCY) || 1,
+};
+
+export interface ModeJobStats {
+    mode: string;
+    submitted: number;
+    started: number;
+    completed: number;
+    preempted: number;      // Aborted to make room for a higher-priority mode
+    superseded: number;     // Replaced by a newer request for the same mode
+    cancelled: number;      // Cancelled explicitly (reset, or a mode that cancels another)
+    avgQueueMs: number | null;
+    maxQueueMs: number | null;
+}
+
+export interface ModeSchedulerStats {
+    concurrency: number;
+    running: string[];
+    queued: string[];
+    modes: ModeJobStats[];
+}
+
+interface Job<M extends string> {
+    mode: M;
+    priority: number;
+    run: (signal: AbortSignal) => Promise<unknown>;
+    resolve: (value: unknown) => void;
+    reject: (error: unknown) => void;
+    submittedAt: number;
+    controller: AbortController | null;
+}
+
+interface ModeCounters {
+    submitted: number;
+    started: number;
+    completed: number;
+    preempted: number;
+    superseded: number;
+    cancelled: number;
+    totalQueueMs: number;
+    maxQueueMs: number | null;
+}
+
+export class ModeScheduler<M extends string> {
+    private options: ModeSchedulerOptions;
+    private queue: Job<M>[] = [];           // Highest priority first, FIFO within a priority
+    private running = new Set<Job<M>>();
+    private counters = new Map<M, ModeCounters>();
+    private activeMode: M | null = null;
+
+    /**
+     * `priorities`: higher runs first and preempts lower.
+     * `onActiveModeChange`: the highest-priority running mode (null when idle).
+     */
+    constructor(
+        private readonly priorities: Record<M, number>,
+        private readonly onActiveModeChange: (mode: M | null) => void = () => { },
+        options: Partial<ModeSchedulerOptions> = {}
+    ) {
+        this.options = { ...DEFAULT_MODE_SCHEDULER_OPTIONS, ...options };
+    }
+
+    /**
+     * Queue a request for `mode`. It replaces any request for the same mode that is
+     * queued or running. Resolves with `run`'s result, or null if it never started.
+     */
+    public submit<T>(mode: M, run: (signal: AbortSignal) => Promise<T>): Promise<T | null> {
+        this.countersFor(mode).submitted++;
+        this.drop(job => job.mode === mode, "superseded");
+
+        return new Promise<T | null>((resolve, reject) => {
+            const job: Job<M> = {
+                mode,
+                priority: this.priorities[mode],
+                run,
+                resolve: resolve as (value: unknown) => void,
+                reject,
+                submittedAt: Date.now(),
+                controller: null,
+            };
+
+            const index = this.queue.findIndex(queued => queued.priority < job.priority);
+            if (index === -1) this.queue.push(job);
+            else this.queue.splice(index, 0, job);
+
+            this.preemptFor(job);
+            this.dispatch();
+        });
+    }
+
+    /**
+     * Abort `mode`'s running request and drop its queued one
+     */
+    public cancel(mode: M): void {
+        this.drop(job => job.mode === mode, "cancelled");
+        this.dispatch();
+    }
+
+    public cancelAll(): void {
+        this.drop(() => true, "cancelled");
+        this.updateActiveMode();
+    }
+
+    public setConcurrency(concurrency: number): void {
+        this.options.concurrency = Math.max(1, Math.floor(concurrency));
+        this.dispatch();
+    }
+
+    public getActiveMode(): M | null {
+        return this.activeMode;
+    }
+
+    public getStats(): ModeSchedulerStats {
+        return {
+            concurrency: this.options.concurrency,
+            running: [...this.running].map(job => job.mode),
+            queued: this.queue.map(job => job.mode),
+            modes: [...this.counters.entries()].map(([mode, c]) => ({
+                mode,
+                submitted: c.submitted,
+                started: c.started,
+                completed: c.completed,
+                preempted: c.preempted,
+                superseded: c.superseded,
+                cancelled: c.cancelled,
+                avgQueueMs: c.started > 0 ? Math.round(c.totalQueueMs / c.started) : null,
+                maxQueueMs: c.maxQueueMs,
+            })),
+        };
+    }
+
+    /**
+     * Free slots for `job` by aborting lower-priority running jobs, lowest first
+     */
+    private preemptFor(job: Job<M>): void {
+        while (this.running.size >= this.options.concurrency) {
+            let lowest: Job<M> | null = null;
+            for (const running of this.running) {
+                if (!lowest || running.priority < lowest.priority) lowest = running;
+            }
+            if (!lowest || lowest.priority >= job.priority) return;
+
+            console.log(`[ModeScheduler] ${job.mode} preempts ${lowest.mode}`);
+            this.countersFor(lowest.mode).preempted++;
+            this.abort(lowest);
+        }
+    }
+
+    private dispatch(): void {
+        while (this.running.size < this.options.concurrency && this.queue.length > 0) {
+            this.start(this.queue.shift()!);
+        }
+        this.updateActiveMode();
+    }
+
+    private start(job: Job<M>): void {
+        const counters = this.countersFor(job.mode);
+        const queueMs = Date.now() - job.submittedAt;
+        counters.started++;
+        counters.totalQueueMs += queueMs;
+        counters.maxQueueMs = Math.max(counters.maxQueueMs ?? 0, queueMs);
+
+        const controller = new AbortController();
+        job.controller = controller;
+        this.running.add(job);
+
+        Promise.resolve()
+            .then(() => job.run(controller.signal))
+            .then(
+                value => {
+                    if (!controller.signal.aborted) counters.completed++;
+                    job.resolve(value);
+                },
+                error => job.reject(error)
+            )
+            .finally(() => {
+                // An aborted job already gave up its slot
+                if (this.running.delete(job)) this.dispatch();
+            });
+    }
+
+    /**
+     * Stop a running job. Its slot is released right away; the job itself
+     * winds down (and resolves) once its stream notices the abort.
+     */
+    private abort(job: Job<M>): void {
+        job.controller?.abort();
+        this.running.delete(job);
+    }
+
+    private drop(match: (job: Job<M>) => boolean, reason: "superseded" | "cancelled"): void {
+        for (const job of [...this.running]) {
+            if (!match(job)) continue;
+            this.countersFor(job.mode)[reason]++;
+            this.abort(job);
+        }
+        this.queue = this.queue.filter(job => {
+            if (!match(job)) return true;
+            this.countersFor(job.mode)[reason]++;
+            job.resolve(null);
+            return false;
+        });
+    }
+
+    private updateActiveMode(): void {
+        let top: Job<M> | null = null;
+        for (const job of this.running) {
+            if (!top || job.priority > top.priority) top = job;
+        }
+        const mode = top ? top.mode : null;
+        if (mode !== this.activeMode) {
+            this.activeMode = mode;
+            this.onActiveModeChange(mode);
+        }
+    }
+
+    private countersFor(mode: M): ModeCounters {
+        let counters = this.counters.get(mode);
+        if (!counters) {
+            counters = { submitted: 0, started: 0, completed: 0, preempted: 0, superseded: 0, cancelled: 0, totalQueueMs: 0, maxQueueMs: null };
+            this.counters.set(mode, counters);
+        }
+        return counters;
+    }
+}
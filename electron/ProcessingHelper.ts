@@ -2,6 +2,7 @@
 
 import { AppState } from "./main"
 import { LLMHelper } from "./LLMHelper"
+import { SolutionStore, SolutionStoreStats } from "./llm/SolutionStore"
 import dotenv from "dotenv"
 
 dotenv.config()
@@ -15,6 +16,8 @@ export class ProcessingHelper {
   private llmHelper: LLMHelper
   private currentProcessingAbortController: AbortController | null = null
   private currentExtraProcessingAbortController: AbortController | null = null
+  // Last solution (or debug result) per problem, reused as the starting point of the next debug round
+  private solutionStore = new SolutionStore()
 
   constructor(appState: AppState) {
     this.appState = appState
@@ -52,15 +55,16 @@ export class ProcessingHelper {
 
 
 
-      const allPaths = this.appState.getScreenshotHelper().getScreenshotQueue();
-      const lastPath = allPaths[allPaths.length - 1];
+      const allPaths = [...screenshotQueue];
 
       // NEW: Handle screenshot as plain text (like audio)
       mainWindow.webContents.send(this.appState.PROCESSING_EVENTS.INITIAL_START)
       this.appState.setView("solutions")
-      this.currentProcessingAbortController = new AbortController()
+      const abortController = new AbortController()
+      this.currentProcessingAbortController = abortController
       try {
-        const imageResult = await this.llmHelper.analyzeImageFile(lastPath);
+        // Every queued screenshot in one request (a long problem is often scrolled across several)
+        const imageResult = await this.llmHelper.analyzeImageFiles(allPaths, { signal: abortController.signal });
         const problemInfo = {
           problem_statement: imageResult.text,
           input_format: { description: "Generated from screenshot", parameters: [] as any[] },
@@ -74,9 +78,14 @@ export class ProcessingHelper {
         this.appState.setProblemInfo(problemInfo);
       } catch (error: any) {
         // console.error("Image processing error:", error)
-        mainWindow.webContents.send(this.appState.PROCESSING_EVENTS.INITIAL_SOLUTION_ERROR, error.message)
+        // A cancelled request (queue reset) is not an error worth surfacing
+        if (!abortController.signal.aborted) {
+          mainWindow.webContents.send(this.appState.PROCESSING_EVENTS.INITIAL_SOLUTION_ERROR, error.message)
+        }
       } finally {
-        this.currentProcessingAbortController = null
+        if (this.currentProcessingAbortController === abortController) {
+          this.currentProcessingAbortController = null
+        }
       }
       return;
     } else {
@@ -89,7 +98,8 @@ export class ProcessingHelper {
       }
 
       mainWindow.webContents.send(this.appState.PROCESSING_EVENTS.DEBUG_START)
-      this.currentExtraProcessingAbortController = new AbortController()
+      const abortController = new AbortController()
+      this.currentExtraProcessingAbortController = abortController
 
       try {
         // Get problem info and current solution
@@ -98,31 +108,60 @@ export class ProcessingHelper {
           throw new Error("No problem info available")
         }
 
-        // Get current solution from state
-        const currentSolution = await this.llmHelper.generateSolution(problemInfo)
+        // Encode the debug screenshots while the current solution is looked up (or regenerated)
+        const imagesReady = this.llmHelper.prepareImages(extraScreenshotQueue)
+
+        // Current solution: the last solution or debug result for this problem, generated only on the first round
+        let currentSolution = this.solutionStore.get(problemInfo)?.result
+        if (!currentSolution) {
+          // Stream each field to the Solutions view as it arrives
+          const solutionStream = this.llmHelper.streamSolution(problemInfo, { signal: abortController.signal })
+          let step = await solutionStream.next()
+          while (!step.done) {
+            mainWindow.webContents.send(this.appState.PROCESSING_EVENTS.SOLUTION_PARTIAL, { fields: step.value.fields, appends: step.value.appends })
+            step = await solutionStream.next()
+          }
+          currentSolution = step.value
+          this.solutionStore.set(problemInfo, currentSolution, "solution")
+          mainWindow.webContents.send(this.appState.PROCESSING_EVENTS.SOLUTION_SUCCESS, currentSolution)
+        }
         const currentCode = currentSolution.solution.code
+        await imagesReady
 
-        // Debug the solution using vision model
-        const debugResult = await this.llmHelper.debugSolutionWithImages(
+        // Debug the solution using vision model, streamed the same way
+        mainWindow.webContents.send(this.appState.PROCESSING_EVENTS.DEBUG_PARTIAL, { fields: { old_code: currentCode } })
+        const debugStream = this.llmHelper.streamDebugSolution(
           problemInfo,
           currentCode,
-          extraScreenshotQueue
+          extraScreenshotQueue,
+          { signal: abortController.signal }
         )
+        let debugStep = await debugStream.next()
+        while (!debugStep.done) {
+          mainWindow.webContents.send(this.appState.PROCESSING_EVENTS.DEBUG_PARTIAL, { fields: debugStep.value.fields, appends: debugStep.value.appends })
+          debugStep = await debugStream.next()
+        }
+        const debugResult = debugStep.value
+        this.solutionStore.set(problemInfo, debugResult, "debug")
 
         this.appState.setHasDebugged(true)
         mainWindow.webContents.send(
           this.appState.PROCESSING_EVENTS.DEBUG_SUCCESS,
-          debugResult
+          { ...debugResult, solution: { ...debugResult.solution, old_code: currentCode } }
         )
 
       } catch (error: any) {
         // console.error("Debug processing error:", error)
-        mainWindow.webContents.send(
-          this.appState.PROCESSING_EVENTS.DEBUG_ERROR,
-          error.message
-        )
+        if (!abortController.signal.aborted) {
+          mainWindow.webContents.send(
+            this.appState.PROCESSING_EVENTS.DEBUG_ERROR,
+            error.message
+          )
+        }
       } finally {
-        this.currentExtraProcessingAbortController = null
+        if (this.currentExtraProcessingAbortController === abortController) {
+          this.currentExtraProcessingAbortController = null
+        }
       }
     }
   }
@@ -139,6 +178,11 @@ export class ProcessingHelper {
     }
 
     this.appState.setHasDebugged(false)
+    this.solutionStore.clear()
+  }
+
+  public getSolutionStoreStats(): SolutionStoreStats {
+    return this.solutionStore.getStats()
   }
 
 
@@ -6,6 +6,8 @@ import { app } from "electron"
 import { v4 as uuidv4 } from "uuid"
 import screenshot from "screenshot-desktop"
 import util from "util"
+import { encodedImageCache } from "./EncodedImageCache"
+
 export class ScreenshotHelper {
   private screenshotQueue: string[] = []
   private extraScreenshotQueue: string[] = []
@@ -54,6 +56,7 @@ export class ScreenshotHelper {
   public clearQueues(): void {
     // Clear screenshotQueue
     this.screenshotQueue.forEach((screenshotPath) => {
+      encodedImageCache.invalidate(screenshotPath)
       fs.unlink(screenshotPath, (err) => {
         if (err) {
           // console.error(`Error deleting screenshot at ${screenshotPath}:`, err)
@@ -64,6 +67,7 @@ export class ScreenshotHelper {
 
     // Clear extraScreenshotQueue
     this.extraScreenshotQueue.forEach((screenshotPath) => {
+      encodedImageCache.invalidate(screenshotPath)
       fs.unlink(screenshotPath, (err) => {
         if (err) {
           // console.error(
@@ -101,6 +105,7 @@ export class ScreenshotHelper {
         if (this.screenshotQueue.length > this.MAX_SCREENSHOTS) {
           const removedPath = this.screenshotQueue.shift()
           if (removedPath) {
+            encodedImageCache.invalidate(removedPath)
             try {
               await fs.promises.unlink(removedPath)
             } catch (error) {
@@ -116,6 +121,7 @@ export class ScreenshotHelper {
         if (this.extraScreenshotQueue.length > this.MAX_SCREENSHOTS) {
           const removedPath = this.extraScreenshotQueue.shift()
           if (removedPath) {
+            encodedImageCache.invalidate(removedPath)
             try {
               await fs.promises.unlink(removedPath)
             } catch (error) {
@@ -183,8 +189,9 @@ export class ScreenshotHelper {
           // Double check file size is > 0
           const stats = await fs.promises.stat(filepath)
           if (stats.size > 0) {
-            const data = await fs.promises.readFile(filepath)
-            return `data:image/png;base64,${data.toString("base64")}`
+            // Shared with LLMHelper uploads - encoded once per file version
+            const image = await encodedImageCache.getOriginal(filepath)
+            return `data:${image.mimeType};base64,${image.data}`
           }
         }
       } catch (error) {
@@ -202,6 +209,7 @@ export class ScreenshotHelper {
   ): Promise<{ success: boolean; error?: string }> {
     try {
       await fs.promises.unlink(path)
+      encodedImageCache.invalidate(path)
       if (this.view === "queue") {
         this.screenshotQueue = this.screenshotQueue.filter(
           (filePath) => filePath !== path
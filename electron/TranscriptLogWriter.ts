@@ -0,0 +1,172 @@
+// TranscriptLogWriter.ts
+// Async, batched append-only writer for the session transcript log
+// Lines are queued in memory and written off the main thread's critical path, in batches
+
+import fs from "fs";
+
+export interface TranscriptLogWriterOptions {
+    maxQueueEntries: number;    // Bounded queue; lines beyond this are dropped (and counted) while the disk is stalled
+    flushBytes: number;         // Write as soon as this much is queued
+    flushIntervalMs: number;    // Otherwise write what is queued after this long
+    closeTimeoutMs: number;     // Longest close() waits for the final write
+}
+
+export const DEFAULT_TRANSCRIPT_LOG_WRITER_OPTIONS: TranscriptLogWriterOptions = {
+    maxQueueEntries: 2000,
+    flushBytes: 16 * 1024,
+    flushIntervalMs: 1000,
+    closeTimeoutMs: 2000,
+};
+
+export interface TranscriptLogWriterStats {
+    path: string;
+    queueDepth: number;
+    queuedBytes: number;
+    maxQueueDepth: number;      // High-water mark
+    written: number;            // Entries on disk
+    batches: number;
+    dropped: number;
+    failures: number;
+    lastWriteMs: number | null;
+    avgWriteMs: number | null;
+    maxWriteMs: number | null;
+}
+
+export class TranscriptLogWriter {
+    private options: TranscriptLogWriterOptions;
+    private queue: string[] = [];
+    private queuedBytes = 0;
+    private created = false;            // First write truncates/creates the file
+    private writing: Promise<void> | null = null;
+    private timer: NodeJS.Timeout | null = null;
+
+    private maxQueueDepth = 0;
+    private written = 0;
+    private batches = 0;
+    private dropped = 0;
+    private failures = 0;
+    private lastWriteMs: number | null = null;
+    private totalWriteMs = 0;
+    private maxWriteMs: number | null = null;
+
+    constructor(public readonly path: string, options: Partial<TranscriptLogWriterOptions> = {}) {
+        this.options = { ...DEFAULT_TRANSCRIPT_LOG_WRITER_OPTIONS, ...options };
+    }
+
+    /**
+     * Start the file with `header` (replacing any previous content)
+     */
+    public start(header: string): void {
+        this.queue.unshift(header);
+        this.queuedBytes += Buffer.byteLength(header);
+        this.schedule();
+    }
+
+    public append(entry: string): void {
+        if (this.queue.length >= this.options.maxQueueEntries) {
+            if (this.dropped === 0) {
+                console.warn(`[TranscriptLogWriter] Queue full (${this.queue.length} entries), dropping lines until the disk catches up`);
+            }
+            this.dropped++;
+            return;
+        }
+
+        this.queue.push(entry);
+        this.queuedBytes += Buffer.byteLength(entry);
+        this.maxQueueDepth = Math.max(this.maxQueueDepth, this.queue.length);
+        this.schedule();
+    }
+
+    /**
+     * Write everything queued so far; resolves once it is on disk (or failed)
+     */
+    public async flush(): Promise<void> {
+        this.clearTimer();
+        while (this.writing || this.queue.length > 0) {
+            if (!this.writing) this.writing = this.writeBatch();
+            await this.writing;
+        }
+    }
+
+    /**
+     * Final flush (on quit), bounded so a stalled disk cannot hold the app open
+     */
+    public async close(): Promise<void> {
+        let timeout: NodeJS.Timeout | null = null;
+        await Promise.race([
+            this.flush(),
+            new Promise<void>(resolve => {
+                timeout = setTimeout(() => {
+                    console.warn(`[TranscriptLogWriter] Gave up flushing after ${this.options.closeTimeoutMs}ms (${this.queue.length} entries unwritten)`);
+                    resolve();
+                }, this.options.closeTimeoutMs);
+            }),
+        ]);
+        if (timeout) clearTimeout(timeout);
+    }
+
+    public getStats(): TranscriptLogWriterStats {
+        return {
+            path: this.path,
+            queueDepth: this.queue.length,
+            queuedBytes: this.queuedBytes,
+            maxQueueDepth: this.maxQueueDepth,
+            written: this.written,
+            batches: this.batches,
+            dropped: this.dropped,
+            failures: this.failures,
+            lastWriteMs: this.lastWriteMs,
+            avgWriteMs: this.batches > 0 ? Math.round((this.totalWriteMs / this.batches) * 10) / 10 : null,
+            maxWriteMs: this.maxWriteMs,
+        };
+    }
+
+    private schedule(): void {
+        if (this.queuedBytes >= this.options.flushBytes) {
+            this.flush().catch(() => { });
+            return;
+        }
+        if (this.timer) return;
+        this.timer = setTimeout(() => {
+            this.timer = null;
+            this.flush().catch(() => { });
+        }, this.options.flushIntervalMs);
+        // A pending log write should not keep the process alive on its own
+        this.timer.unref?.();
+    }
+
+    private clearTimer(): void {
+        if (this.timer) {
+            clearTimeout(this.timer);
+            this.timer = null;
+        }
+    }
+
+    private async writeBatch(): Promise<void> {
+        const entries = this.queue;
+        this.queue = [];
+        this.queuedBytes = 0;
+
+        const startedAt = Date.now();
+        try {
+            const data = entries.join("");
+            if (this.created) {
+                await fs.promises.appendFile(this.path, data, "utf8");
+            } else {
+                await fs.promises.writeFile(this.path, data, "utf8");
+                this.created = true;
+            }
+            this.written += entries.length;
+        } catch (err) {
+            this.failures++;
+            console.warn(`[TranscriptLogWriter] Failed to write ${entries.length} entries to ${this.path}:`, err);
+        } finally {
+            const elapsed = Date.now() - startedAt;
+            this.batches++;
+            this.lastWriteMs = elapsed;
+            this.totalWriteMs += elapsed;
+            this.maxWriteMs = Math.max(this.maxWriteMs ?? 0, elapsed);
+            this.writing = null;
+        }
+    }
+}
@@ -3,6 +3,7 @@
 import { app, ipcMain, shell } from "electron"
 import { AppState } from "./main"
 import { GEMINI_FLASH_MODEL, GEMINI_PRO_MODEL } from "./IntelligenceManager"
+import { promptSizeTracker, streamMetricsTracker, structuredOutputTracker } from "./llm"
 
 export function initializeIpcHandlers(appState: AppState): void {
   ipcMain.handle(
@@ -113,9 +114,9 @@ export function initializeIpcHandlers(appState: AppState): void {
     }
   })
 
-  ipcMain.handle("gemini-chat", async (event, message: string, imagePath?: string, context?: string, options?: { skipSystemPrompt?: boolean }) => {
+  ipcMain.handle("gemini-chat", async (event, message: string, imagePath?: string, context?: string, options?: { skipSystemPrompt?: boolean; bypassCache?: boolean }) => {
     try {
-      const result = await appState.processingHelper.getLLMHelper().chatWithGemini(message, imagePath, context, options?.skipSystemPrompt);
+      const result = await appState.processingHelper.getLLMHelper().chatWithGemini(message, imagePath, context, options?.skipSystemPrompt, { bypassCache: options?.bypassCache });
 
       console.log(`[IPC] gemini-chat response:`, result ? result.substring(0, 50) : "(empty)");
 
@@ -249,7 +250,8 @@ export function initializeIpcHandlers(appState: AppState): void {
       return {
         provider: llmHelper.getCurrentProvider(),
         model: llmHelper.getCurrentModel(),
-        isOllama: llmHelper.isUsingOllama()
+        isOllama: llmHelper.isUsingOllama(),
+        residency: await llmHelper.getOllamaResidencyStatus()
       };
     } catch (error: any) {
       // console.error("Error getting current LLM config:", error);
@@ -268,6 +270,140 @@ export function initializeIpcHandlers(appState: AppState): void {
     }
   });
 
+  ipcMain.handle("get-ollama-pool-stats", async () => {
+    try {
+      const llmHelper = appState.processingHelper.getLLMHelper();
+      return llmHelper.getOllamaPoolStats();
+    } catch (error: any) {
+      throw error;
+    }
+  });
+
+  ipcMain.handle("get-ollama-prompt-eval-stats", async () => {
+    try {
+      const llmHelper = appState.processingHelper.getLLMHelper();
+      return llmHelper.getOllamaPromptEvalStats();
+    } catch (error: any) {
+      throw error;
+    }
+  });
+
+  ipcMain.handle("get-response-cache-stats", async () => {
+    try {
+      const llmHelper = appState.processingHelper.getLLMHelper();
+      return llmHelper.getResponseCacheStats();
+    } catch (error: any) {
+      throw error;
+    }
+  });
+
+  ipcMain.handle("get-prompt-cache-stats", async () => {
+    try {
+      const llmHelper = appState.processingHelper.getLLMHelper();
+      return llmHelper.getPromptCacheStats();
+    } catch (error: any) {
+      throw error;
+    }
+  });
+
+  ipcMain.handle("get-prompt-size-stats", async () => {
+    try {
+      return promptSizeTracker.getStats();
+    } catch (error: any) {
+      throw error;
+    }
+  });
+
+  ipcMain.handle("get-stream-metrics", async () => {
+    try {
+      return {
+        modes: streamMetricsTracker.getStats(),
+        recent: streamMetricsTracker.getRecent()
+      };
+    } catch (error: any) {
+      throw error;
+    }
+  });
+
+  ipcMain.handle("get-structured-output-stats", async () => {
+    try {
+      return structuredOutputTracker.getStats();
+    } catch (error: any) {
+      throw error;
+    }
+  });
+
+  ipcMain.handle("get-solution-store-stats", async () => {
+    try {
+      return appState.processingHelper.getSolutionStoreStats();
+    } catch (error: any) {
+      throw error;
+    }
+  });
+
+  ipcMain.handle("get-connection-warmer-stats", async () => {
+    try {
+      const llmHelper = appState.processingHelper.getLLMHelper();
+      return llmHelper.getConnectionWarmerStats();
+    } catch (error: any) {
+      throw error;
+    }
+  });
+
+  ipcMain.handle("get-single-flight-stats", async () => {
+    try {
+      return {
+        llm: appState.processingHelper.getLLMHelper().getSingleFlightStats(),
+        intelligence: appState.getIntelligenceManager().getSingleFlightStats()
+      };
+    } catch (error: any) {
+      throw error;
+    }
+  });
+
+  ipcMain.handle("get-formatted-context-stats", async () => {
+    try {
+      return appState.getIntelligenceManager().getFormattedContextStats();
+    } catch (error: any) {
+      throw error;
+    }
+  });
+
+  ipcMain.handle("get-transcript-log-stats", async () => {
+    try {
+      return appState.getIntelligenceManager().getTranscriptLogStats();
+    } catch (error: any) {
+      throw error;
+    }
+  });
+
+  ipcMain.handle("get-mode-scheduler-stats", async () => {
+    try {
+      return appState.getIntelligenceManager().getModeSchedulerStats();
+    } catch (error: any) {
+      throw error;
+    }
+  });
+
+  ipcMain.handle("get-model-router-state", async () => {
+    try {
+      const llmHelper = appState.processingHelper.getLLMHelper();
+      return llmHelper.getModelRouterState();
+    } catch (error: any) {
+      throw error;
+    }
+  });
+
+  ipcMain.handle("reset-model-router", async () => {
+    try {
+      const llmHelper = appState.processingHelper.getLLMHelper();
+      llmHelper.resetModelRouter();
+      return { success: true };
+    } catch (error: any) {
+      return { success: false, error: error.message };
+    }
+  });
+
   ipcMain.handle("switch-to-ollama", async (_, model?: string, url?: string) => {
     try {
       const llmHelper = appState.processingHelper.getLLMHelper();
@@ -437,6 +573,8 @@ export function initializeIpcHandlers(appState: AppState): void {
     try {
       const intelligenceManager = appState.getIntelligenceManager();
       intelligenceManager.reset();
+      // A new conversation shouldn't carry the previous one's Ollama chat history
+      appState.processingHelper.getLLMHelper().resetOllamaChatSession();
       return { success: true };
     } catch (error: any) {
       return { success: false, error: error.message };
@@ -24,14 +24,16 @@ export class AnswerLLM {
      * @param context - Optional conversation context
      * @returns Spoken answer (no post-clamp; prompt enforces brevity)
      */
-    async generate(question: string, context?: string): Promise<string> {
+    async generate(question: string, context?: string, signal?: AbortSignal): Promise<string> {
         try {
-            const contents = buildContents(ANSWER_MODE_PROMPT, question, context);
+            const { systemInstruction, contents } = buildContents(ANSWER_MODE_PROMPT, question, context);
 
             const response = await this.client.models.generateContent({
                 model: this.modelName,
                 contents: contents,
                 config: {
+                    systemInstruction,
+                    abortSignal: signal,
                     maxOutputTokens: this.config.maxOutputTokens,
                     temperature: this.config.temperature,
                     topP: this.config.topP,
@@ -46,6 +48,7 @@ export class AnswerLLM {
             return rawText.trim();
 
         } catch (error) {
+            if (signal?.aborted) return "";
             // Silent failure - return empty for safety
             console.error("[AnswerLLM] Generation failed:", error);
             return "";
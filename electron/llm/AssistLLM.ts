@@ -23,22 +23,25 @@ export class AssistLLM {
      * @param context - Current conversation context
      * @returns Insight (no post-clamp; prompt enforces brevity)
      */
-    async generate(context: string): Promise<string> {
+    async generate(context: string, signal?: AbortSignal): Promise<string> {
         try {
             if (!context.trim()) {
                 return "";
             }
 
-            const contents = buildContents(
+            const { systemInstruction, contents } = buildContents(
                 ASSIST_MODE_PROMPT,
                 "What's happening in this conversation right now?",
-                context
+                context,
+                "assist"
             );
 
             const response = await this.client.models.generateContent({
                 model: this.modelName,
                 contents: contents,
                 config: {
+                    systemInstruction,
+                    abortSignal: signal,
                     maxOutputTokens: this.config.maxOutputTokens,
                     temperature: this.config.temperature,
                     topP: this.config.topP,
@@ -53,6 +56,7 @@ export class AssistLLM {
             return rawText.trim();
 
         } catch (error) {
+            if (signal?.aborted) return "";
             console.error("[AssistLLM] Generation failed:", error);
             return "";
         }
@@ -0,0 +1,177 @@
+// electron/llm/ConnectionWarmer.ts
+// Pre-warms and keeps warm the connection to the Gemini endpoint
+// The SDK goes through Node's global fetch, whose keep-alive pool (plus DNS and TLS session caches)
+// is what a cheap probe fills; the first real question then skips DNS + TCP + TLS setup
+
+export interface ConnectionWarmerOptions {
+    enabled: boolean;
+    intervalMs: number;         // How often to check whether a keep-warm probe is due
+    idleMs: number;             // Probe only after this long without any traffic to the endpoint
+    warmWindowMs: number;       // A request within this long of the last exchange counts as warm
+    probeTimeoutMs: number;
+}
+
+export const DEFAULT_CONNECTION_WARMER_OPTIONS: ConnectionWarmerOptions = {
+    enabled: process.env.GEMINI_PREWARM !== "false",
+    intervalMs: Number(process.env.GEMINI_KEEPWARM_INTERVAL_MS) || 30 * 1000,
+    idleMs: 25 * 1000,
+    warmWindowMs: 45 * 1000,
+    probeTimeoutMs: 5000,
+};
+
+export type ConnectionState = "cold" | "warm";
+
+export interface WarmerEndpoint {
+    baseUrl: string;
+    apiVersion: string;
+    apiKey: string;
+}
+
+export interface TtftSummary {
+    requests: number;
+    p50Ms: number | null;
+    p95Ms: number | null;
+}
+
+export interface ConnectionWarmerStats {
+    enabled: boolean;
+    probes: number;
+    probeFailures: number;
+    lastProbeMs: number | null;
+    lastProbeAt: number | null;
+    lastActivityAt: number | null;
+    cold: TtftSummary;
+    warm: TtftSummary;
+}
+
+const MAX_TTFT_SAMPLES = 200;
+
+export class ConnectionWarmer {
+    private options: ConnectionWarmerOptions;
+    private getEndpoint: () => WarmerEndpoint | null;
+    private timer: NodeJS.Timeout | null = null;
+    private probing: Promise<void> | null = null;
+    private lastActivityAt: number | null = null;
+
+    private probes = 0;
+    private probeFailures = 0;
+    private lastProbeMs: number | null = null;
+    private lastProbeAt: number | null = null;
+    private ttft: Record<ConnectionState, number[]> = { cold: [], warm: [] };
+
+    constructor(getEndpoint: () => WarmerEndpoint | null, options: Partial<ConnectionWarmerOptions> = {}) {
+        this.getEndpoint = getEndpoint;
+        this.options = { ...DEFAULT_CONNECTION_WARMER_OPTIONS, ...options };
+    }
+
+    /**
+     * Warm up now and keep the connection warm while idle
+     */
+    public start(): void {
+        if (!this.options.enabled) return;
+        this.stop();
+        this.warm();
+        this.timer = setInterval(() => {
+            const idleFor = this.lastActivityAt === null ? Infinity : Date.now() - this.lastActivityAt;
+            if (idleFor >= this.options.idleMs) this.warm();
+        }, this.options.intervalMs);
+        // Never keep the process alive just to stay warm
+        this.timer.unref?.();
+    }
+
+    public stop(): void {
+        if (this.timer) {
+            clearInterval(this.timer);
+            this.timer = null;
+        }
+    }
+
+    /**
+     * Fire a probe unless one is already running (e.g. on resume from sleep)
+     */
+    public warm(): Promise<void> {
+        if (!this.options.enabled) return Promise.resolve();
+        if (!this.probing) {
+            this.probing = this.probe().finally(() => { this.probing = null; });
+        }
+        return this.probing;
+    }
+
+    /**
+     * Called when a real request goes out; returns whether it found the connection warm
+     */
+    public noteRequest(): ConnectionState {
+        const state = this.isWarm() ? "warm" : "cold";
+        this.lastActivityAt = Date.now();
+        return state;
+    }
+
+    public recordTtft(state: ConnectionState, ms: number): void {
+        const samples = this.ttft[state];
+        samples.push(ms);
+        if (samples.length > MAX_TTFT_SAMPLES) samples.shift();
+    }
+
+    public getStats(): ConnectionWarmerStats {
+        return {
+            enabled: this.options.enabled,
+            probes: this.probes,
+            probeFailures: this.probeFailures,
+            lastProbeMs: this.lastProbeMs,
+            lastProbeAt: this.lastProbeAt,
+            lastActivityAt: this.lastActivityAt,
+            cold: summarize(this.ttft.cold),
+            warm: summarize(this.ttft.warm),
+        };
+    }
+
+    private isWarm(): boolean {
+        return this.lastActivityAt !== null && Date.now() - this.lastActivityAt < this.options.warmWindowMs;
+    }
+
+    /**
+     * GET /{version}/models?pageSize=1 - authenticated, no generation, no tokens billed
+     */
+    private async probe(): Promise<void> {
+        const endpoint = this.getEndpoint();
+        if (!endpoint) return;
+
+        const url = `${endpoint.baseUrl.replace(/\/+$/, "")}/${endpoint.apiVersion}/models?pageSize=1`;
+        const startedAt = Date.now();
+        try {
+            const res = await fetch(url, {
+                headers: { "x-goog-api-key": endpoint.apiKey },
+                signal: AbortSignal.timeout(this.options.probeTimeoutMs),
+            });
+            // Read the body to the end so the socket goes back to the keep-alive pool
+            await res.arrayBuffer();
+            this.lastProbeMs = Date.now() - startedAt;
+            this.lastActivityAt = Date.now();
+            this.probes++;
+            if (!res.ok) {
+                // Still warms DNS/TCP/TLS, but a bad key is worth knowing about
+                console.warn(`[ConnectionWarmer] Probe returned ${res.status} in ${this.lastProbeMs}ms`);
+            }
+        } catch (err: any) {
+            this.probeFailures++;
+            console.warn(`[ConnectionWarmer] Probe failed:`, err?.message);
+        } finally {
+            this.lastProbeAt = Date.now();
+        }
+    }
+}
+
+function summarize(samples: number[]): TtftSummary {
+    const sorted = [...samples].sort((a, b) => a - b);
+    return {
+        requests: sorted.length,
+        p50Ms: percentile(sorted, 0.5),
+        p95Ms: percentile(sorted, 0.95),
+    };
+}
+
+function percentile(sorted: number[], p: number): number | null {
+    if (sorted.length === 0) return null;
+    const index = Math.min(sorted.length - 1, Math.max(0, Math.ceil(p * sorted.length) - 1));
+    return sorted[index];
+}
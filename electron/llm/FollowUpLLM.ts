@@ -5,7 +5,8 @@
 import { GoogleGenAI } from "@google/genai";
 import { MODE_CONFIGS } from "./types";
 import { buildFollowUpContents } from "./prompts";
-import { clampResponse } from "./postProcessor";
+import { clampResponse, PREFIXES } from "./postProcessor";
+import { decodeGeminiStream, runStreamPipeline } from "./streamPipeline";
 
 const GEMINI_FLASH_MODEL = "gemini-3-flash-preview";
 
@@ -29,14 +30,15 @@ export class FollowUpLLM {
     async generate(
         previousAnswer: string,
         refinementRequest: string,
-        context?: string
+        context?: string,
+        signal?: AbortSignal
     ): Promise<string> {
         try {
             if (!previousAnswer.trim()) {
                 return "";
             }
 
-            const contents = buildFollowUpContents(
+            const { systemInstruction, contents } = buildFollowUpContents(
                 previousAnswer,
                 refinementRequest,
                 context
@@ -46,6 +48,8 @@ export class FollowUpLLM {
                 model: this.modelName,
                 contents: contents,
                 config: {
+                    systemInstruction,
+                    abortSignal: signal,
                     maxOutputTokens: this.config.maxOutputTokens,
                     temperature: this.config.temperature,
                     topP: this.config.topP,
@@ -61,6 +65,7 @@ export class FollowUpLLM {
             return rawText;
 
         } catch (error) {
+            if (signal?.aborted) return "";
             console.error("[FollowUpLLM] Generation failed:", error);
             return "";
         }
@@ -72,7 +77,8 @@ export class FollowUpLLM {
     async *generateStream(
         previousAnswer: string,
         refinementRequest: string,
-        context?: string
+        context?: string,
+        signal?: AbortSignal
     ): AsyncGenerator<string> {
         try {
             if (!previousAnswer.trim()) {
@@ -80,7 +86,7 @@ export class FollowUpLLM {
                 return;
             }
 
-            const contents = buildFollowUpContents(
+            const { systemInstruction, contents, report } = buildFollowUpContents(
                 previousAnswer,
                 refinementRequest,
                 context
@@ -88,36 +94,31 @@ export class FollowUpLLM {
 
             console.log(`[FollowUpLLM] Starting stream with model: ${this.modelName}`);
 
+            const startedAt = Date.now();
             const streamResult = await this.client.models.generateContentStream({
                 model: this.modelName,
                 contents: contents,
                 config: {
+                    systemInstruction,
+                    abortSignal: signal,
                     maxOutputTokens: this.config.maxOutputTokens,
                     temperature: this.config.temperature,
                     topP: this.config.topP,
                 },
             });
 
-            // @ts-ignore
-            const stream = streamResult.stream || streamResult;
-
-            for await (const chunk of stream) {
-                let text = "";
-                // Robust handling
-                if (typeof chunk.text === 'function') {
-                    text = chunk.text();
-                } else if (typeof chunk.text === 'string') {
-                    text = chunk.text;
-                } else if (chunk.candidates?.[0]?.content?.parts?.[0]?.text) {
-                    text = chunk.candidates[0].content.parts[0].text;
-                }
-
-                if (text) {
-                    yield text;
-                }
-            }
+            yield* runStreamPipeline(decodeGeminiStream(streamResult), {
+                mode: "follow_up",
+                model: this.modelName,
+                startedAt,
+                promptTokens: report.estimatedTokens,
+                prefixes: PREFIXES,
+                signal,
+            });
 
         } catch (error) {
+            // Cancelled by the caller: the HTTP stream is already closed, emit nothing
+            if (signal?.aborted) return;
             console.error("[FollowUpLLM] Streaming generation failed:", error);
             yield "";
         }
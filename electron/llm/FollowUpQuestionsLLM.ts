@@ -5,6 +5,7 @@
 import { GoogleGenAI } from "@google/genai";
 import { MODE_CONFIGS } from "./types";
 import { FOLLOW_UP_QUESTIONS_MODE_PROMPT, buildContents } from "./prompts";
+import { decodeGeminiStream, runStreamPipeline } from "./streamPipeline";
 
 export class FollowUpQuestionsLLM {
     private client: GoogleGenAI;
@@ -21,22 +22,25 @@ export class FollowUpQuestionsLLM {
      * @param context - Current conversation context
      * @returns List of 3 questions
      */
-    async generate(context: string): Promise<string> {
+    async generate(context: string, signal?: AbortSignal): Promise<string> {
         try {
             if (!context.trim()) {
                 return "";
             }
 
-            const contents = buildContents(
+            const { systemInstruction, contents } = buildContents(
                 FOLLOW_UP_QUESTIONS_MODE_PROMPT,
                 "Suggest MAX 4 brief follow-up questions based on this context.",
-                context
+                context,
+                "followUpQuestions"
             );
 
             const response = await this.client.models.generateContent({
                 model: this.modelName,
                 contents: contents,
                 config: {
+                    systemInstruction,
+                    abortSignal: signal,
                     maxOutputTokens: this.config.maxOutputTokens,
                     temperature: this.config.temperature,
                     topP: this.config.topP,
@@ -79,6 +83,7 @@ export class FollowUpQuestionsLLM {
             return rawText.trim();
 
         } catch (error) {
+            if (signal?.aborted) return "";
             console.error("[FollowUpQuestionsLLM] Generation failed:", error);
             return "";
         }
@@ -87,51 +92,46 @@ export class FollowUpQuestionsLLM {
     /**
      * Generate strategic follow-up questions (Streamed)
      */
-    async *generateStream(context: string): AsyncGenerator<string> {
+    async *generateStream(context: string, signal?: AbortSignal): AsyncGenerator<string> {
         try {
             if (!context.trim()) {
                 yield "";
                 return;
             }
 
-            const contents = buildContents(
+            const { systemInstruction, contents, report } = buildContents(
                 FOLLOW_UP_QUESTIONS_MODE_PROMPT,
                 "Suggest MAX 4 brief follow-up questions based on this context.",
-                context
+                context,
+                "followUpQuestions"
             );
 
             console.log(`[FollowUpQuestionsLLM] Starting stream with model: ${this.modelName}`);
 
+            const startedAt = Date.now();
             const streamResult = await this.client.models.generateContentStream({
                 model: this.modelName,
                 contents: contents,
                 config: {
+                    systemInstruction,
+                    abortSignal: signal,
                     maxOutputTokens: this.config.maxOutputTokens,
                     temperature: this.config.temperature,
                     topP: this.config.topP,
                 },
             });
 
-            // @ts-ignore
-            const stream = streamResult.stream || streamResult;
-
-            for await (const chunk of stream) {
-                let text = "";
-                // Robust handling
-                if (typeof chunk.text === 'function') {
-                    text = chunk.text();
-                } else if (typeof chunk.text === 'string') {
-                    text = chunk.text;
-                } else if (chunk.candidates?.[0]?.content?.parts?.[0]?.text) {
-                    text = chunk.candidates[0].content.parts[0].text;
-                }
-
-                if (text) {
-                    yield text;
-                }
-            }
+            yield* runStreamPipeline(decodeGeminiStream(streamResult), {
+                mode: "follow_up_questions",
+                model: this.modelName,
+                startedAt,
+                promptTokens: report.estimatedTokens,
+                signal,
+            });
 
         } catch (error) {
+            // Cancelled by the caller: the HTTP stream is already closed, emit nothing
+            if (signal?.aborted) return;
             console.error("[FollowUpQuestionsLLM] Streaming generation failed:", error);
             yield "";
         }
@@ -0,0 +1,275 @@
+// electron/llm/ImagePreprocessor.ts
+// Downscale + recompress screenshots before multimodal upload
+// Retina PNGs are several MB; a resized WebP/JPEG is a few hundred KB with the same legibility
+
+import { encodedImageCache, EncodedImage } from "../EncodedImageCache";
+
+export type ImageOutputFormat = "webp" | "jpeg" | "png";
+export type LosslessPolicy = "auto" | "always" | "never";
+
+export interface ImagePreprocessOptions {
+    enabled: boolean;
+    maxLongEdge: number;             // Longest side in pixels after resize (never upscales)
+    format: ImageOutputFormat;       // Lossy output format
+    quality: number;                 // 1-100 for webp/jpeg
+    lossless: LosslessPolicy;        // "auto" keeps text-heavy shots lossless
+    textEntropyThreshold: number;    // Greyscale entropy below this = text-heavy (UI, code, docs)
+    dedupMaxDistance: number;        // Max dHash Hamming distance (of 256 bits) for two shots to count as duplicates; <0 disables
+}
+
+export const DEFAULT_IMAGE_PREPROCESS_OPTIONS: ImagePreprocessOptions = {
+    enabled: process.env.IMAGE_PREPROCESS !== "false",
+    maxLongEdge: Number(process.env.IMAGE_MAX_LONG_EDGE) || 1600,
+    format: (process.env.IMAGE_FORMAT as ImageOutputFormat) || "webp",
+    quality: Number(process.env.IMAGE_QUALITY) || 80,
+    lossless: (process.env.IMAGE_LOSSLESS as LosslessPolicy) || "auto",
+    textEntropyThreshold: 4.5,
+    // Small: scrolling a page of text barely moves a 16x16 gradient hash, and near-misses must still be sent
+    dedupMaxDistance: process.env.IMAGE_DEDUP_DISTANCE !== undefined ? Number(process.env.IMAGE_DEDUP_DISTANCE) : 6,
+};
+
+/**
+ * Gemini inlineData part
+ */
+export interface ImagePart {
+    inlineData: {
+        data: string;       // base64
+        mimeType: string;
+    };
+}
+
+export interface PreprocessedImage extends EncodedImage {
+    width: number | null;
+    height: number | null;
+    bytes: number;
+    originalBytes: number;
+    lossless: boolean;
+    dHash: string | null;   // Perceptual (difference) hash of the original, hex; null without sharp
+}
+
+export interface DedupedImages {
+    paths: string[];
+    images: PreprocessedImage[];
+    dropped: string[];      // Near-duplicates of a later screenshot
+}
+
+const DHASH_SIZE = 16;      // 16x16 gradient bits = 256-bit hash
+
+/**
+ * Bits that differ between two hex hashes of the same length
+ */
+export function hammingDistance(a: string, b: string): number {
+    let distance = 0;
+    for (let i = 0; i < a.length; i += 8) {
+        let diff = (parseInt(a.slice(i, i + 8), 16) ^ parseInt(b.slice(i, i + 8), 16)) >>> 0;
+        while (diff) {
+            diff &= diff - 1;
+            distance++;
+        }
+    }
+    return distance;
+}
+
+type SharpFactory = typeof import("sharp");
+
+let sharpModule: SharpFactory | null | undefined;
+
+/**
+ * sharp is a native module; if it fails to load, uploads fall back to the raw PNG
+ */
+function loadSharp(): SharpFactory | null {
+    if (sharpModule === undefined) {
+        try {
+            sharpModule = require("sharp") as SharpFactory;
+        } catch (err) {
+            console.warn("[ImagePreprocessor] sharp unavailable, uploading original images:", err);
+            sharpModule = null;
+        }
+    }
+    return sharpModule;
+}
+
+const MIME_TYPES: Record<ImageOutputFormat, string> = {
+    webp: "image/webp",
+    jpeg: "image/jpeg",
+    png: "image/png",
+};
+
+export class ImagePreprocessor {
+    private options: ImagePreprocessOptions;
+
+    constructor(options: Partial<ImagePreprocessOptions> = {}) {
+        this.options = { ...DEFAULT_IMAGE_PREPROCESS_OPTIONS, ...options };
+    }
+
+    public setOptions(options: Partial<ImagePreprocessOptions>): void {
+        this.options = { ...this.options, ...options };
+    }
+
+    /**
+     * Load an image file as a Gemini inlineData part
+     */
+    public async toImagePart(imagePath: string): Promise<ImagePart> {
+        const image = await this.process(imagePath);
+        return { inlineData: { data: image.data, mimeType: image.mimeType } };
+    }
+
+    /**
+     * Resize/recompress a file. Results live in the shared encoded-image cache
+     * (path + mtime + size), one variant per preprocessing configuration.
+     */
+    public async process(imagePath: string): Promise<PreprocessedImage> {
+        return encodedImageCache.getOrEncode(imagePath, this.variantKey(), async (raw, original) => {
+            const result = await this.encode(raw, original.data);
+            if (result.bytes < result.originalBytes) {
+                console.log(`[ImagePreprocessor] ${Math.round(result.originalBytes / 1024)}KB -> ${Math.round(result.bytes / 1024)}KB (${result.mimeType}${result.lossless ? ", lossless" : ""})`);
+            }
+            return result;
+        });
+    }
+
+    /**
+     * Preprocess several files and drop near-duplicates (e.g. the same screen captured twice).
+     * Of a near-identical pair the later capture is kept; order is otherwise preserved.
+     */
+    public async dedupe(imagePaths: string[]): Promise<DedupedImages> {
+        const images = await Promise.all(imagePaths.map(imagePath => this.process(imagePath)));
+        const result: DedupedImages = { paths: [], images: [], dropped: [] };
+
+        for (let i = images.length - 1; i >= 0; i--) {
+            const hash = images[i].dHash;
+            const duplicate = this.options.dedupMaxDistance >= 0 && hash !== null && result.images.some(kept =>
+                kept.dHash !== null && hammingDistance(kept.dHash, hash) <= this.options.dedupMaxDistance
+            );
+            if (duplicate) {
+                result.dropped.unshift(imagePaths[i]);
+            } else {
+                result.paths.unshift(imagePaths[i]);
+                result.images.unshift(images[i]);
+            }
+        }
+        return result;
+    }
+
+    private variantKey(): string {
+        const { enabled, maxLongEdge, format, quality, lossless } = this.options;
+        return enabled ? `upload:${format}:${maxLongEdge}:${quality}:${lossless}` : "upload:passthrough";
+    }
+
+    /**
+     * `originalBase64` is the cache's encoding of `original`; the passthrough
+     * result reuses that string rather than encoding a second copy
+     */
+    private async encode(original: Buffer, originalBase64: string): Promise<PreprocessedImage> {
+        const dHash = await this.computeDHash(original);
+        const passthrough: PreprocessedImage = {
+            data: originalBase64,
+            mimeType: "image/png",
+            width: null,
+            height: null,
+            bytes: original.length,
+            originalBytes: original.length,
+            lossless: true,
+            dHash,
+        };
+
+        const sharp = this.options.enabled ? loadSharp() : null;
+        if (!sharp) return passthrough;
+
+        try {
+            const lossless = await this.shouldKeepLossless(sharp, original);
+            let pipeline = sharp(original).rotate().resize({
+                width: this.options.maxLongEdge,
+                height: this.options.maxLongEdge,
+                fit: "inside",
+                withoutEnlargement: true,
+            });
+
+            let format: ImageOutputFormat = this.options.format;
+            if (lossless) {
+                // JPEG has no lossless mode; PNG is the lossless fallback
+                if (format === "jpeg") format = "png";
+                pipeline = format === "webp"
+                    ? pipeline.webp({ lossless: true })
+                    : pipeline.png({ compressionLevel: 9 });
+            } else if (format === "webp") {
+                pipeline = pipeline.webp({ quality: this.options.quality });
+            } else if (format === "jpeg") {
+                pipeline = pipeline.jpeg({ quality: this.options.quality, mozjpeg: true });
+            } else {
+                pipeline = pipeline.png({ compressionLevel: 9 });
+            }
+
+            const { data, info } = await pipeline.toBuffer({ resolveWithObject: true });
+
+            // Never upload something bigger than the original
+            if (data.length >= original.length) return passthrough;
+
+            return {
+                data: data.toString("base64"),
+                mimeType: MIME_TYPES[format],
+                width: info.width,
+                height: info.height,
+                bytes: data.length,
+                originalBytes: original.length,
+                lossless,
+                dHash,
+            };
+        } catch (err) {
+            console.warn("[ImagePreprocessor] Failed to preprocess image, using original:", err);
+            return passthrough;
+        }
+    }
+
+    /**
+     * Difference hash: greyscale, shrink to (size+1) x size, one bit per horizontal gradient.
+     * Computed with the upload encoding, so it is cached alongside it.
+     */
+    private async computeDHash(original: Buffer): Promise<string | null> {
+        const sharp = loadSharp();
+        if (!sharp) return null;
+
+        try {
+            const { data, info } = await sharp(original)
+                .greyscale()
+                .resize(DHASH_SIZE + 1, DHASH_SIZE, { fit: "fill" })
+                .raw()
+                .toBuffer({ resolveWithObject: true });
+
+            let hex = "";
+            let nibble = 0;
+            let bits = 0;
+            for (let y = 0; y < DHASH_SIZE; y++) {
+                for (let x = 0; x < DHASH_SIZE; x++) {
+                    const left = data[(y * info.width + x) * info.channels];
+                    const right = data[(y * info.width + x + 1) * info.channels];
+                    nibble = (nibble << 1) | (left > right ? 1 : 0);
+                    if (++bits === 4) {
+                        hex += nibble.toString(16);
+                        nibble = 0;
+                        bits = 0;
+                    }
+                }
+            }
+            return hex;
+        } catch (err) {
+            console.warn("[ImagePreprocessor] Failed to hash image:", err);
+            return null;
+        }
+    }
+
+    /**
+     * Text-heavy screenshots (code, docs, UIs) have low greyscale entropy;
+     * lossy compression smears glyph edges on those, so keep them lossless
+     */
+    private async shouldKeepLossless(sharp: SharpFactory, original: Buffer): Promise<boolean> {
+        if (this.options.lossless === "always") return true;
+        if (this.options.lossless === "never") return false;
+
+        const stats = await sharp(original)
+            .resize({ width: 256, height: 256, fit: "inside" })
+            .greyscale()
+            .stats();
+        return stats.entropy < this.options.textEntropyThreshold;
+    }
+}
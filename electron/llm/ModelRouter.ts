@@ -0,0 +1,236 @@
+// electron/llm/ModelRouter.ts
+// Health-aware model routing with per-model circuit breakers
+// A model that keeps failing is skipped outright until a half-open probe shows it has recovered
+
+export type CircuitState = "closed" | "open" | "half_open";
+
+export interface ModelRouterOptions {
+    windowMs: number;               // Rolling window for error rate / latency stats
+    minRequests: number;            // Error rate only trips the breaker with at least this many samples
+    failureRateThreshold: number;   // 0-1
+    consecutiveFailures: number;    // Trip immediately after this many failures in a row
+    openMs: number;                 // First cool-down before a probe is allowed
+    maxOpenMs: number;              // Cool-down doubles on every failed probe, up to this
+}
+
+export const DEFAULT_MODEL_ROUTER_OPTIONS: ModelRouterOptions = {
+    windowMs: 60 * 1000,
+    minRequests: 5,
+    failureRateThreshold: 0.5,
+    consecutiveFailures: 3,
+    openMs: 15 * 1000,
+    maxOpenMs: 5 * 60 * 1000,
+};
+
+export interface ModelHealth {
+    model: string;
+    state: CircuitState;
+    requests: number;           // In the rolling window
+    errorRate: number;
+    p50LatencyMs: number | null;
+    p95LatencyMs: number | null;
+    consecutiveFailures: number;
+    trips: number;              // Times the breaker has opened
+    lastError: string | null;
+    retryAt: number | null;     // When an open breaker allows its next probe
+}
+
+export interface RouteDecision {
+    primary: string;
+    backup: string | null;
+    reason: "preferred" | "preferred_probe" | "preferred_open" | "all_open";
+}
+
+interface Sample {
+    at: number;
+    ok: boolean;
+    latencyMs: number;
+}
+
+interface Breaker {
+    state: CircuitState;
+    samples: Sample[];
+    consecutiveFailures: number;
+    openedAt: number;
+    openForMs: number;
+    probeInFlight: boolean;
+    trips: number;
+    lastError: string | null;
+}
+
+export class ModelRouter {
+    private breakers = new Map<string, Breaker>();
+    private options: ModelRouterOptions;
+
+    constructor(options: Partial<ModelRouterOptions> = {}) {
+        this.options = { ...DEFAULT_MODEL_ROUTER_OPTIONS, ...options };
+    }
+
+    /**
+     * Pick the primary/backup pair for a request that would like `preferred`.
+     * An open model is skipped; a half-open model only takes traffic as the single probe.
+     * If both are open the preferred model is still used - failing fast here would be worse.
+     */
+    public route(preferred: string, fallback: string): RouteDecision {
+        const preferredOk = this.canAttempt(preferred);
+        const fallbackOk = this.canAttempt(fallback);
+
+        if (preferredOk) {
+            const reason = this.getBreaker(preferred).state === "half_open" ? "preferred_probe" : "preferred";
+            return { primary: preferred, backup: fallbackOk ? fallback : null, reason };
+        }
+        if (fallbackOk) {
+            return { primary: fallback, backup: null, reason: "preferred_open" };
+        }
+        return { primary: preferred, backup: null, reason: "all_open" };
+    }
+
+    /**
+     * Mark a request as started (claims the probe slot of a half-open model)
+     */
+    public begin(model: string): void {
+        const breaker = this.refreshState(model);
+        if (breaker.state === "half_open") {
+            breaker.probeInFlight = true;
+        }
+    }
+
+    public recordSuccess(model: string, latencyMs: number): void {
+        const breaker = this.refreshState(model);
+        this.pushSample(breaker, { at: Date.now(), ok: true, latencyMs });
+        breaker.consecutiveFailures = 0;
+        breaker.probeInFlight = false;
+
+        if (breaker.state !== "closed") {
+            console.log(`[ModelRouter] ${model} recovered, closing circuit`);
+            breaker.state = "closed";
+            breaker.openForMs = this.options.openMs;
+            breaker.samples = [breaker.samples[breaker.samples.length - 1]];
+        }
+    }
+
+    public recordFailure(model: string, error: unknown, latencyMs: number = 0): void {
+        const breaker = this.refreshState(model);
+        this.pushSample(breaker, { at: Date.now(), ok: false, latencyMs });
+        breaker.consecutiveFailures++;
+        breaker.lastError = error instanceof Error ? error.message : String(error);
+
+        if (breaker.state === "half_open") {
+            breaker.probeInFlight = false;
+            breaker.openForMs = Math.min(this.options.maxOpenMs, breaker.openForMs * 2);
+            this.trip(model, breaker, "probe failed");
+            return;
+        }
+
+        if (breaker.state === "closed" && this.shouldTrip(breaker)) {
+            this.trip(model, breaker, `${breaker.consecutiveFailures} consecutive failures`);
+        }
+    }
+
+    /**
+     * The request was cancelled (e.g. lost a hedge race) - not the model's fault
+     */
+    public recordAborted(model: string): void {
+        this.getBreaker(model).probeInFlight = false;
+    }
+
+    public getHealth(): ModelHealth[] {
+        return [...this.breakers.keys()].map(model => this.getModelHealth(model));
+    }
+
+    public getModelHealth(model: string): ModelHealth {
+        const breaker = this.refreshState(model);
+        const samples = this.windowSamples(breaker);
+        const failures = samples.filter(sample => !sample.ok).length;
+        const latencies = samples.filter(sample => sample.ok).map(sample => sample.latencyMs).sort((a, b) => a - b);
+
+        return {
+            model,
+            state: breaker.state,
+            requests: samples.length,
+            errorRate: samples.length > 0 ? failures / samples.length : 0,
+            p50LatencyMs: percentile(latencies, 0.5),
+            p95LatencyMs: percentile(latencies, 0.95),
+            consecutiveFailures: breaker.consecutiveFailures,
+            trips: breaker.trips,
+            lastError: breaker.lastError,
+            retryAt: breaker.state === "open" ? breaker.openedAt + breaker.openForMs : null,
+        };
+    }
+
+    public reset(): void {
+        this.breakers.clear();
+    }
+
+    private canAttempt(model: string): boolean {
+        const breaker = this.refreshState(model);
+        if (breaker.state === "closed") return true;
+        if (breaker.state === "half_open") return !breaker.probeInFlight;
+        return false;
+    }
+
+    private shouldTrip(breaker: Breaker): boolean {
+        if (breaker.consecutiveFailures >= this.options.consecutiveFailures) return true;
+
+        const samples = this.windowSamples(breaker);
+        if (samples.length < this.options.minRequests) return false;
+        const failures = samples.filter(sample => !sample.ok).length;
+        return failures / samples.length >= this.options.failureRateThreshold;
+    }
+
+    private trip(model: string, breaker: Breaker, why: string): void {
+        breaker.state = "open";
+        breaker.openedAt = Date.now();
+        breaker.trips++;
+        console.warn(`[ModelRouter] Opening circuit for ${model} (${why}), next probe in ${breaker.openForMs}ms`);
+    }
+
+    /**
+     * Open breakers become half-open once their cool-down has elapsed
+     */
+    private refreshState(model: string): Breaker {
+        const breaker = this.getBreaker(model);
+        if (breaker.state === "open" && Date.now() - breaker.openedAt >= breaker.openForMs) {
+            breaker.state = "half_open";
+            breaker.probeInFlight = false;
+        }
+        return breaker;
+    }
+
+    private getBreaker(model: string): Breaker {
+        let breaker = this.breakers.get(model);
+        if (!breaker) {
+            breaker = {
+                state: "closed",
+                samples: [],
+                consecutiveFailures: 0,
+                openedAt: 0,
+                openForMs: this.options.openMs,
+                probeInFlight: false,
+                trips: 0,
+                lastError: null,
+            };
+            this.breakers.set(model, breaker);
+        }
+        return breaker;
+    }
+
+    private pushSample(breaker: Breaker, sample: Sample): void {
+        breaker.samples.push(sample);
+        const cutoff = sample.at - this.options.windowMs;
+        while (breaker.samples.length > 0 && breaker.samples[0].at < cutoff) {
+            breaker.samples.shift();
+        }
+    }
+
+    private windowSamples(breaker: Breaker): Sample[] {
+        const cutoff = Date.now() - this.options.windowMs;
+        return breaker.samples.filter(sample => sample.at >= cutoff);
+    }
+}
+
+function percentile(sorted: number[], p: number): number | null {
+    if (sorted.length === 0) return null;
+    const index = Math.min(sorted.length - 1, Math.max(0, Math.ceil(p * sorted.length) - 1));
+    return sorted[index];
+}
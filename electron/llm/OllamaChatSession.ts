@@ -0,0 +1,229 @@
+// electron/llm/OllamaChatSession.ts
+// Append-only /api/chat message history for the current meeting
+// Every request repeats the previous messages byte-for-byte, so Ollama reuses its KV cache
+// for that prefix and only evaluates the new turn instead of the whole conversation
+
+import { estimateTokens } from "./promptBudget";
+import { createAbortError } from "./hedging";
+
+export interface OllamaChatSessionOptions {
+    enabled: boolean;
+    maxHistoryTokens: number;   // Trim once the history grows past this (keep it under the model's num_ctx)
+    trimToRatio: number;        // Trim down to this fraction of the max, so the prefix then stays stable for a while
+}
+
+export const DEFAULT_OLLAMA_CHAT_SESSION_OPTIONS: OllamaChatSessionOptions = {
+    enabled: process.env.OLLAMA_CHAT_SESSION !== "false",
+    maxHistoryTokens: Number(process.env.OLLAMA_CHAT_MAX_TOKENS) || 6000,
+    trimToRatio: 0.5,
+};
+
+export interface OllamaChatMessage {
+    role: "system" | "user" | "assistant";
+    content: string;
+}
+
+export interface OllamaChatSessionStats {
+    enabled: boolean;
+    model: string | null;
+    messages: number;
+    historyTokens: number;
+    turns: number;
+    resets: number;
+    trims: number;
+}
+
+/**
+ * One request against the session. `messages` is the full history plus the new user
+ * turn; `commit` records the exchange, `release` lets the next turn start.
+ */
+export interface OllamaChatTurn {
+    messages: OllamaChatMessage[];
+    commit(reply: string): void;
+    release(): void;
+}
+
+export class OllamaChatSession {
+    private options: OllamaChatSessionOptions;
+    private model: string | null = null;
+    private systemPrompt: string | null = null;
+    private history: OllamaChatMessage[] = [];
+    // Context window sent with the last committed turn, and the sequence number of its first line
+    private previousContextLines: string[] = [];
+    private previousFirstSequence = 0;
+    private queue: Promise<void> = Promise.resolve();
+
+    private turns = 0;
+    private resets = 0;
+    private trims = 0;
+
+    constructor(options: Partial<OllamaChatSessionOptions> = {}) {
+        this.options = { ...DEFAULT_OLLAMA_CHAT_SESSION_OPTIONS, ...options };
+    }
+
+    public get enabled(): boolean {
+        return this.options.enabled;
+    }
+
+    /**
+     * Start a turn. Turns run one at a time so the history is appended in order;
+     * a different model or system prompt starts a fresh history. Aborting `signal`
+     * while the turn is still queued rejects right away with an AbortError.
+     */
+    public async beginTurn(model: string, systemPrompt: string, message: string, context?: string, signal?: AbortSignal): Promise<OllamaChatTurn> {
+        const previous = this.queue;
+        let unlock!: () => void;
+        const done = new Promise<void>(resolve => { unlock = resolve; });
+        // The next turn waits for this one and everything queued before it, even if this one gives up early
+        this.queue = previous.then(() => done);
+
+        try {
+            await waitUnlessAborted(previous, signal);
+        } catch (error) {
+            unlock();
+            throw error;
+        }
+
+        if (model !== this.model || systemPrompt !== this.systemPrompt) {
+            this.start(model, systemPrompt);
+        }
+
+        const contextLines = context ? context.split("\n").filter(line => line.trim()) : [];
+        const { firstSequence, newLines } = this.alignContext(contextLines);
+        const user: OllamaChatMessage = { role: "user", content: this.renderTurn(message, newLines) };
+        const messages = [...this.history, user];
+
+        let released = false;
+        const release = () => {
+            if (released) return;
+            released = true;
+            unlock();
+        };
+
+        return {
+            messages,
+            commit: (reply: string) => {
+                if (released) return;
+                this.history.push(user, { role: "assistant", content: reply });
+                this.previousContextLines = contextLines;
+                this.previousFirstSequence = firstSequence;
+                this.turns++;
+                this.trim();
+                release();
+            },
+            release,
+        };
+    }
+
+    /**
+     * Forget the conversation (new meeting)
+     */
+    public reset(): void {
+        if (this.model === null) return;
+        this.model = null;
+        this.systemPrompt = null;
+        this.history = [];
+        this.previousContextLines = [];
+        this.previousFirstSequence = 0;
+    }
+
+    public getStats(): OllamaChatSessionStats {
+        return {
+            enabled: this.options.enabled,
+            model: this.model,
+            messages: this.history.length,
+            historyTokens: this.historyTokens(),
+            turns: this.turns,
+            resets: this.resets,
+            trims: this.trims,
+        };
+    }
+
+    private start(model: string, systemPrompt: string): void {
+        if (this.model !== null) this.resets++;
+        this.model = model;
+        this.systemPrompt = systemPrompt;
+        this.history = [{ role: "system", content: systemPrompt }];
+        this.previousContextLines = [];
+        this.previousFirstSequence = 0;
+    }
+
+    /**
+     * The renderer resends the whole rolling transcript window with every question.
+     * The window only gains lines at the end and loses them at the front, so lines are
+     * numbered by where the new window lines up with the last one sent (the largest
+     * overlap); lines numbered past what was sent are new. Numbering by position, not
+     * text, keeps a line that is said again (e.g. "[ME]: Yes") from being dropped.
+     */
+    private alignContext(contextLines: string[]): { firstSequence: number; newLines: string[] } {
+        const previous = this.previousContextLines;
+        const sentEnd = this.previousFirstSequence + previous.length;
+
+        for (let shift = 0; shift < previous.length; shift++) {
+            const overlap = previous.length - shift;
+            if (overlap > contextLines.length) continue;
+            let matches = true;
+            for (let i = 0; i < overlap && matches; i++) {
+                matches = previous[shift + i] === contextLines[i];
+            }
+            if (matches) {
+                return { firstSequence: this.previousFirstSequence + shift, newLines: contextLines.slice(overlap) };
+            }
+        }
+        // No overlap: the window moved past everything sent before
+        return { firstSequence: sentEnd, newLines: contextLines };
+    }
+
+    /**
+     * The lines already sent with an earlier turn are in the history, so only new ones go in
+     */
+    private renderTurn(message: string, newLines: string[]): string {
+        return newLines.length > 0
+            ? `CONTEXT:\n${newLines.join("\n")}\n\nUSER QUESTION:\n${message}`
+            : message;
+    }
+
+    /**
+     * Drop the oldest exchanges in one go. This changes the prefix once (one full
+     * re-evaluation) rather than on every turn as a sliding window would.
+     */
+    private trim(): void {
+        if (this.historyTokens() <= this.options.maxHistoryTokens) return;
+
+        const target = this.options.maxHistoryTokens * this.options.trimToRatio;
+        const before = this.history.length;
+        // Keep the system prompt and the latest exchange
+        while (this.history.length > 3 && this.historyTokens() > target) {
+            this.history.splice(1, 2);
+        }
+        this.trims++;
+        console.log(`[OllamaChatSession] Trimmed history from ${before} to ${this.history.length} messages (~${this.historyTokens()} tokens)`);
+    }
+
+    private historyTokens(): number {
+        return this.history.reduce((sum, message) => sum + estimateTokens(message.content) + 4, 0);
+    }
+}
+
+/**
+ * Wait for `promise`, rejecting with an AbortError as soon as `signal` aborts
+ */
+function waitUnlessAborted(promise: Promise<void>, signal?: AbortSignal): Promise<void> {
+    if (!signal) return promise;
+    if (signal.aborted) return Promise.reject(createAbortError());
+
+    return new Promise<void>((resolve, reject) => {
+        const onAbort = () => reject(createAbortError());
+        signal.addEventListener("abort", onAbort, { once: true });
+        promise.then(
+            () => {
+                signal.removeEventListener("abort", onAbort);
+                resolve();
+            },
+            (error) => {
+                signal.removeEventListener("abort", onAbort);
+                reject(error);
+            }
+        );
+    });
+}
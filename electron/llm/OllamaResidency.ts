@@ -0,0 +1,161 @@
+// electron/llm/OllamaResidency.ts
+// Keeps the selected Ollama model resident in memory for the meeting
+// Preloads on switch, pins it with keep_alive, unloads on quit, caches /api/tags
+
+import { OllamaTransport } from "./OllamaTransport";
+
+export interface OllamaResidencyOptions {
+    keepAlive: string;          // Sent as keep_alive on every request; the model stays loaded this long after its last use
+    tagsTtlMs: number;          // How long the /api/tags model list is reused before asking Ollama again
+    metadataTimeoutMs: number;  // /api/tags and /api/ps are cheap local calls; don't let a wedged server block the settings UI
+}
+
+export const DEFAULT_OLLAMA_RESIDENCY_OPTIONS: OllamaResidencyOptions = {
+    keepAlive: process.env.OLLAMA_KEEP_ALIVE || "30m",
+    tagsTtlMs: 60 * 1000,
+    metadataTimeoutMs: 5000,
+};
+
+export type ModelResidencyState = "warm" | "cold" | "loading";
+
+export interface ModelResidencyStatus {
+    model: string;
+    state: ModelResidencyState;
+    expiresAt: string | null;   // When Ollama will evict the model unless it is used again
+    lastLoadMs: number | null;  // How long the last preload took to bring the model into memory
+}
+
+interface OllamaTagsResponse {
+    models?: Array<{ name: string }>;
+}
+
+interface OllamaPsResponse {
+    models?: Array<{ name: string; model?: string; expires_at?: string }>;
+}
+
+interface OllamaLoadResponse {
+    load_duration?: number;     // Nanoseconds
+}
+
+export class OllamaResidency {
+    private transport: OllamaTransport;
+    private options: OllamaResidencyOptions;
+
+    private tags: string[] | null = null;
+    private tagsFetchedAt = 0;
+    private tagsRequest: Promise<string[]> | null = null;
+
+    private loading = new Map<string, Promise<void>>();
+    private lastLoadMs = new Map<string, number>();
+
+    constructor(transport: OllamaTransport, options: Partial<OllamaResidencyOptions> = {}) {
+        this.transport = transport;
+        this.options = { ...DEFAULT_OLLAMA_RESIDENCY_OPTIONS, ...options };
+    }
+
+    public get keepAlive(): string {
+        return this.options.keepAlive;
+    }
+
+    /**
+     * Installed models from /api/tags, reused for `tagsTtlMs`; concurrent callers share one request
+     */
+    public async listModels(options: { force?: boolean } = {}): Promise<string[]> {
+        const fresh = this.tags !== null && Date.now() - this.tagsFetchedAt < this.options.tagsTtlMs;
+        if (fresh && !options.force) return this.tags!;
+
+        if (!this.tagsRequest) {
+            this.tagsRequest = this.transport.requestJson<OllamaTagsResponse>("/api/tags", {
+                timeoutMs: this.options.metadataTimeoutMs,
+            })
+                .then(data => {
+                    this.tags = (data.models || []).map(model => model.name);
+                    this.tagsFetchedAt = Date.now();
+                    return this.tags;
+                })
+                .finally(() => { this.tagsRequest = null; });
+        }
+        return this.tagsRequest;
+    }
+
+    /**
+     * Drop the cached model list (e.g. after the Ollama URL changes)
+     */
+    public invalidateModels(): void {
+        this.tags = null;
+        this.tagsFetchedAt = 0;
+    }
+
+    /**
+     * Load `model` into memory ahead of the first question. An empty prompt makes
+     * Ollama load the model and return without generating anything. Pass the same
+     * `options` the first request will use: a different num_ctx reloads the model.
+     */
+    public preload(model: string, options?: Record<string, unknown>): Promise<void> {
+        const pending = this.loading.get(model);
+        if (pending) return pending;
+
+        const startedAt = Date.now();
+        const request = this.transport.requestJson<OllamaLoadResponse>("/api/generate", {
+            method: "POST",
+            body: { model, prompt: "", keep_alive: this.options.keepAlive, stream: false, ...(options ? { options } : {}) },
+        })
+            .then(data => {
+                const loadMs = data.load_duration ? Math.round(data.load_duration / 1e6) : Date.now() - startedAt;
+                this.lastLoadMs.set(model, loadMs);
+                console.log(`[OllamaResidency] ${model} resident (load ${loadMs}ms, keep_alive ${this.options.keepAlive})`);
+            })
+            .finally(() => { this.loading.delete(model); });
+
+        this.loading.set(model, request);
+        return request;
+    }
+
+    /**
+     * Evict `model` now instead of waiting for keep_alive to expire
+     */
+    public async unload(model: string): Promise<void> {
+        await this.transport.requestJson("/api/generate", {
+            method: "POST",
+            body: { model, keep_alive: 0, stream: false },
+        });
+        console.log(`[OllamaResidency] ${model} unloaded`);
+    }
+
+    /**
+     * Ask Ollama (/api/ps) whether `model` is currently in memory
+     */
+    public async getStatus(model: string): Promise<ModelResidencyStatus> {
+        const status: ModelResidencyStatus = {
+            model,
+            state: this.loading.has(model) ? "loading" : "cold",
+            expiresAt: null,
+            lastLoadMs: this.lastLoadMs.get(model) ?? null,
+        };
+        if (status.state === "loading") return status;
+
+        try {
+            const data = await this.transport.requestJson<OllamaPsResponse>("/api/ps", {
+                timeoutMs: this.options.metadataTimeoutMs,
+            });
+            const resident = (data.models || []).find(entry => matchesModel(entry.name, model) || matchesModel(entry.model, model));
+            if (resident) {
+                status.state = "warm";
+                status.expiresAt = resident.expires_at || null;
+            }
+        } catch (error: any) {
+            // Older Ollama builds have no /api/ps; report cold rather than failing the config call
+            console.warn(`[OllamaResidency] Could not read model status:`, error?.message);
+        }
+        return status;
+    }
+}
+
+/**
+ * "llama3.2" and "llama3.2:latest" name the same model
+ */
+function matchesModel(name: string | undefined, model: string): boolean {
+    if (!name) return false;
+    const withTag = (value: string) => value.includes(":") ? value : `${value}:latest`;
+    return withTag(name) === withTag(model);
+}
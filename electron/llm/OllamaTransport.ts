@@ -0,0 +1,262 @@
+// electron/llm/OllamaTransport.ts
+// Shared keep-alive HTTP transport for every Ollama call
+// One bounded socket pool per Ollama host, per-request timeouts, pool stats
+
+import http from "http";
+import https from "https";
+
+export interface OllamaTransportOptions {
+    maxSockets: number;       // Upper bound on concurrent sockets to the Ollama host
+    maxFreeSockets: number;   // Idle sockets kept open for reuse
+    keepAliveMsecs: number;   // TCP keep-alive probe interval for idle sockets
+    timeoutMs: number;        // Default socket inactivity timeout per request
+}
+
+export const DEFAULT_OLLAMA_TRANSPORT_OPTIONS: OllamaTransportOptions = {
+    maxSockets: Number(process.env.OLLAMA_MAX_SOCKETS) || 4,
+    maxFreeSockets: 2,
+    keepAliveMsecs: 30000,
+    timeoutMs: Number(process.env.OLLAMA_TIMEOUT_MS) || 120000,
+};
+
+export interface OllamaRequestOptions {
+    method?: "GET" | "POST";
+    body?: unknown;
+    timeoutMs?: number;
+    signal?: AbortSignal;     // Aborting destroys the request and its socket immediately
+}
+
+/**
+ * Per-request pool accounting
+ */
+export interface OllamaRequestStats {
+    path: string;
+    status: number;
+    reusedSocket: boolean;
+    queueMs: number;      // Time spent waiting for a socket from the pool
+    durationMs: number;   // Request start -> response fully consumed
+    timestamp: number;
+}
+
+export interface OllamaPoolStats {
+    baseUrl: string;
+    maxSockets: number;
+    totalRequests: number;
+    failedRequests: number;
+    abortedRequests: number;
+    reusedSockets: number;
+    newSockets: number;
+    activeSockets: number;
+    freeSockets: number;
+    pendingRequests: number;
+    avgQueueMs: number;
+    maxQueueMs: number;
+    recent: OllamaRequestStats[];
+}
+
+const RECENT_REQUEST_LIMIT = 50;
+
+function countSockets(dict: NodeJS.ReadOnlyDict<unknown[]>): number {
+    let count = 0;
+    for (const key of Object.keys(dict)) {
+        count += dict[key]?.length || 0;
+    }
+    return count;
+}
+
+/**
+ * Connection-pooled client for the local Ollama HTTP API.
+ * Replaces bare fetch() calls so that tags/generate/chat requests share
+ * warm sockets instead of opening a new connection per call.
+ */
+export class OllamaTransport {
+    private baseUrl: URL;
+    private agent: http.Agent;
+    private options: OllamaTransportOptions;
+
+    // Pool accounting
+    private totalRequests = 0;
+    private failedRequests = 0;
+    private abortedRequests = 0;
+    private reusedSockets = 0;
+    private newSockets = 0;
+    private totalQueueMs = 0;
+    private maxQueueMs = 0;
+    private recent: OllamaRequestStats[] = [];
+
+    constructor(baseUrl: string, options: Partial<OllamaTransportOptions> = {}) {
+        this.options = { ...DEFAULT_OLLAMA_TRANSPORT_OPTIONS, ...options };
+        this.baseUrl = new URL(baseUrl);
+        this.agent = this.createAgent();
+    }
+
+    private createAgent(): http.Agent {
+        const agentOptions: http.AgentOptions = {
+            keepAlive: true,
+            keepAliveMsecs: this.options.keepAliveMsecs,
+            maxSockets: this.options.maxSockets,
+            maxFreeSockets: this.options.maxFreeSockets,
+            scheduling: "lifo", // Prefer the most recently used (warmest) socket
+        };
+        return this.baseUrl.protocol === "https:"
+            ? new https.Agent(agentOptions)
+            : new http.Agent(agentOptions);
+    }
+
+    public getBaseUrl(): string {
+        return this.baseUrl.origin;
+    }
+
+    /**
+     * Point the transport at a different Ollama host.
+     * The old pool is torn down; stats are kept.
+     */
+    public setBaseUrl(baseUrl: string): void {
+        const next = new URL(baseUrl);
+        if (next.origin === this.baseUrl.origin) return;
+
+        this.agent.destroy();
+        this.baseUrl = next;
+        this.agent = this.createAgent();
+    }
+
+    /**
+     * Open a request and resolve with the raw response once headers arrive.
+     * Callers MUST consume (or destroy) the response so the socket returns to the pool.
+     */
+    public open(path: string, options: OllamaRequestOptions = {}): Promise<http.IncomingMessage> {
+        const method = options.method || (options.body !== undefined ? "POST" : "GET");
+        const timeoutMs = options.timeoutMs ?? this.options.timeoutMs;
+        const payload = options.body !== undefined ? JSON.stringify(options.body) : undefined;
+        const url = new URL(path, this.baseUrl);
+        const transport = url.protocol === "https:" ? https : http;
+
+        const startedAt = Date.now();
+        let queueMs = 0;
+
+        return new Promise((resolve, reject) => {
+            const req = transport.request(url, {
+                method,
+                agent: this.agent,
+                // Node destroys the request (and the pooled socket) on abort,
+                // so a cancelled generation stops on the Ollama side too
+                signal: options.signal,
+                headers: payload !== undefined
+                    ? { "Content-Type": "application/json", "Content-Length": Buffer.byteLength(payload) }
+                    : undefined,
+            });
+
+            req.once("socket", () => {
+                queueMs = Date.now() - startedAt;
+            });
+
+            req.setTimeout(timeoutMs, () => {
+                req.destroy(new Error(`Ollama request to ${path} timed out after ${timeoutMs}ms`));
+            });
+
+            let responded = false;
+
+            req.once("error", (err) => {
+                // After headers, failures are counted via the response's "aborted" event
+                if (responded) return;
+                if (options.signal?.aborted) {
+                    this.abortedRequests++;
+                } else {
+                    this.failedRequests++;
+                }
+                reject(err);
+            });
+
+            req.once("response", (res) => {
+                responded = true;
+                const reused = req.reusedSocket;
+                const record = () => this.recordRequest({
+                    path,
+                    status: res.statusCode || 0,
+                    reusedSocket: reused,
+                    queueMs,
+                    durationMs: Date.now() - startedAt,
+                    timestamp: startedAt,
+                });
+                res.once("end", record);
+                res.once("aborted", () => {
+                    if (options.signal?.aborted) {
+                        this.abortedRequests++;
+                    } else {
+                        this.failedRequests++;
+                    }
+                });
+                resolve(res);
+            });
+
+            if (payload !== undefined) req.write(payload);
+            req.end();
+        });
+    }
+
+    /**
+     * Send a request and parse the JSON response body
+     */
+    public async requestJson<T>(path: string, options: OllamaRequestOptions = {}): Promise<T> {
+        const res = await this.open(path, options);
+        const body = await readBody(res);
+        const status = res.statusCode || 0;
+
+        if (status < 200 || status >= 300) {
+            throw new Error(`Ollama API error: ${status} ${res.statusMessage || ""}`.trim());
+        }
+
+        return JSON.parse(body) as T;
+    }
+
+    private recordRequest(stats: OllamaRequestStats): void {
+        this.totalRequests++;
+        if (stats.reusedSocket) {
+            this.reusedSockets++;
+        } else {
+            this.newSockets++;
+        }
+        this.totalQueueMs += stats.queueMs;
+        this.maxQueueMs = Math.max(this.maxQueueMs, stats.queueMs);
+
+        this.recent.push(stats);
+        if (this.recent.length > RECENT_REQUEST_LIMIT) {
+            this.recent.shift();
+        }
+    }
+
+    public getStats(): OllamaPoolStats {
+        return {
+            baseUrl: this.baseUrl.origin,
+            maxSockets: this.options.maxSockets,
+            totalRequests: this.totalRequests,
+            failedRequests: this.failedRequests,
+            abortedRequests: this.abortedRequests,
+            reusedSockets: this.reusedSockets,
+            newSockets: this.newSockets,
+            activeSockets: countSockets(this.agent.sockets),
+            freeSockets: countSockets(this.agent.freeSockets),
+            pendingRequests: countSockets(this.agent.requests),
+            avgQueueMs: this.totalRequests > 0 ? this.totalQueueMs / this.totalRequests : 0,
+            maxQueueMs: this.maxQueueMs,
+            recent: [...this.recent],
+        };
+    }
+
+    /**
+     * Close all pooled sockets (e.g. on app quit)
+     */
+    public destroy(): void {
+        this.agent.destroy();
+    }
+}
+
+function readBody(res: http.IncomingMessage): Promise<string> {
+    return new Promise((resolve, reject) => {
+        const chunks: Buffer[] = [];
+        res.on("data", (chunk: Buffer) => chunks.push(chunk));
+        res.once("end", () => resolve(Buffer.concat(chunks).toString("utf8")));
+        res.once("error", reject);
+        res.once("aborted", () => reject(new Error("Ollama response aborted")));
+    });
+}
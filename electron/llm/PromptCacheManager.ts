@@ -0,0 +1,239 @@
+// electron/llm/PromptCacheManager.ts
+// Explicit Gemini context caching for the static system prompts
+// One cachedContent handle per (model, system prompt), created lazily and refreshed before its TTL runs out
+
+import crypto from "crypto";
+import { GoogleGenAI } from "@google/genai";
+
+export interface PromptCacheOptions {
+    enabled: boolean;
+    ttlSeconds: number;         // Lifetime requested for each cachedContent
+    refreshMarginMs: number;    // Extend the TTL once less than this remains
+    retryAfterMs: number;       // Back-off after a failed create (e.g. prompt below the model's cacheable minimum)
+}
+
+export const DEFAULT_PROMPT_CACHE_OPTIONS: PromptCacheOptions = {
+    enabled: process.env.GEMINI_PROMPT_CACHE !== "false",
+    ttlSeconds: Number(process.env.GEMINI_PROMPT_CACHE_TTL_S) || 3600,
+    refreshMarginMs: 5 * 60 * 1000,
+    retryAfterMs: 10 * 60 * 1000,
+};
+
+export interface PromptCacheStats {
+    handles: number;        // Live cachedContent handles
+    creates: number;
+    refreshes: number;
+    failures: number;
+    hits: number;           // Requests sent with a cachedContent handle
+    misses: number;         // Requests sent with the inline systemInstruction
+}
+
+interface CacheHandle {
+    name: string | null;
+    expiresAt: number;
+    pending: Promise<void> | null;
+    failedAt: number | null;
+}
+
+export class PromptCacheManager {
+    private handles = new Map<string, CacheHandle>();
+    private options: PromptCacheOptions;
+    private getClient: () => GoogleGenAI | null;
+
+    private creates = 0;
+    private refreshes = 0;
+    private failures = 0;
+    private hits = 0;
+    private misses = 0;
+
+    constructor(getClient: () => GoogleGenAI | null, options: Partial<PromptCacheOptions> = {}) {
+        this.getClient = getClient;
+        this.options = { ...DEFAULT_PROMPT_CACHE_OPTIONS, ...options };
+    }
+
+    /**
+     * Errors that mean the handle is gone or unusable server-side
+     */
+    public static isCacheError(error: any): boolean {
+        const message = String(error?.message || "");
+        return /cached ?content/i.test(message);
+    }
+
+    /**
+     * Handle name for a live cache of `systemInstruction` on `model`, or null.
+     * Never blocks: a missing or expiring handle is created/refreshed in the
+     * background and the current request goes out with the inline prompt.
+     */
+    public resolve(model: string, systemInstruction: string): string | null {
+        if (!this.options.enabled) return null;
+
+        const key = this.buildKey(model, systemInstruction);
+        const now = Date.now();
+        let handle = this.handles.get(key);
+
+        if (!handle) {
+            handle = { name: null, expiresAt: 0, pending: null, failedAt: null };
+            this.handles.set(key, handle);
+        }
+
+        if (handle.name && handle.expiresAt > now) {
+            if (handle.expiresAt - now < this.options.refreshMarginMs && !handle.pending) {
+                handle.pending = this.refresh(handle);
+            }
+            return handle.name;
+        }
+
+        const backingOff = handle.failedAt !== null && now - handle.failedAt < this.options.retryAfterMs;
+        if (!handle.pending && !backingOff) {
+            handle.pending = this.create(handle, model, systemInstruction);
+        }
+        return null;
+    }
+
+    /**
+     * Replace an inline string systemInstruction with its cachedContent handle when live.
+     * Returns the config unchanged otherwise (the API rejects both together).
+     */
+    public applyToConfig(model: string, config: any): any {
+        const systemInstruction = config?.systemInstruction;
+        if (typeof systemInstruction !== "string" || config.cachedContent) return config;
+
+        const name = this.resolve(model, systemInstruction);
+        if (!name) {
+            this.misses++;
+            return config;
+        }
+
+        this.hits++;
+        const { systemInstruction: _inline, ...rest } = config;
+        return { ...rest, cachedContent: name };
+    }
+
+    /**
+     * Forget a handle the server rejected; it is recreated on next use
+     */
+    public invalidate(name: string): void {
+        for (const handle of this.handles.values()) {
+            if (handle.name === name) {
+                handle.name = null;
+                handle.expiresAt = 0;
+            }
+        }
+    }
+
+    /**
+     * Drop all handles (e.g. the API key is about to change and they belong to the current project).
+     * Call before swapping the client: the old handles are deleted in the background through it.
+     */
+    public reset(): void {
+        const handles = [...this.handles.values()];
+        this.handles.clear();
+        void this.release(handles, this.getClient());
+    }
+
+    /**
+     * Delete every handle server-side (on quit) so nothing is billed past the session
+     */
+    public async dispose(): Promise<void> {
+        const handles = [...this.handles.values()];
+        this.handles.clear();
+        await this.release(handles, this.getClient());
+    }
+
+    public getStats(): PromptCacheStats {
+        const now = Date.now();
+        let live = 0;
+        for (const handle of this.handles.values()) {
+            if (handle.name && handle.expiresAt > now) live++;
+        }
+        return {
+            handles: live,
+            creates: this.creates,
+            refreshes: this.refreshes,
+            failures: this.failures,
+            hits: this.hits,
+            misses: this.misses,
+        };
+    }
+
+    private buildKey(model: string, systemInstruction: string): string {
+        const digest = crypto.createHash("sha256").update(systemInstruction).digest("hex");
+        return `${model}\0${digest}`;
+    }
+
+    private expiryFrom(expireTime: string | undefined): number {
+        const parsed = expireTime ? Date.parse(expireTime) : NaN;
+        return Number.isFinite(parsed) ? parsed : Date.now() + this.options.ttlSeconds * 1000;
+    }
+
+    /**
+     * Delete `handles` through `client`. A create still in flight is awaited first so its
+     * handle is named; the caller bounds the wait (quit cleanup has its own timeout).
+     */
+    private async release(handles: CacheHandle[], client: GoogleGenAI | null): Promise<void> {
+        await Promise.allSettled(handles.map(handle => handle.pending));
+        const names = handles.map(handle => handle.name).filter((name): name is string => !!name);
+        if (!client) return;
+
+        await Promise.all(names.map(name =>
+            client.caches.delete({ name }).catch((err: any) => {
+                console.warn(`[PromptCache] Failed to delete ${name}:`, err?.message);
+            })
+        ));
+    }
+
+    private async create(handle: CacheHandle, model: string, systemInstruction: string): Promise<void> {
+        const client = this.getClient();
+        if (!client) {
+            handle.pending = null;
+            return;
+        }
+
+        try {
+            const digest = crypto.createHash("sha256").update(systemInstruction).digest("hex");
+            const cache = await client.caches.create({
+                model,
+                config: {
+                    systemInstruction,
+                    ttl: `${this.options.ttlSeconds}s`,
+                    displayName: `natively-${digest.substring(0, 12)}`,
+                },
+            });
+            handle.name = cache.name || null;
+            handle.expiresAt = this.expiryFrom(cache.expireTime);
+            handle.failedAt = null;
+            this.creates++;
+            console.log(`[PromptCache] Created ${handle.name} for ${model}`);
+        } catch (err: any) {
+            handle.failedAt = Date.now();
+            this.failures++;
+            console.warn(`[PromptCache] Create failed for ${model}, using inline system instruction:`, err?.message);
+        } finally {
+            handle.pending = null;
+        }
+    }
+
+    private async refresh(handle: CacheHandle): Promise<void> {
+        const client = this.getClient();
+        const name = handle.name;
+        if (!client || !name) {
+            handle.pending = null;
+            return;
+        }
+
+        try {
+            const cache = await client.caches.update({
+                name,
+                config: { ttl: `${this.options.ttlSeconds}s` },
+            });
+            handle.expiresAt = this.expiryFrom(cache.expireTime);
+            this.refreshes++;
+        } catch (err: any) {
+            // Let it lapse; the next request after expiry creates a fresh one
+            this.failures++;
+            console.warn(`[PromptCache] Refresh failed for ${name}:`, err?.message);
+        } finally {
+            handle.pending = null;
+        }
+    }
+}
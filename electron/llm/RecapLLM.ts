@@ -6,6 +6,7 @@ import { GoogleGenAI } from "@google/genai";
 import { MODE_CONFIGS } from "./types";
 import { buildRecapContents } from "./prompts";
 import { clampResponse } from "./postProcessor";
+import { decodeGeminiStream, runStreamPipeline } from "./streamPipeline";
 
 const GEMINI_FLASH_MODEL = "gemini-3-flash-preview";
 
@@ -24,18 +25,20 @@ export class RecapLLM {
      * @param context - Full conversation to summarize
      * @returns Bullet-point summary (3-5 points)
      */
-    async generate(context: string): Promise<string> {
+    async generate(context: string, signal?: AbortSignal): Promise<string> {
         try {
             if (!context.trim()) {
                 return "";
             }
 
-            const contents = buildRecapContents(context);
+            const { systemInstruction, contents } = buildRecapContents(context);
 
             const response = await this.client.models.generateContent({
                 model: this.modelName,
                 contents: contents,
                 config: {
+                    systemInstruction,
+                    abortSignal: signal,
                     maxOutputTokens: this.config.maxOutputTokens,
                     temperature: this.config.temperature,
                     topP: this.config.topP,
@@ -52,6 +55,7 @@ export class RecapLLM {
             return clampRecapResponse(rawText);
 
         } catch (error) {
+            if (signal?.aborted) return "";
             console.error("[RecapLLM] Generation failed:", error);
             return "";
         }
@@ -60,50 +64,44 @@ export class RecapLLM {
     /**
      * Generate a neutral conversation summary (Streamed)
      */
-    async *generateStream(context: string): AsyncGenerator<string> {
+    async *generateStream(context: string, signal?: AbortSignal): AsyncGenerator<string> {
         try {
             if (!context.trim()) {
                 yield "";
                 return;
             }
 
-            const contents = buildRecapContents(context);
+            const { systemInstruction, contents, report } = buildRecapContents(context);
 
             console.log(`[RecapLLM] Starting stream with model: ${this.modelName}`);
 
+            const startedAt = Date.now();
             const streamResult = await this.client.models.generateContentStream({
                 model: this.modelName,
                 contents: contents,
                 config: {
+                    systemInstruction,
+                    abortSignal: signal,
                     maxOutputTokens: this.config.maxOutputTokens,
                     temperature: this.config.temperature,
                     topP: this.config.topP,
                 },
             });
 
-            // @ts-ignore
-            const stream = streamResult.stream || streamResult;
-
-            for await (const chunk of stream) {
-                let text = "";
-                // Robust handling
-                if (typeof chunk.text === 'function') {
-                    text = chunk.text();
-                } else if (typeof chunk.text === 'string') {
-                    text = chunk.text;
-                } else if (chunk.candidates?.[0]?.content?.parts?.[0]?.text) {
-                    text = chunk.candidates[0].content.parts[0].text;
-                }
-
-                if (text) {
-                    yield text;
-                }
-            }
+            yield* runStreamPipeline(decodeGeminiStream(streamResult), {
+                mode: "recap",
+                model: this.modelName,
+                startedAt,
+                promptTokens: report.estimatedTokens,
+                signal,
+            });
             // Note: We cannot easily clamp streaming response content (max 5 bullets) in real-time without buffering.
             // For now, we rely on the prompt to be concise, or we let the UI clamp it.
             // The prompt "Summarize in 3-5 bullet points" is usually strong enough.
 
         } catch (error) {
+            // Cancelled by the caller: the HTTP stream is already closed, emit nothing
+            if (signal?.aborted) return;
             console.error("[RecapLLM] Streaming generation failed:", error);
             yield "";
         }
@@ -0,0 +1,206 @@
+// electron/llm/ResponseCache.ts
+// Content-addressed LRU + TTL cache for LLM responses
+// Keyed on normalized prompt + model id + image bytes, with an optional on-disk tier
+
+import crypto from "crypto";
+import fs from "fs";
+import path from "path";
+
+export interface ResponseCacheOptions {
+    maxEntries: number;        // In-memory LRU capacity
+    ttlMs: number;             // Entry lifetime (memory and disk)
+    diskDir: string | null;    // Directory for the persistent tier, null = memory only
+}
+
+export const DEFAULT_RESPONSE_CACHE_OPTIONS: ResponseCacheOptions = {
+    maxEntries: Number(process.env.LLM_CACHE_MAX_ENTRIES) || 100,
+    ttlMs: Number(process.env.LLM_CACHE_TTL_MS) || 5 * 60 * 1000,
+    diskDir: null,
+};
+
+export interface ResponseCacheStats {
+    hits: number;
+    diskHits: number;
+    misses: number;
+    evictions: number;
+    entries: number;
+    hitRate: number;
+    diskEnabled: boolean;
+}
+
+export interface CacheKeyInput {
+    kind: string;          // Which API produced the response (chat, solution, ...)
+    model: string;
+    prompt: string;
+    images?: Array<Buffer | string>;   // Raw bytes or already-encoded (base64) payloads
+}
+
+interface CacheEntry<T> {
+    value: T;
+    expiresAt: number;
+}
+
+/**
+ * Normalize prompt text so cosmetic whitespace differences map to the same key
+ */
+export function normalizePrompt(prompt: string): string {
+    return prompt
+        .replace(/\r\n/g, "\n")
+        .replace(/[ \t]+/g, " ")
+        .replace(/ ?\n ?/g, "\n")
+        .trim();
+}
+
+/**
+ * Build a content-addressed cache key
+ */
+export function buildCacheKey(input: CacheKeyInput): string {
+    const hash = crypto.createHash("sha256");
+    hash.update(input.kind);
+    hash.update("\0");
+    hash.update(input.model);
+    hash.update("\0");
+    hash.update(normalizePrompt(input.prompt));
+    for (const image of input.images || []) {
+        hash.update("\0");
+        hash.update(crypto.createHash("sha256").update(image).digest());
+    }
+    return hash.digest("hex");
+}
+
+export class ResponseCache<T = unknown> {
+    private memory = new Map<string, CacheEntry<T>>(); // Map iteration order = LRU order
+    private options: ResponseCacheOptions;
+
+    private hits = 0;
+    private diskHits = 0;
+    private misses = 0;
+    private evictions = 0;
+
+    constructor(options: Partial<ResponseCacheOptions> = {}) {
+        this.options = { ...DEFAULT_RESPONSE_CACHE_OPTIONS, ...options };
+
+        if (this.options.diskDir) {
+            try {
+                fs.mkdirSync(this.options.diskDir, { recursive: true });
+                this.pruneDisk().catch(() => { });
+            } catch (err) {
+                console.warn("[ResponseCache] Disk tier disabled, could not create cache dir:", err);
+                this.options.diskDir = null;
+            }
+        }
+    }
+
+    public async get(key: string): Promise<T | undefined> {
+        const now = Date.now();
+        const entry = this.memory.get(key);
+
+        if (entry) {
+            if (entry.expiresAt > now) {
+                // Refresh recency
+                this.memory.delete(key);
+                this.memory.set(key, entry);
+                this.hits++;
+                return entry.value;
+            }
+            this.memory.delete(key);
+        }
+
+        const diskEntry = await this.readDisk(key);
+        if (diskEntry && diskEntry.expiresAt > now) {
+            this.setMemory(key, diskEntry);
+            this.diskHits++;
+            return diskEntry.value;
+        }
+
+        this.misses++;
+        return undefined;
+    }
+
+    public set(key: string, value: T): void {
+        const entry: CacheEntry<T> = { value, expiresAt: Date.now() + this.options.ttlMs };
+        this.setMemory(key, entry);
+
+        if (this.options.diskDir) {
+            fs.promises.writeFile(this.diskPath(key), JSON.stringify(entry), "utf8").catch((err) => {
+                console.warn("[ResponseCache] Failed to write disk entry:", err);
+            });
+        }
+    }
+
+    public async clear(): Promise<void> {
+        this.memory.clear();
+        if (!this.options.diskDir) return;
+
+        const files = await fs.promises.readdir(this.options.diskDir).catch(() => [] as string[]);
+        await Promise.all(files
+            .filter(file => file.endsWith(".json"))
+            .map(file => fs.promises.unlink(path.join(this.options.diskDir!, file)).catch(() => { })));
+    }
+
+    public getStats(): ResponseCacheStats {
+        const lookups = this.hits + this.diskHits + this.misses;
+        return {
+            hits: this.hits,
+            diskHits: this.diskHits,
+            misses: this.misses,
+            evictions: this.evictions,
+            entries: this.memory.size,
+            hitRate: lookups > 0 ? (this.hits + this.diskHits) / lookups : 0,
+            diskEnabled: !!this.options.diskDir,
+        };
+    }
+
+    private setMemory(key: string, entry: CacheEntry<T>): void {
+        this.memory.delete(key);
+        this.memory.set(key, entry);
+
+        while (this.memory.size > this.options.maxEntries) {
+            const oldestKey = this.memory.keys().next().value as string;
+            this.memory.delete(oldestKey);
+            this.evictions++;
+        }
+    }
+
+    private diskPath(key: string): string {
+        return path.join(this.options.diskDir!, `${key}.json`);
+    }
+
+    private async readDisk(key: string): Promise<CacheEntry<T> | null> {
+        if (!this.options.diskDir) return null;
+        try {
+            const raw = await fs.promises.readFile(this.diskPath(key), "utf8");
+            const entry = JSON.parse(raw) as CacheEntry<T>;
+            if (entry.expiresAt <= Date.now()) {
+                fs.promises.unlink(this.diskPath(key)).catch(() => { });
+                return null;
+            }
+            return entry;
+        } catch {
+            return null;
+        }
+    }
+
+    /**
+     * Remove expired entries left over from previous sessions
+     */
+    private async pruneDisk(): Promise<void> {
+        const dir = this.options.diskDir;
+        if (!dir) return;
+
+        const now = Date.now();
+        const files = await fs.promises.readdir(dir);
+        for (const file of files) {
+            if (!file.endsWith(".json")) continue;
+            const filePath = path.join(dir, file);
+            try {
+                const entry = JSON.parse(await fs.promises.readFile(filePath, "utf8")) as CacheEntry<T>;
+                if (entry.expiresAt <= now) {
+                    await fs.promises.unlink(filePath);
+                }
+            } catch {
+                await fs.promises.unlink(filePath).catch(() => { });
+            }
+        }
+    }
+}
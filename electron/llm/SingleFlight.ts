@@ -0,0 +1,211 @@
+// electron/llm/SingleFlight.ts
+// Single-flight coalescing of identical in-flight LLM requests
+// A request whose key matches one already running attaches to it instead of starting a duplicate generation
+
+import crypto from "crypto";
+import { createAbortError } from "./hedging";
+
+export interface SingleFlightStats {
+    inFlight: number;
+    started: number;        // Underlying calls actually made
+    coalesced: number;      // Requests that attached to a call already in flight
+}
+
+interface Flight {
+    controller: AbortController;    // Cancels the shared call once nobody is waiting on it
+    subscribers: number;
+}
+
+interface CallFlight<T> extends Flight {
+    promise: Promise<T>;
+}
+
+interface StreamFlight extends Flight {
+    tokens: string[];               // Everything produced so far, replayed to late joiners
+    done: boolean;
+    failed: boolean;
+    error: unknown;
+    wake: Array<() => void>;
+}
+
+/**
+ * Key for a request from its normalized inputs (whitespace-insensitive)
+ */
+export function singleFlightKey(...parts: Array<string | number | boolean | null | undefined>): string {
+    const normalized = parts.map(part =>
+        typeof part === "string" ? part.replace(/\s+/g, " ").trim() : String(part ?? "")
+    );
+    return crypto.createHash("sha256").update(JSON.stringify(normalized)).digest("hex");
+}
+
+export class SingleFlight {
+    private calls = new Map<string, CallFlight<any>>();
+    private streams = new Map<string, StreamFlight>();
+
+    private started = 0;
+    private coalesced = 0;
+
+    /**
+     * Run `call` unless an identical one is in flight, in which case share its result.
+     * A subscriber's signal only detaches that subscriber (it rejects with AbortError);
+     * the shared call is aborted when its last subscriber leaves.
+     */
+    public run<T>(key: string, call: (signal: AbortSignal) => Promise<T>, signal?: AbortSignal): Promise<T> {
+        if (signal?.aborted) return Promise.reject(createAbortError());
+
+        let flight = this.calls.get(key) as CallFlight<T> | undefined;
+        if (flight) {
+            this.coalesced++;
+        } else {
+            const controller = new AbortController();
+            const created: CallFlight<T> = {
+                controller,
+                subscribers: 0,
+                promise: call(controller.signal).finally(() => {
+                    if (this.calls.get(key) === created) this.calls.delete(key);
+                }),
+            };
+            // Nobody may be listening any more by the time it settles
+            created.promise.catch(() => { });
+            this.calls.set(key, created);
+            this.started++;
+            flight = created;
+        }
+
+        flight.subscribers++;
+        const shared = flight;
+
+        return new Promise<T>((resolve, reject) => {
+            let settled = false;
+            const detach = () => {
+                settled = true;
+                signal?.removeEventListener("abort", onAbort);
+            };
+            const onAbort = () => {
+                if (settled) return;
+                detach();
+                this.release(this.calls, key, shared, false);
+                reject(createAbortError());
+            };
+            signal?.addEventListener("abort", onAbort, { once: true });
+
+            shared.promise.then(
+                (value) => {
+                    if (settled) return;
+                    detach();
+                    shared.subscribers--;
+                    resolve(value);
+                },
+                (error) => {
+                    if (settled) return;
+                    detach();
+                    shared.subscribers--;
+                    reject(error);
+                }
+            );
+        });
+    }
+
+    /**
+     * Stream tokens from `start` unless an identical stream is in flight, in which case
+     * replay what it has produced so far and follow it live. Every subscriber sees the
+     * same token sequence. An aborted subscriber simply stops receiving tokens.
+     */
+    public async *stream(key: string, start: (signal: AbortSignal) => AsyncIterable<string>, signal?: AbortSignal): AsyncGenerator<string, void, unknown> {
+        if (signal?.aborted) return;
+
+        let flight = this.streams.get(key);
+        if (flight) {
+            this.coalesced++;
+        } else {
+            flight = this.startStream(key, start);
+        }
+        flight.subscribers++;
+
+        let index = 0;
+        try {
+            while (true) {
+                if (signal?.aborted) return;
+                if (index < flight.tokens.length) {
+                    yield flight.tokens[index++];
+                    continue;
+                }
+                if (flight.done) {
+                    if (flight.failed) throw flight.error;
+                    return;
+                }
+                await this.waitForUpdate(flight, signal);
+            }
+        } finally {
+            this.release(this.streams, key, flight, flight.done);
+        }
+    }
+
+    public getStats(): SingleFlightStats {
+        return {
+            inFlight: this.calls.size + this.streams.size,
+            started: this.started,
+            coalesced: this.coalesced,
+        };
+    }
+
+    private startStream(key: string, start: (signal: AbortSignal) => AsyncIterable<string>): StreamFlight {
+        const flight: StreamFlight = {
+            controller: new AbortController(),
+            subscribers: 0,
+            tokens: [],
+            done: false,
+            failed: false,
+            error: null,
+            wake: [],
+        };
+        this.streams.set(key, flight);
+        this.started++;
+
+        const notify = () => {
+            const waiting = flight.wake;
+            flight.wake = [];
+            waiting.forEach(wake => wake());
+        };
+
+        (async () => {
+            try {
+                for await (const token of start(flight.controller.signal)) {
+                    flight.tokens.push(token);
+                    notify();
+                }
+            } catch (error) {
+                flight.failed = true;
+                flight.error = error;
+            } finally {
+                flight.done = true;
+                if (this.streams.get(key) === flight) this.streams.delete(key);
+                notify();
+            }
+        })();
+
+        return flight;
+    }
+
+    private waitForUpdate(flight: StreamFlight, signal?: AbortSignal): Promise<void> {
+        return new Promise<void>(resolve => {
+            const wake = () => {
+                signal?.removeEventListener("abort", wake);
+                resolve();
+            };
+            flight.wake.push(wake);
+            signal?.addEventListener("abort", wake, { once: true });
+        });
+    }
+
+    /**
+     * Drop one subscriber; abandon the shared call if it was the last one still waiting
+     */
+    private release(flights: Map<string, Flight>, key: string, flight: Flight, finished: boolean): void {
+        flight.subscribers--;
+        if (flight.subscribers > 0 || finished) return;
+
+        flight.controller.abort();
+        if (flights.get(key) === flight) flights.delete(key);
+    }
+}
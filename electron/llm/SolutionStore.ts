@@ -0,0 +1,78 @@
+// electron/llm/SolutionStore.ts
+// Latest solution per problem, so a debug round starts from the previous answer
+// Keyed by a hash of the problem info; a debug result replaces the solution it was based on
+
+import crypto from "crypto";
+import { isPartialResult } from "./structuredOutput";
+
+export type SolutionSource = "solution" | "debug";
+
+export interface StoredSolution {
+    result: any;                // { solution: { code, ... } } as returned by the structured calls
+    source: SolutionSource;
+    updatedAt: number;
+}
+
+export interface SolutionStoreStats {
+    entries: number;
+    hits: number;
+    misses: number;
+}
+
+export function solutionStoreKey(problemInfo: unknown): string {
+    return crypto.createHash("sha256").update(JSON.stringify(problemInfo)).digest("hex");
+}
+
+export class SolutionStore {
+    private entries = new Map<string, StoredSolution>();       // Map order = LRU order
+    private readonly maxEntries: number;
+
+    private hits = 0;
+    private misses = 0;
+
+    constructor(maxEntries: number = 8) {
+        this.maxEntries = maxEntries;
+    }
+
+    public get(problemInfo: unknown): StoredSolution | undefined {
+        const key = solutionStoreKey(problemInfo);
+        const entry = this.entries.get(key);
+        if (!entry) {
+            this.misses++;
+            return undefined;
+        }
+        this.entries.delete(key);
+        this.entries.set(key, entry);
+        this.hits++;
+        return entry;
+    }
+
+    /**
+     * Keep `result` as the problem's latest solution. Truncated results and ones
+     * without code are not kept: the next debug round would build on them.
+     */
+    public set(problemInfo: unknown, result: any, source: SolutionSource): void {
+        if (typeof result?.solution?.code !== "string" || isPartialResult(result)) return;
+        const key = solutionStoreKey(problemInfo);
+        this.entries.delete(key);
+        this.entries.set(key, { result, source, updatedAt: Date.now() });
+
+        while (this.entries.size > this.maxEntries) {
+            const oldest = this.entries.keys().next().value;
+            if (oldest === undefined) break;
+            this.entries.delete(oldest);
+        }
+    }
+
+    public clear(): void {
+        this.entries.clear();
+    }
+
+    public getStats(): SolutionStoreStats {
+        return {
+            entries: this.entries.size,
+            hits: this.hits,
+            misses: this.misses,
+        };
+    }
+}
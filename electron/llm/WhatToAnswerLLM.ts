@@ -5,9 +5,17 @@
 
 import { GoogleGenAI } from "@google/genai";
 import { WHAT_TO_ANSWER_PROMPT, buildWhatToAnswerContents } from "./prompts";
+import { decodeGeminiStream, runStreamPipeline } from "./streamPipeline";
 
 const GEMINI_FLASH_MODEL = "gemini-3-flash-preview";
 
+// Common prefixes/labels the model puts before the answer
+const ANSWER_PREFIXES = [
+    "Answer:", "Response:", "Suggestion:", "Here's what you could say:",
+    "You could say:", "Try saying:", "Say:", "Inferred question:",
+    "Based on the conversation,"
+];
+
 export class WhatToAnswerLLM {
     private client: GoogleGenAI;
     private modelName: string;
@@ -27,7 +35,7 @@ export class WhatToAnswerLLM {
     /**
      * Generate a spoken interview answer from transcript context (Streamed)
      */
-    async *generateStream(cleanedTranscript: string): AsyncGenerator<string> {
+    async *generateStream(cleanedTranscript: string, signal?: AbortSignal): AsyncGenerator<string> {
         try {
             // Handle empty/thin transcript gracefully
             if (!cleanedTranscript || cleanedTranscript.trim().length < 10) {
@@ -36,96 +44,58 @@ export class WhatToAnswerLLM {
                 return;
             }
 
-            const contents = buildWhatToAnswerContents(cleanedTranscript);
+            const { systemInstruction, contents, report } = buildWhatToAnswerContents(cleanedTranscript);
 
+            const startedAt = Date.now();
             const streamResult = await this.client.models.generateContentStream({
                 model: this.modelName,
                 contents: contents,
                 config: {
+                    systemInstruction,
+                    abortSignal: signal,
                     maxOutputTokens: 65536,
                     temperature: 0.3,
                     topP: 0.9,
                 },
             });
 
-            // @ts-ignore
-            const stream = streamResult.stream || streamResult;
-
-            let buffer = "";
-            let prefixChecked = false;
-            // Common prefixes to strip
-            const prefixes = [
-                "Answer:", "Response:", "Suggestion:", "Here's what you could say:",
-                "You could say:", "Try saying:", "Say:", "Inferred question:",
-                "Based on the conversation,"
-            ];
-
-            for await (const chunk of stream) {
-                let text = "";
-                // Robust handling
-                if (typeof chunk.text === 'function') {
-                    text = chunk.text();
-                } else if (typeof chunk.text === 'string') {
-                    text = chunk.text;
-                } else if (chunk.candidates?.[0]?.content?.parts?.[0]?.text) {
-                    text = chunk.candidates[0].content.parts[0].text;
-                }
-
-                if (!text) continue;
-
-                if (!prefixChecked) {
-                    buffer += text;
-                    // Wait for enough characters to check prefix, or just check what we have
-                    if (buffer.length > 50) {
-                        // Check prefix
-                        let content = buffer;
-                        for (const prefix of prefixes) {
-                            if (content.toLowerCase().startsWith(prefix.toLowerCase())) {
-                                content = content.substring(prefix.length).trimStart();
-                            }
-                        }
-                        // Strip markdown check (simplified for streaming - handled by UI mostly)
-
-                        yield content;
-                        buffer = "";
-                        prefixChecked = true;
-                    }
-                } else {
-                    yield text;
-                }
-            }
-
-            // Flush remaining buffer if verified
-            if (!prefixChecked && buffer.length > 0) {
-                let content = buffer;
-                for (const prefix of prefixes) {
-                    if (content.toLowerCase().startsWith(prefix.toLowerCase())) {
-                        content = content.substring(prefix.length).trimStart();
-                    }
-                }
-                yield content;
-            }
+            // Same cleanup as cleanOutput(), applied incrementally; the answer is
+            // read out loud, so a trailing "let me know if..." is dropped as well
+            yield* runStreamPipeline(decodeGeminiStream(streamResult), {
+                mode: "what_to_answer",
+                model: this.modelName,
+                startedAt,
+                promptTokens: report.estimatedTokens,
+                prefixes: ANSWER_PREFIXES,
+                markdown: "normalize",
+                stripFillers: true,
+                signal,
+            });
 
         } catch (error) {
+            // Cancelled by the caller: the HTTP stream is already closed, emit nothing
+            if (signal?.aborted) return;
             console.error("[WhatToAnswerLLM] Streaming generation failed:", error);
             // Fallback for stream error
             yield this.getFallbackAnswer();
         }
     }
 
-    async generate(cleanedTranscript: string): Promise<string> {
+    async generate(cleanedTranscript: string, signal?: AbortSignal): Promise<string> {
         try {
             // Handle empty/thin transcript gracefully
             if (!cleanedTranscript || cleanedTranscript.trim().length < 10) {
                 return this.getFallbackAnswer();
             }
 
-            const contents = buildWhatToAnswerContents(cleanedTranscript);
+            const { systemInstruction, contents } = buildWhatToAnswerContents(cleanedTranscript);
 
             const response = await this.client.models.generateContent({
                 model: this.modelName,
                 contents: contents,
                 config: {
+                    systemInstruction,
+                    abortSignal: signal,
                     maxOutputTokens: 65536,
                     temperature: 0.3,
                     topP: 0.9,
@@ -148,6 +118,7 @@ export class WhatToAnswerLLM {
             return cleaned;
 
         } catch (error) {
+            if (signal?.aborted) return "";
             console.error("[WhatToAnswerLLM] Generation failed:", error);
             return this.getFallbackAnswer();
         }
@@ -187,12 +158,7 @@ export class WhatToAnswerLLM {
         });
 
         // Strip common prefixes/labels
-        const prefixes = [
-            "Answer:", "Response:", "Suggestion:", "Here's what you could say:",
-            "You could say:", "Try saying:", "Say:", "Inferred question:",
-            "Based on the conversation,"
-        ];
-        for (const prefix of prefixes) {
+        for (const prefix of ANSWER_PREFIXES) {
             if (result.toLowerCase().startsWith(prefix.toLowerCase())) {
                 result = result.substring(prefix.length).trim();
             }
@@ -0,0 +1,205 @@
+// electron/llm/hedging.ts
+// Hedged request scheduler driven by per-model latency percentiles
+// Start a backup model only when the primary is slower than usual, take the first good answer
+
+import { HedgeBudget } from "./types";
+
+const LATENCY_WINDOW = 50;     // Samples kept per model
+const MIN_SAMPLES = 5;         // Below this the budget's default delay is used
+
+/**
+ * Rolling per-model latency samples (successful requests only)
+ */
+export class LatencyTracker {
+    private samples = new Map<string, number[]>();
+
+    public record(model: string, latencyMs: number): void {
+        const list = this.samples.get(model) || [];
+        list.push(latencyMs);
+        if (list.length > LATENCY_WINDOW) {
+            list.shift();
+        }
+        this.samples.set(model, list);
+    }
+
+    /**
+     * p in [0, 1]. Returns null until enough samples exist.
+     */
+    public percentile(model: string, p: number): number | null {
+        const list = this.samples.get(model);
+        if (!list || list.length < MIN_SAMPLES) return null;
+
+        const sorted = [...list].sort((a, b) => a - b);
+        const index = Math.min(sorted.length - 1, Math.max(0, Math.ceil(p * sorted.length) - 1));
+        return sorted[index];
+    }
+
+    public getSampleCount(model: string): number {
+        return this.samples.get(model)?.length || 0;
+    }
+}
+
+/**
+ * Why the winning attempt won
+ * - primary: primary answered before the hedge deadline
+ * - primary_after_hedge: backup was started but the primary still answered first
+ * - hedge_faster: primary was slow past the deadline, backup answered first
+ * - primary_failed: primary threw, backup was started immediately and answered
+ * - primary_empty: primary returned an unusable response, backup answered
+ */
+export type HedgeReason = "primary" | "primary_after_hedge" | "hedge_faster" | "primary_failed" | "primary_empty";
+
+export interface HedgeOutcome<T> {
+    value: T;
+    model: string;
+    reason: HedgeReason;
+    hedged: boolean;        // Whether a backup attempt was started
+    hedgeDelayMs: number;   // Deadline used before starting the backup
+    latencyMs: number;      // Time to the winning answer
+}
+
+export interface HedgeAttempt<T> {
+    model: string;
+    run: (signal: AbortSignal) => Promise<T>;
+}
+
+/**
+ * Deadline after which the backup is started: the configured percentile of the
+ * primary's recent latency, clamped to the budget bounds
+ */
+export function computeHedgeDelay(tracker: LatencyTracker, model: string, budget: HedgeBudget): number {
+    const observed = tracker.percentile(model, budget.percentile);
+    const delay = observed ?? budget.defaultDelayMs;
+    return Math.min(budget.maxDelayMs, Math.max(budget.minDelayMs, delay));
+}
+
+/**
+ * Run `primary`; if it hasn't produced a valid answer by `hedgeDelayMs`, or fails
+ * before that, start `backup` and return whichever produces a valid answer first.
+ * The losing attempt is aborted.
+ *
+ * Resolves null if every attempt returned an invalid value; rejects with the
+ * primary's error if every attempt threw. Aborting `options.signal` cancels
+ * every attempt and rejects with an AbortError.
+ */
+export async function runHedged<T>(
+    primary: HedgeAttempt<T>,
+    backup: HedgeAttempt<T> | null,
+    options: { hedgeDelayMs: number; isValid: (value: T) => boolean; tracker?: LatencyTracker; signal?: AbortSignal }
+): Promise<HedgeOutcome<T> | null> {
+    const startedAt = Date.now();
+    const controllers = new Map<string, AbortController>();
+
+    if (options.signal?.aborted) {
+        throw createAbortError();
+    }
+
+    return new Promise<HedgeOutcome<T> | null>((resolve, reject) => {
+        let settled = false;
+        let hedged = false;
+        let hedgeTimer: NodeJS.Timeout | null = null;
+        let pending = 0;
+        let primaryFailure: "primary_failed" | "primary_empty" | null = null;
+        const errors: unknown[] = [];
+
+        const onCallerAbort = () => finish(null, createAbortError());
+
+        const finish = (outcome: HedgeOutcome<T> | null, error?: unknown) => {
+            if (settled) return;
+            settled = true;
+            if (hedgeTimer) clearTimeout(hedgeTimer);
+            options.signal?.removeEventListener("abort", onCallerAbort);
+            // Cancel the loser(s)
+            for (const [model, controller] of controllers) {
+                if (!outcome || outcome.model !== model) controller.abort();
+            }
+            if (error !== undefined) {
+                reject(error);
+            } else {
+                resolve(outcome);
+            }
+        };
+
+        const settleIfExhausted = () => {
+            if (pending > 0 || settled) return;
+            if (!hedged && backup) {
+                startBackup();
+                return;
+            }
+            if (errors.length > 0 && errors.length === controllers.size) {
+                finish(null, errors[0]);
+            } else {
+                finish(null);
+            }
+        };
+
+        const launch = (attempt: HedgeAttempt<T>, isPrimary: boolean) => {
+            const controller = new AbortController();
+            controllers.set(attempt.model, controller);
+            pending++;
+            const attemptStartedAt = Date.now();
+
+            attempt.run(controller.signal).then((value) => {
+                pending--;
+                if (settled) return;
+                options.tracker?.record(attempt.model, Date.now() - attemptStartedAt);
+
+                if (options.isValid(value)) {
+                    let reason: HedgeReason;
+                    if (isPrimary) {
+                        reason = hedged ? "primary_after_hedge" : "primary";
+                    } else {
+                        reason = primaryFailure || "hedge_faster";
+                    }
+                    finish({
+                        value,
+                        model: attempt.model,
+                        reason,
+                        hedged,
+                        hedgeDelayMs: options.hedgeDelayMs,
+                        latencyMs: Date.now() - startedAt,
+                    });
+                    return;
+                }
+
+                if (isPrimary) primaryFailure = "primary_empty";
+                settleIfExhausted();
+            }, (error) => {
+                pending--;
+                if (settled) return;
+                errors.push(error);
+                if (isPrimary) primaryFailure = "primary_failed";
+                settleIfExhausted();
+            });
+        };
+
+        const startBackup = () => {
+            if (hedged || settled || !backup) return;
+            hedged = true;
+            if (hedgeTimer) {
+                clearTimeout(hedgeTimer);
+                hedgeTimer = null;
+            }
+            launch(backup, false);
+        };
+
+        options.signal?.addEventListener("abort", onCallerAbort, { once: true });
+        launch(primary, true);
+        if (backup) {
+            hedgeTimer = setTimeout(startBackup, options.hedgeDelayMs);
+        }
+    });
+}
+
+/**
+ * Error thrown when the caller cancels; matches what fetch/the SDK throw on abort
+ */
+export function createAbortError(): Error {
+    const error = new Error("The operation was aborted");
+    error.name = "AbortError";
+    return error;
+}
+
+export function isAbortError(error: unknown): boolean {
+    return (error as Error)?.name === "AbortError";
+}
@@ -15,8 +15,42 @@ export {
     prepareTranscriptForWhatToAnswer
 } from "./transcriptCleaner";
 export type { TranscriptTurn } from "./transcriptCleaner";
-export { MODE_CONFIGS } from "./types";
-export type { GenerationConfig, GeminiContent, LLMClient } from "./types";
+export { SingleFlight, singleFlightKey } from "./SingleFlight";
+export type { SingleFlightStats } from "./SingleFlight";
+export {
+    estimateTokens,
+    fitTranscript,
+    getInputTokenBudget,
+    setInputTokenBudget,
+    promptSizeTracker
+} from "./promptBudget";
+export type { PromptSizeStats } from "./promptBudget";
+export {
+    runStreamPipeline,
+    composeStages,
+    decodeGeminiStream,
+    measureStage,
+    stripPrefixStage,
+    markdownStage,
+    stripFillerStage,
+    streamMetricsTracker
+} from "./streamPipeline";
+export type { StreamStage, StreamPipelineOptions, StreamMetrics, StreamModeStats, MarkdownPolicy } from "./streamPipeline";
+export {
+    PROBLEM_INFO_SCHEMA,
+    SOLUTION_SCHEMA,
+    parsePartialJson,
+    IncrementalJsonParser,
+    parseStructuredJson,
+    missingRequiredFields,
+    isPartialResult,
+    toJsonSchema,
+    streamStructuredFields,
+    structuredOutputTracker
+} from "./structuredOutput";
+export type { PartialJson, StructuredOutputStats, StructuredUpdate } from "./structuredOutput";
+export { MODE_CONFIGS, INPUT_TOKEN_BUDGETS, OUTPUT_TOKEN_BUDGETS } from "./types";
+export type { GenerationConfig, GeminiContent, LLMClient, PromptRequest, PromptMode, PromptBudgetReport } from "./types";
 export {
     HARD_SYSTEM_PROMPT,
     ANSWER_MODE_PROMPT,
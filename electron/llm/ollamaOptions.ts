@@ -0,0 +1,126 @@
+// electron/llm/ollamaOptions.ts
+// Per-request Ollama `options` sized for CPU-only hosts
+// num_ctx from the prompt, num_thread from the cores the app can spare, num_predict from the mode's output budget
+
+import os from "os";
+import { OUTPUT_TOKEN_BUDGETS, PromptMode } from "./types";
+
+export interface OllamaOptionSizing {
+    minCtx: number;             // Smallest context window ever requested
+    maxCtx: number;             // Never allocate a KV cache larger than this
+    ctxMarginTokens: number;    // Headroom for template tokens and estimate error
+    reservedCores: number;      // Logical cores left for Electron, audio capture and the renderer
+    numThread: number | null;   // Fixed thread count (overrides the core-based sizing)
+    temperature: number;
+    topP: number;
+}
+
+export const DEFAULT_OLLAMA_OPTION_SIZING: OllamaOptionSizing = {
+    // Covers the chat input budget plus its output budget, so most sessions never grow past it
+    minCtx: Number(process.env.OLLAMA_MIN_CTX) || 4096,
+    maxCtx: Number(process.env.OLLAMA_MAX_CTX) || 16384,
+    ctxMarginTokens: 256,
+    reservedCores: process.env.OLLAMA_RESERVED_CORES !== undefined ? Number(process.env.OLLAMA_RESERVED_CORES) : 2,
+    numThread: Number(process.env.OLLAMA_NUM_THREAD) || null,
+    temperature: 0.7,
+    topP: 0.9,
+};
+
+export interface OllamaRequestOptionsBody {
+    temperature: number;
+    top_p: number;
+    num_ctx: number;
+    num_thread: number;
+    num_predict: number;
+}
+
+export interface OllamaOptionsStats {
+    model: string | null;
+    numCtx: number;
+    numThread: number;
+    ctxGrowths: number;     // Times the window had to grow (each one reloads the model)
+    maxCtx: number;
+}
+
+/**
+ * Threads for llama.cpp: at most one per physical core (SMT siblings only add
+ * contention), and never more than what is left after the app's reservation
+ */
+export function computeNumThread(reservedCores: number, logicalCores: number = os.availableParallelism?.() ?? os.cpus().length): number {
+    // Node doesn't expose the physical core count; assume 2-way SMT on anything with 4+ threads
+    const physicalCores = logicalCores >= 4 ? Math.floor(logicalCores / 2) : logicalCores;
+    return Math.max(1, Math.min(physicalCores, logicalCores - reservedCores));
+}
+
+/**
+ * Smallest power-of-two context (within [minCtx, maxCtx]) that holds the prompt and the answer
+ */
+export function computeNumCtx(promptTokens: number, numPredict: number, sizing: OllamaOptionSizing): number {
+    const needed = promptTokens + numPredict + sizing.ctxMarginTokens;
+    let ctx = sizing.minCtx;
+    while (ctx < needed && ctx < sizing.maxCtx) ctx *= 2;
+    return Math.min(ctx, sizing.maxCtx);
+}
+
+/**
+ * Picks the options for each request. A different num_ctx makes Ollama reload the
+ * model (and drop its KV cache), so the window only ever grows within a model's
+ * lifetime: small prompts reuse the current window rather than shrinking it.
+ */
+export class OllamaOptionsPlanner {
+    private sizing: OllamaOptionSizing;
+    private numThread: number;
+    private model: string | null = null;
+    private currentCtx = 0;
+    private ctxGrowths = 0;
+
+    constructor(sizing: Partial<OllamaOptionSizing> = {}) {
+        this.sizing = { ...DEFAULT_OLLAMA_OPTION_SIZING, ...sizing };
+        this.numThread = this.sizing.numThread ?? computeNumThread(this.sizing.reservedCores);
+    }
+
+    /**
+     * `numPredict` overrides the mode's output budget (e.g. for structured JSON answers)
+     */
+    public forRequest(model: string, mode: PromptMode, promptTokens: number, numPredict: number = OUTPUT_TOKEN_BUDGETS[mode]): OllamaRequestOptionsBody {
+        if (model !== this.model) {
+            this.model = model;
+            this.currentCtx = 0;
+        }
+
+        const ctx = computeNumCtx(promptTokens, numPredict, this.sizing);
+        if (ctx > this.currentCtx) {
+            if (this.currentCtx > 0) {
+                this.ctxGrowths++;
+                console.log(`[OllamaOptions] Growing num_ctx ${this.currentCtx} -> ${ctx} for ~${promptTokens} prompt tokens (model reload)`);
+            }
+            this.currentCtx = ctx;
+        }
+
+        return {
+            temperature: this.sizing.temperature,
+            top_p: this.sizing.topP,
+            num_ctx: this.currentCtx,
+            num_thread: this.numThread,
+            num_predict: numPredict,
+        };
+    }
+
+    /**
+     * Options to load `model` with, matching what its first request will send
+     */
+    public forPreload(model: string): Omit<OllamaRequestOptionsBody, "num_predict"> {
+        const { num_predict, ...options } = this.forRequest(model, "answer", 0);
+        return options;
+    }
+
+    public getStats(): OllamaOptionsStats {
+        return {
+            model: this.model,
+            numCtx: this.currentCtx,
+            numThread: this.numThread,
+            ctxGrowths: this.ctxGrowths,
+            maxCtx: this.sizing.maxCtx,
+        };
+    }
+}
@@ -0,0 +1,162 @@
+// electron/llm/ollamaStream.ts
+// Incremental NDJSON streaming client for Ollama /api/generate and /api/chat
+// Tokens are yielded as soon as each line arrives - no waiting for the full response
+
+import { Readable } from "stream";
+import { OllamaTransport } from "./OllamaTransport";
+import { createAbortError } from "./hedging";
+
+/**
+ * One NDJSON line from /api/generate or /api/chat (stream: true)
+ * The final line (done: true) carries the timing counters.
+ */
+export interface OllamaStreamChunk {
+    model?: string;
+    response?: string;                              // /api/generate
+    message?: { role: string; content: string };    // /api/chat
+    done: boolean;
+    done_reason?: string;
+    error?: string;
+    context?: number[];
+    total_duration?: number;        // nanoseconds
+    load_duration?: number;
+    prompt_eval_count?: number;
+    prompt_eval_duration?: number;
+    eval_count?: number;
+    eval_duration?: number;
+}
+
+export type OllamaStreamPath = "/api/generate" | "/api/chat";
+
+/**
+ * Parse a byte stream as newline-delimited JSON.
+ * Pull-based: the socket is only read while the consumer keeps iterating,
+ * so a slow consumer applies TCP backpressure instead of buffering unbounded text.
+ */
+export async function* readNdjson<T>(source: Readable): AsyncGenerator<T> {
+    const decoder = new TextDecoder("utf-8");
+    let pending = "";
+
+    for await (const chunk of source) {
+        pending += decoder.decode(chunk as Buffer, { stream: true });
+
+        let newline = pending.indexOf("\n");
+        while (newline !== -1) {
+            const line = pending.slice(0, newline).trim();
+            pending = pending.slice(newline + 1);
+            if (line) {
+                yield JSON.parse(line) as T;
+            }
+            newline = pending.indexOf("\n");
+        }
+    }
+
+    const tail = (pending + decoder.decode()).trim();
+    if (tail) {
+        yield JSON.parse(tail) as T;
+    }
+}
+
+/**
+ * Stream generated text from Ollama.
+ * Yields text deltas; returns the final (done) chunk with timing counters, or null
+ * if the stream ended without one. Aborting `signal` destroys the socket and the
+ * iteration throws an AbortError.
+ */
+export async function* streamOllamaTokens(
+    transport: OllamaTransport,
+    path: OllamaStreamPath,
+    body: Record<string, unknown>,
+    signal?: AbortSignal
+): AsyncGenerator<string, OllamaStreamChunk | null> {
+    const res = await transport.open(path, {
+        method: "POST",
+        body: { ...body, stream: true },
+        signal,
+    });
+
+    const status = res.statusCode || 0;
+    if (status < 200 || status >= 300) {
+        res.resume(); // Drain so the socket goes back to the pool
+        throw new Error(`Ollama API error: ${status} ${res.statusMessage || ""}`.trim());
+    }
+
+    // Keep reading past the done line so the response ends cleanly and the
+    // keep-alive socket is returned to the pool rather than destroyed
+    let final: OllamaStreamChunk | null = null;
+    try {
+        for await (const chunk of readNdjson<OllamaStreamChunk>(res)) {
+            if (chunk.error) {
+                throw new Error(`Ollama stream error: ${chunk.error}`);
+            }
+
+            const text = path === "/api/chat" ? chunk.message?.content : chunk.response;
+            if (text) {
+                yield text;
+            }
+
+            if (chunk.done) {
+                final = chunk;
+            }
+        }
+    } catch (error) {
+        // A mid-stream abort surfaces as a socket reset; report it as a cancellation
+        if (signal?.aborted) throw createAbortError();
+        throw error;
+    }
+
+    return final;
+}
+
+export interface PromptEvalStats {
+    path: OllamaStreamPath;
+    requests: number;
+    avgPromptEvalTokens: number;    // Prompt tokens Ollama actually evaluated (KV cache hits excluded)
+    avgPromptEvalMs: number;
+    lastPromptEvalTokens: number;
+    lastPromptEvalMs: number;
+}
+
+/**
+ * Prompt evaluation cost per Ollama endpoint, from the timing counters on each
+ * final response; compare /api/generate (full prompt every turn) with /api/chat sessions
+ */
+class PromptEvalTracker {
+    private stats = new Map<OllamaStreamPath, { requests: number; tokens: number; ms: number; lastTokens: number; lastMs: number }>();
+
+    record(path: OllamaStreamPath, final: Pick<OllamaStreamChunk, "prompt_eval_count" | "prompt_eval_duration"> | null): void {
+        if (!final || final.prompt_eval_count === undefined) return;
+
+        let entry = this.stats.get(path);
+        if (!entry) {
+            entry = { requests: 0, tokens: 0, ms: 0, lastTokens: 0, lastMs: 0 };
+            this.stats.set(path, entry);
+        }
+        const tokens = final.prompt_eval_count;
+        const ms = Math.round((final.prompt_eval_duration || 0) / 1e6);
+        entry.requests++;
+        entry.tokens += tokens;
+        entry.ms += ms;
+        entry.lastTokens = tokens;
+        entry.lastMs = ms;
+
+        console.log(`[OllamaPromptEval] ${path}: ${tokens} prompt tokens evaluated in ${ms}ms`);
+    }
+
+    getStats(): PromptEvalStats[] {
+        return [...this.stats.entries()].map(([path, entry]) => ({
+            path,
+            requests: entry.requests,
+            avgPromptEvalTokens: Math.round(entry.tokens / entry.requests),
+            avgPromptEvalMs: Math.round(entry.ms / entry.requests),
+            lastPromptEvalTokens: entry.lastTokens,
+            lastPromptEvalMs: entry.lastMs,
+        }));
+    }
+
+    reset(): void {
+        this.stats.clear();
+    }
+}
+
+export const promptEvalTracker = new PromptEvalTracker();
@@ -5,7 +5,7 @@
 /**
  * Filler phrases to strip from end of responses
  */
-const FILLER_PHRASES = [
+export const FILLER_PHRASES = [
     "I hope this helps",
     "Let me know if you",
     "Feel free to",
@@ -19,7 +19,7 @@ const FILLER_PHRASES = [
 /**
  * Prefixes to strip from start of responses
  */
-const PREFIXES = [
+export const PREFIXES = [
     "Refined (rephrase):",
     "Refined (shorten):",
     "Refined (expand):",
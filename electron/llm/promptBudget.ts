@@ -0,0 +1,211 @@
+// electron/llm/promptBudget.ts
+// Token-budgeted prompt assembly - NO tokenizer, NO LLM calls
+// Estimates prompt size locally and trims transcript turns so each mode stays within its input budget
+
+import { INPUT_TOKEN_BUDGETS, PromptBudgetReport, PromptMode } from "./types";
+
+// Roughly what Gemini's tokenizer averages on English text
+const ASCII_CHARS_PER_TOKEN = 4;
+
+// The most recent exchange is what the model answers; never drop it
+const PROTECTED_TAIL_TURNS = 2;
+
+// Turns this short carry little meaning ("ok", "yeah sure")
+const SHORT_TURN_WORDS = 4;
+
+const TURN_LABEL = /^\[([A-Z ()]+)\]:/;
+
+const inputTokenBudgets: Record<PromptMode, number> = { ...INPUT_TOKEN_BUDGETS };
+
+/**
+ * Fast token estimate: ~4 ASCII chars per token, ~1 token per CJK character
+ */
+export function estimateTokens(text: string): number {
+    if (!text) return 0;
+
+    let ascii = 0;
+    let wide = 0;
+    let other = 0;
+    for (let i = 0; i < text.length; i++) {
+        const code = text.charCodeAt(i);
+        if (code < 0x80) ascii++;
+        else if (code >= 0x2e80) wide++;
+        else other++;
+    }
+    return Math.ceil(ascii / ASCII_CHARS_PER_TOKEN + other / 2 + wide);
+}
+
+export function getInputTokenBudget(mode: PromptMode): number {
+    return inputTokenBudgets[mode];
+}
+
+/**
+ * Override the input budget for a mode (e.g. from settings or a benchmark sweep)
+ */
+export function setInputTokenBudget(mode: PromptMode, tokens: number): void {
+    inputTokenBudgets[mode] = Math.max(0, Math.floor(tokens));
+}
+
+interface Turn {
+    text: string;
+    tokens: number;
+    value: number;
+}
+
+/**
+ * Split a "[LABEL]: text" transcript into turns (continuation lines stay with their turn)
+ */
+function parseTurns(transcript: string): Turn[] {
+    const blocks: string[] = [];
+    for (const line of transcript.split("\n")) {
+        if (blocks.length === 0 || TURN_LABEL.test(line)) {
+            blocks.push(line);
+        } else {
+            blocks[blocks.length - 1] += "\n" + line;
+        }
+    }
+
+    return blocks.map(text => ({ text, tokens: estimateTokens(text) + 1, value: turnValue(text) }));
+}
+
+/**
+ * Interviewer turns matter most; earlier suggestions and backchannel matter least
+ */
+function turnValue(text: string): number {
+    const label = TURN_LABEL.exec(text)?.[1] || "";
+    const body = text.slice(label ? label.length + 3 : 0).trim();
+    if (body.split(/\s+/).length < SHORT_TURN_WORDS) return 0;
+    if (label.startsWith("ASSISTANT")) return 0;
+    if (label === "INTERVIEWER") return 1.5;
+    return 1;
+}
+
+export interface FittedTranscript {
+    text: string;
+    droppedTurns: number;
+    truncated: boolean;
+}
+
+/**
+ * Trim a transcript to `maxTokens`. Turns are dropped lowest score first, where the
+ * score is the turn's value plus its recency (0 for the oldest, 1 for the newest),
+ * so old backchannel goes before recent questions. The last exchange is always kept;
+ * if it alone is over budget its oldest text is cut.
+ */
+export function fitTranscript(transcript: string, maxTokens: number): FittedTranscript {
+    if (estimateTokens(transcript) <= maxTokens) {
+        return { text: transcript, droppedTurns: 0, truncated: false };
+    }
+
+    const turns = parseTurns(transcript);
+    let total = turns.reduce((sum, turn) => sum + turn.tokens, 0);
+    const keep = turns.map(() => true);
+
+    const lastDroppable = turns.length - PROTECTED_TAIL_TURNS;
+    const candidates = turns
+        .map((turn, index) => ({ index, score: turn.value + (turns.length > 1 ? index / (turns.length - 1) : 1) }))
+        .filter(candidate => candidate.index < lastDroppable)
+        .sort((a, b) => a.score - b.score || a.index - b.index);
+
+    let droppedTurns = 0;
+    for (const candidate of candidates) {
+        if (total <= maxTokens) break;
+        keep[candidate.index] = false;
+        total -= turns[candidate.index].tokens;
+        droppedTurns++;
+    }
+
+    let text = turns.filter((_, index) => keep[index]).map(turn => turn.text).join("\n");
+    let truncated = false;
+    if (estimateTokens(text) > maxTokens) {
+        const maxChars = Math.max(0, maxTokens * ASCII_CHARS_PER_TOKEN - 1);
+        text = maxChars > 0 ? "…" + text.slice(text.length - maxChars) : "";
+        truncated = true;
+    }
+
+    return { text, droppedTurns, truncated };
+}
+
+/**
+ * Render a prompt around `transcript`, trimming the transcript so the whole
+ * rendered text fits the mode's budget. `render` must be pure: it is called
+ * once to measure the fixed part and once with the fitted transcript.
+ */
+export function assemblePrompt(
+    mode: PromptMode,
+    transcript: string,
+    render: (transcript: string) => string
+): { text: string; report: PromptBudgetReport } {
+    const budgetTokens = inputTokenBudgets[mode];
+    const fixedTokens = estimateTokens(render(""));
+    const originalTokens = fixedTokens + estimateTokens(transcript);
+
+    const fitted = fitTranscript(transcript, Math.max(0, budgetTokens - fixedTokens));
+    const text = fitted.truncated || fitted.droppedTurns > 0 ? render(fitted.text) : render(transcript);
+
+    const report: PromptBudgetReport = {
+        mode,
+        budgetTokens,
+        originalTokens,
+        estimatedTokens: estimateTokens(text),
+        droppedTurns: fitted.droppedTurns,
+        truncated: fitted.truncated,
+    };
+    promptSizeTracker.record(report);
+    return { text, report };
+}
+
+export interface PromptSizeStats {
+    mode: PromptMode;
+    requests: number;
+    trimmedRequests: number;
+    lastTokens: number;
+    avgTokens: number;
+    maxTokens: number;
+    budgetTokens: number;
+}
+
+/**
+ * Running per-mode prompt sizes, logged alongside each request so they can be
+ * lined up with the TTFT / latency logs
+ */
+class PromptSizeTracker {
+    private stats = new Map<PromptMode, { requests: number; trimmed: number; last: number; sum: number; max: number }>();
+
+    record(report: PromptBudgetReport): void {
+        let entry = this.stats.get(report.mode);
+        if (!entry) {
+            entry = { requests: 0, trimmed: 0, last: 0, sum: 0, max: 0 };
+            this.stats.set(report.mode, entry);
+        }
+        const trimmed = report.droppedTurns > 0 || report.truncated;
+        entry.requests++;
+        if (trimmed) entry.trimmed++;
+        entry.last = report.estimatedTokens;
+        entry.sum += report.estimatedTokens;
+        entry.max = Math.max(entry.max, report.estimatedTokens);
+
+        const trimNote = trimmed
+            ? `, trimmed from ~${report.originalTokens} (${report.droppedTurns} turns dropped${report.truncated ? ", truncated" : ""})`
+            : "";
+        console.log(`[PromptBudget] ${report.mode}: ~${report.estimatedTokens}/${report.budgetTokens} input tokens${trimNote}`);
+    }
+
+    getStats(): PromptSizeStats[] {
+        return [...this.stats.entries()].map(([mode, entry]) => ({
+            mode,
+            requests: entry.requests,
+            trimmedRequests: entry.trimmed,
+            lastTokens: entry.last,
+            avgTokens: Math.round(entry.sum / entry.requests),
+            maxTokens: entry.max,
+            budgetTokens: inputTokenBudgets[mode],
+        }));
+    }
+
+    reset(): void {
+        this.stats.clear();
+    }
+}
+
+export const promptSizeTracker = new PromptSizeTracker();
@@ -1,5 +1,6 @@
 // electron/llm/prompts.ts
-import { GeminiContent } from "./types";
+import { PromptMode, PromptRequest } from "./types";
+import { assemblePrompt } from "./promptBudget";
 
 // ==========================================
 // CORE IDENTITY & SHARED GUIDELINES
@@ -252,89 +253,88 @@ export const HARD_SYSTEM_PROMPT = ASSIST_MODE_PROMPT;
 // ==========================================
 
 /**
- * Build Gemini API content array
+ * Build a Gemini request: the mode prompt goes out as a byte-stable
+ * systemInstruction (cacheable per model), only the dynamic part as contents
  */
 export function buildContents(
     systemPrompt: string,
     instruction: string,
-    context: string
-): GeminiContent[] {
-    return [
-        {
-            role: "user",
-            parts: [{ text: systemPrompt }]
-        },
-        {
-            role: "user",
-            parts: [{
-                text: `
+    context: string,
+    mode: PromptMode = "answer"
+): PromptRequest {
+    const { text, report } = assemblePrompt(mode, context, (ctx) => `
 CONTEXT:
-${context}
+${ctx}
 
 INSTRUCTION:
 ${instruction}
-            ` }]
-        }
-    ];
+            `);
+
+    return {
+        systemInstruction: systemPrompt,
+        contents: [
+            {
+                role: "user",
+                parts: [{ text }]
+            }
+        ],
+        report
+    };
 }
 
 /**
  * Build "What to answer" specific contents
  * Handles the cleaner/sparser transcript format
  */
-export function buildWhatToAnswerContents(cleanedTranscript: string): GeminiContent[] {
-    return [
-        {
-            role: "user",
-            parts: [{ text: WHAT_TO_ANSWER_PROMPT }]
-        },
-        {
-            role: "user",
-            parts: [{
-                text: `
+export function buildWhatToAnswerContents(cleanedTranscript: string): PromptRequest {
+    const { text, report } = assemblePrompt("whatToAnswer", cleanedTranscript, (transcript) => `
 Suggest the best response for the user ("ME") based on this transcript:
 
-${cleanedTranscript}
-            ` }]
-        }
-    ];
+${transcript}
+            `);
+
+    return {
+        systemInstruction: WHAT_TO_ANSWER_PROMPT,
+        contents: [
+            {
+                role: "user",
+                parts: [{ text }]
+            }
+        ],
+        report
+    };
 }
 
 /**
  * Build Recap specific contents
  */
-export function buildRecapContents(context: string): GeminiContent[] {
-    return [
-        {
-            role: "user",
-            parts: [{ text: RECAP_MODE_PROMPT }]
-        },
-        {
-            role: "user",
-            parts: [{ text: `Conversation to recap:\n${context}` }]
-        }
-    ];
+export function buildRecapContents(context: string): PromptRequest {
+    const { text, report } = assemblePrompt("recap", context, (ctx) => `Conversation to recap:\n${ctx}`);
+
+    return {
+        systemInstruction: RECAP_MODE_PROMPT,
+        contents: [
+            {
+                role: "user",
+                parts: [{ text }]
+            }
+        ],
+        report
+    };
 }
 
 /**
  * Build Follow-Up (Refinement) specific contents
+ * Only the surrounding context is trimmed; the answer being refined is always sent whole
  */
 export function buildFollowUpContents(
     previousAnswer: string,
     refinementRequest: string,
     context?: string
-): GeminiContent[] {
-    return [
-        {
-            role: "user",
-            parts: [{ text: FOLLOWUP_MODE_PROMPT }]
-        },
-        {
-            role: "user",
-            parts: [{
-                text: `
+): PromptRequest {
+    const { text, report } = assemblePrompt("followUp", context || "", (ctx) => `
 PREVIOUS CONTEXT (Optional):
-${context || "None"}
+${ctx || "None"}
 
 PREVIOUS ANSWER:
 ${previousAnswer}
@@ -343,7 +343,16 @@ USER REFINEMENT REQUEST:
 ${refinementRequest}
 
 REFINED ANSWER:
-            ` }]
-        }
-    ];
+            `);
+
+    return {
+        systemInstruction: FOLLOWUP_MODE_PROMPT,
+        contents: [
+            {
+                role: "user",
+                parts: [{ text }]
+            }
+        ],
+        report
+    };
 }
@@ -0,0 +1,395 @@
+// electron/llm/streamPipeline.ts
+// Unified streaming pipeline for chat and the mode LLMs
+// decode -> metrics -> prefix strip -> markdown policy -> filler strip, each stage an async-iterable transform
+
+import { estimateTokens } from "./promptBudget";
+import { FILLER_PHRASES } from "./postProcessor";
+
+export type StreamStage = (source: AsyncIterable<string>) => AsyncGenerator<string, void, unknown>;
+
+/**
+ * keep: pass markdown through (the UI renders it)
+ * normalize: collapse runs of 3+ newlines to a paragraph break
+ * strip: remove headers / emphasis / list markers outside fenced code (line-buffered)
+ */
+export type MarkdownPolicy = "keep" | "normalize" | "strip";
+
+export interface StreamPipelineOptions {
+    mode: string;               // Label for logs and metrics
+    model?: string;
+    startedAt?: number;         // When the request was sent; TTFT is measured from here
+    promptTokens?: number;      // Estimated input size, kept next to the timings
+    prefixes?: string[];        // Leading labels to drop ("Answer:", ...)
+    markdown?: MarkdownPolicy;
+    stripFillers?: boolean;     // Drop trailing "Let me know if..." style sentences
+    signal?: AbortSignal;       // Only used to classify how the stream ended
+}
+
+// Longest run of leading text held back while waiting to rule out a prefix
+const PREFIX_LOOKAHEAD_CHARS = 50;
+
+// ============================================
+// Decode
+// ============================================
+
+/**
+ * Text of one Gemini stream chunk, whichever shape the SDK version hands back
+ */
+export function extractChunkText(chunk: any): string {
+    try {
+        if (typeof chunk.text === 'function') {
+            return chunk.text() || "";
+        }
+        if (typeof chunk.text === 'string') {
+            return chunk.text;
+        }
+        return chunk.candidates?.[0]?.content?.parts?.[0]?.text || "";
+    } catch (err) {
+        console.error("[StreamPipeline] Could not extract text from chunk:", err);
+        console.error("[StreamPipeline] Chunk structure:", JSON.stringify(chunk).substring(0, 200));
+        return "";
+    }
+}
+
+/**
+ * Text deltas from a generateContentStream result
+ */
+export async function* decodeGeminiStream(streamResult: any): AsyncGenerator<string, void, unknown> {
+    // SDK typing differs between versions: either the iterable itself or { stream }
+    const stream = streamResult.stream || streamResult;
+    for await (const chunk of stream) {
+        const text = extractChunkText(chunk);
+        if (text) {
+            yield text;
+        }
+    }
+}
+
+// ============================================
+// Metrics
+// ============================================
+
+export interface StreamMetrics {
+    mode: string;
+    model: string | null;
+    status: "completed" | "aborted" | "failed";
+    ttftMs: number | null;
+    durationMs: number;
+    chunks: number;
+    outputTokens: number;       // Estimated from the text
+    tokensPerSec: number | null;
+    avgGapMs: number | null;    // Between consecutive chunks
+    p95GapMs: number | null;
+    maxGapMs: number | null;
+    promptTokens: number | null;
+    at: number;
+}
+
+export interface StreamModeStats {
+    mode: string;
+    streams: number;
+    aborted: number;
+    failed: number;
+    p50TtftMs: number | null;
+    p95TtftMs: number | null;
+    avgTokensPerSec: number | null;
+    p95GapMs: number | null;
+    avgPromptTokens: number | null;
+}
+
+const RECENT_STREAMS_PER_MODE = 50;
+
+class StreamMetricsTracker {
+    private recent = new Map<string, StreamMetrics[]>();
+
+    record(metrics: StreamMetrics): void {
+        let samples = this.recent.get(metrics.mode);
+        if (!samples) {
+            samples = [];
+            this.recent.set(metrics.mode, samples);
+        }
+        samples.push(metrics);
+        if (samples.length > RECENT_STREAMS_PER_MODE) samples.shift();
+
+        const ttft = metrics.ttftMs !== null ? `${metrics.ttftMs}ms` : "n/a";
+        const rate = metrics.tokensPerSec !== null ? `${metrics.tokensPerSec.toFixed(1)} tok/s` : "n/a tok/s";
+        const gap = metrics.p95GapMs !== null ? `, gap p95 ${metrics.p95GapMs}ms` : "";
+        const prompt = metrics.promptTokens !== null ? `, prompt ~${metrics.promptTokens}` : "";
+        console.log(`[StreamMetrics] ${metrics.mode}${metrics.model ? ` (${metrics.model})` : ""} ${metrics.status}: TTFT ${ttft}, ${rate}${gap}, ~${metrics.outputTokens} tokens${prompt}`);
+    }
+
+    getStats(): StreamModeStats[] {
+        return [...this.recent.entries()].map(([mode, samples]) => {
+            const ttfts = samples.map(s => s.ttftMs).filter((v): v is number => v !== null).sort((a, b) => a - b);
+            const rates = samples.map(s => s.tokensPerSec).filter((v): v is number => v !== null);
+            const gaps = samples.map(s => s.p95GapMs).filter((v): v is number => v !== null).sort((a, b) => a - b);
+            const prompts = samples.map(s => s.promptTokens).filter((v): v is number => v !== null);
+            return {
+                mode,
+                streams: samples.length,
+                aborted: samples.filter(s => s.status === "aborted").length,
+                failed: samples.filter(s => s.status === "failed").length,
+                p50TtftMs: percentile(ttfts, 0.5),
+                p95TtftMs: percentile(ttfts, 0.95),
+                avgTokensPerSec: rates.length > 0 ? rates.reduce((a, b) => a + b, 0) / rates.length : null,
+                p95GapMs: percentile(gaps, 0.95),
+                avgPromptTokens: prompts.length > 0 ? Math.round(prompts.reduce((a, b) => a + b, 0) / prompts.length) : null,
+            };
+        });
+    }
+
+    getRecent(mode?: string): StreamMetrics[] {
+        if (mode) return [...(this.recent.get(mode) || [])];
+        return [...this.recent.values()].flat().sort((a, b) => a.at - b.at);
+    }
+
+    reset(): void {
+        this.recent.clear();
+    }
+}
+
+export const streamMetricsTracker = new StreamMetricsTracker();
+
+/**
+ * Pass-through stage that times chunk arrival and records the stream when it ends
+ */
+export function measureStage(options: StreamPipelineOptions): StreamStage {
+    return async function* (source) {
+        const startedAt = options.startedAt ?? Date.now();
+        let firstAt: number | null = null;
+        let lastAt: number | null = null;
+        const gaps: number[] = [];
+        let chunks = 0;
+        let outputTokens = 0;
+        let status: StreamMetrics["status"] = "aborted"; // Consumer stopped early unless set below
+
+        try {
+            for await (const text of source) {
+                const now = Date.now();
+                if (firstAt === null) firstAt = now;
+                if (lastAt !== null) gaps.push(now - lastAt);
+                lastAt = now;
+                chunks++;
+                outputTokens += estimateTokens(text);
+                yield text;
+            }
+            status = "completed";
+        } catch (error) {
+            status = options.signal?.aborted ? "aborted" : "failed";
+            throw error;
+        } finally {
+            const generationMs = firstAt !== null && lastAt !== null ? lastAt - firstAt : 0;
+            const sortedGaps = [...gaps].sort((a, b) => a - b);
+            streamMetricsTracker.record({
+                mode: options.mode,
+                model: options.model || null,
+                status,
+                ttftMs: firstAt !== null ? firstAt - startedAt : null,
+                durationMs: Date.now() - startedAt,
+                chunks,
+                outputTokens,
+                tokensPerSec: generationMs > 0 ? outputTokens / (generationMs / 1000) : null,
+                avgGapMs: gaps.length > 0 ? Math.round(gaps.reduce((a, b) => a + b, 0) / gaps.length) : null,
+                p95GapMs: percentile(sortedGaps, 0.95),
+                maxGapMs: sortedGaps.length > 0 ? sortedGaps[sortedGaps.length - 1] : null,
+                promptTokens: options.promptTokens ?? null,
+                at: Date.now(),
+            });
+        }
+    };
+}
+
+// ============================================
+// Post-processing stages
+// ============================================
+
+/**
+ * Drop leading labels. Text is held back only while it could still turn out to be
+ * one of `prefixes` (at most PREFIX_LOOKAHEAD_CHARS), then flows through untouched.
+ */
+export function stripPrefixStage(prefixes: string[]): StreamStage {
+    const lowered = prefixes.map(prefix => prefix.toLowerCase());
+
+    return async function* (source) {
+        let buffer = "";
+        let checked = false;
+
+        for await (const text of source) {
+            if (checked) {
+                yield text;
+                continue;
+            }
+
+            buffer += text;
+            const head = buffer.trimStart().toLowerCase();
+            const undecided = lowered.some(prefix => prefix.startsWith(head));
+            if (undecided && buffer.length <= PREFIX_LOOKAHEAD_CHARS) continue;
+
+            checked = true;
+            const content = removePrefixes(buffer, prefixes);
+            if (content) yield content;
+        }
+
+        if (!checked && buffer) {
+            const content = removePrefixes(buffer, prefixes);
+            if (content) yield content;
+        }
+    };
+}
+
+function removePrefixes(text: string, prefixes: string[]): string {
+    let content = text;
+    for (const prefix of prefixes) {
+        if (content.trimStart().toLowerCase().startsWith(prefix.toLowerCase())) {
+            content = content.trimStart().substring(prefix.length).trimStart();
+        }
+    }
+    return content;
+}
+
+export function markdownStage(policy: MarkdownPolicy): StreamStage {
+    if (policy === "normalize") return normalizeNewlines;
+    if (policy === "strip") return stripMarkdownLines;
+    return async function* (source) {
+        yield* source;
+    };
+}
+
+async function* normalizeNewlines(source: AsyncIterable<string>): AsyncGenerator<string, void, unknown> {
+    let newlines = 0; // Consecutive newlines already emitted, carried across chunks
+
+    for await (const text of source) {
+        let out = "";
+        for (const char of text) {
+            if (char === "\n") {
+                newlines++;
+                if (newlines > 2) continue;
+            } else if (char !== "\r") {
+                newlines = 0;
+            }
+            out += char;
+        }
+        if (out) yield out;
+    }
+}
+
+async function* stripMarkdownLines(source: AsyncIterable<string>): AsyncGenerator<string, void, unknown> {
+    let line = "";
+    let inFence = false;
+
+    const render = (raw: string): string => {
+        if (/^\s*```/.test(raw)) {
+            inFence = !inFence;
+            return raw;
+        }
+        if (inFence) return raw;
+        return raw
+            .replace(/^#{1,6}\s+/, "")
+            .replace(/^\s*[-*•]\s+/, "")
+            .replace(/^\s*\d+\.\s+/, "")
+            .replace(/^>\s+/, "")
+            .replace(/\*\*([^*]+)\*\*/g, "$1")
+            .replace(/__([^_]+)__/g, "$1")
+            .replace(/\*([^*]+)\*/g, "$1")
+            .replace(/`([^`]+)`/g, "$1")
+            .replace(/\[([^\]]+)\]\([^)]+\)/g, "$1");
+    };
+
+    for await (const text of source) {
+        line += text;
+        let newline = line.indexOf("\n");
+        while (newline !== -1) {
+            yield render(line.slice(0, newline)) + "\n";
+            line = line.slice(newline + 1);
+            newline = line.indexOf("\n");
+        }
+    }
+    if (line) yield render(line);
+}
+
+/**
+ * Drop trailing filler sentences ("Let me know if you...", "I hope this helps").
+ * Only a sentence whose opening still matches a filler phrase is held back; it is
+ * released as soon as it diverges or real content follows it, and dropped if the
+ * stream ends on it.
+ */
+export function stripFillerStage(phrases: string[] = FILLER_PHRASES): StreamStage {
+    const lowered = phrases.map(phrase => phrase.toLowerCase());
+
+    return async function* (source) {
+        let candidate = "";     // Current sentence, while it could still be filler
+        let held = "";          // Complete filler sentences not yet known to be trailing
+        let atSentenceStart = true;
+
+        for await (const text of source) {
+            let out = "";
+            for (const char of text) {
+                const boundary = char === "." || char === "!" || char === "?" || char === "\n";
+
+                if (!atSentenceStart) {
+                    out += char;
+                    if (boundary) atSentenceStart = true;
+                    continue;
+                }
+
+                candidate += char;
+                const head = candidate.trimStart().toLowerCase();
+                if (!head) continue;
+
+                const isFiller = lowered.some(phrase => head.startsWith(phrase));
+                const mayBecomeFiller = lowered.some(phrase => phrase.startsWith(head));
+                if (isFiller || mayBecomeFiller) {
+                    if (isFiller && boundary) {
+                        held += candidate;
+                        candidate = "";
+                    }
+                    continue;
+                }
+
+                // Real content: whatever was held back was not trailing after all
+                out += held + candidate;
+                held = "";
+                candidate = "";
+                atSentenceStart = boundary;
+            }
+            if (out) yield out;
+        }
+
+        // Stream ended: held sentences were trailing filler; an unfinished filler-looking
+        // sentence is dropped too, anything shorter than a full phrase is kept
+        const head = candidate.trimStart().toLowerCase();
+        if (candidate && !lowered.some(phrase => head.startsWith(phrase))) {
+            yield candidate;
+        }
+    };
+}
+
+// ============================================
+// Composition
+// ============================================
+
+export function composeStages(source: AsyncIterable<string>, ...stages: StreamStage[]): AsyncGenerator<string, void, unknown> {
+    let stream: AsyncIterable<string> = source;
+    for (const stage of stages) {
+        stream = stage(stream);
+    }
+    return stream as AsyncGenerator<string, void, unknown>;
+}
+
+/**
+ * Standard pipeline: metrics on the raw deltas (so TTFT / gaps reflect the model and
+ * network), then the text post-processing the mode asks for
+ */
+export function runStreamPipeline(source: AsyncIterable<string>, options: StreamPipelineOptions): AsyncGenerator<string, void, unknown> {
+    const stages: StreamStage[] = [measureStage(options)];
+    if (options.prefixes && options.prefixes.length > 0) stages.push(stripPrefixStage(options.prefixes));
+    if (options.markdown && options.markdown !== "keep") stages.push(markdownStage(options.markdown));
+    if (options.stripFillers) stages.push(stripFillerStage());
+    return composeStages(source, ...stages);
+}
+
+function percentile(sorted: number[], p: number): number | null {
+    if (sorted.length === 0) return null;
+    const index = Math.min(sorted.length - 1, Math.max(0, Math.ceil(p * sorted.length) - 1));
+    return sorted[index];
+}
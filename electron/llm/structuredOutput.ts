@@ -0,0 +1,536 @@
+// electron/llm/structuredOutput.ts
+// Schema-constrained JSON for the screenshot problem / solution / debug calls
+// Schemas go to Gemini as responseSchema and to Ollama as `format`; a tolerant
+// parser recovers what it can if a response still comes back malformed or cut off
+
+import { Schema, Type } from "@google/genai";
+
+/**
+ * What extractProblemFromImages returns
+ */
+export const PROBLEM_INFO_SCHEMA: Schema = {
+    type: Type.OBJECT,
+    properties: {
+        problem_statement: { type: Type.STRING, description: "A clear statement of the problem or situation depicted in the images." },
+        context: { type: Type.STRING, description: "Relevant background or context from the images." },
+        suggested_responses: { type: Type.ARRAY, items: { type: Type.STRING }, description: "Possible answers or actions." },
+        reasoning: { type: Type.STRING, description: "Explanation of why these suggestions are appropriate." },
+    },
+    required: ["problem_statement", "context", "suggested_responses", "reasoning"],
+    propertyOrdering: ["problem_statement", "context", "suggested_responses", "reasoning"],
+};
+
+/**
+ * What generateSolution and debugSolutionWithImages return
+ */
+export const SOLUTION_SCHEMA: Schema = {
+    type: Type.OBJECT,
+    properties: {
+        solution: {
+            type: Type.OBJECT,
+            properties: {
+                code: { type: Type.STRING, description: "The code or main answer." },
+                problem_statement: { type: Type.STRING, description: "Restate the problem or situation." },
+                context: { type: Type.STRING, description: "Relevant background/context." },
+                suggested_responses: { type: Type.ARRAY, items: { type: Type.STRING }, description: "Possible answers or actions." },
+                reasoning: { type: Type.STRING, description: "Explanation of why these suggestions are appropriate." },
+            },
+            required: ["code", "problem_statement", "context", "suggested_responses", "reasoning"],
+            propertyOrdering: ["code", "problem_statement", "context", "suggested_responses", "reasoning"],
+        },
+    },
+    required: ["solution"],
+};
+
+/**
+ * Convert a Gemini (OpenAPI subset) schema into the JSON Schema Ollama takes as `format`
+ */
+export function toJsonSchema(schema: Schema): Record<string, unknown> {
+    const json: Record<string, unknown> = {};
+    if (schema.type) json.type = String(schema.type).toLowerCase();
+    if (schema.description) json.description = schema.description;
+    if (schema.enum) json.enum = schema.enum;
+    if (schema.items) json.items = toJsonSchema(schema.items);
+    if (schema.properties) {
+        json.properties = Object.fromEntries(
+            Object.entries(schema.properties).map(([name, property]) => [name, toJsonSchema(property)])
+        );
+    }
+    if (schema.required) json.required = schema.required;
+    return json;
+}
+
+export interface PartialJson<T> {
+    value: T | undefined;
+    complete: boolean;      // The top-level value was closed (anything after it is ignored)
+}
+
+/**
+ * Parse the first JSON object/array in `text`, however it arrives: wrapped in
+ * markdown fences or prose, with raw newlines or trailing commas, or cut off
+ * mid-stream. A truncated value keeps its last (partial) string and otherwise
+ * falls back to the last complete member, so it can be called on every chunk.
+ */
+export function parsePartialJson<T = any>(text: string): PartialJson<T> {
+    const start = text.search(/[{[]/);
+    if (start === -1) return { value: undefined, complete: false };
+
+    const source = repairJson(text.slice(start));
+    const closers: string[] = [];
+    // Places the value can be cut and closed cleanly: just inside a container or before a comma
+    const cuts: Array<{ index: number; closing: string }> = [];
+    let inString = false;
+    let escaped = false;
+
+    for (let i = 0; i < source.length; i++) {
+        const char = source[i];
+        if (inString) {
+            if (escaped) escaped = false;
+            else if (char === "\\") escaped = true;
+            else if (char === "\"") inString = false;
+            continue;
+        }
+
+        if (char === "\"") {
+            inString = true;
+        } else if (char === "{" || char === "[") {
+            closers.push(char === "{" ? "}" : "]");
+            cuts.push({ index: i + 1, closing: closing(closers) });
+        } else if (char === "}" || char === "]") {
+            closers.pop();
+            if (closers.length === 0) {
+                const value = tryParse<T>(source.slice(0, i + 1));
+                return { value, complete: value !== undefined };
+            }
+        } else if (char === ",") {
+            cuts.push({ index: i, closing: closing(closers) });
+        }
+    }
+
+    // Truncated: finish the open string (if it is a value) and close every container
+    const candidates: string[] = [];
+    if (inString) {
+        const body = source.slice(0, escaped ? -1 : undefined).replace(/\\u[0-9a-fA-F]{0,3}$/, "");
+        candidates.push(body + "\"" + closing(closers));
+    } else {
+        candidates.push(source.replace(/[\s,:]+$/, "") + closing(closers));
+    }
+    for (let i = cuts.length - 1; i >= 0; i--) {
+        candidates.push(source.slice(0, cuts[i].index) + cuts[i].closing);
+    }
+
+    for (const candidate of candidates) {
+        const value = tryParse<T>(candidate);
+        if (value !== undefined) return { value, complete: false };
+    }
+    return { value: undefined, complete: false };
+}
+
+interface JsonFrame {
+    closer: "}" | "]";
+    key: string | number | null;    // Where this container sits in its parent (null for the root)
+    expectKey: boolean;             // Object: the next string is a member name
+    lastKey: string | null;         // Object: name of the member being read
+    index: number;                  // Array: index of the element being read
+}
+
+interface OpenString {
+    pending: string;        // Repaired text not decoded yet
+    decoded: string;
+}
+
+/**
+ * parsePartialJson for a stream: keeps the scanner state (string/escape state,
+ * open containers, cut points, repaired text) between chunks, so each chunk only
+ * scans its own characters. The settled part is re-parsed only when a new cut
+ * point is reached; a string value still being written (e.g. a long `code`
+ * field) is decoded piece by piece and laid over it.
+ */
+export class IncrementalJsonParser<T = any> {
+    private source = "";                // Repaired text from the first `{` / `[`
+    private out = "";                   // Repaired text of the chunk being scanned (appended to `source` once per chunk)
+    private started = false;
+    private done = false;
+    private doneValue: T | undefined = undefined;
+    private frames: JsonFrame[] = [];
+    private inString = false;
+    private escaped = false;
+    private key: string | null = null;  // Member name being read (repaired text), if any
+    private openString: OpenString | null = null;
+    private pendingComma = false;       // Held back until we know it isn't a trailing comma
+    private pendingWhitespace = "";
+
+    // Places the value can be cut and closed cleanly, latest last
+    private cuts: Array<{ index: number; closing: string }> = [];
+    private parsedCuts = 0;
+    private settled: T | undefined = undefined;
+
+    public push(chunk: string): void {
+        for (let i = 0; i < chunk.length && !this.done; i++) {
+            this.scan(chunk[i]);
+        }
+        this.flush();
+    }
+
+    public snapshot(): PartialJson<T> {
+        if (this.done) return { value: this.doneValue, complete: this.doneValue !== undefined };
+
+        if (this.cuts.length !== this.parsedCuts) {
+            this.parsedCuts = this.cuts.length;
+            this.settled = undefined;
+            for (let i = this.cuts.length - 1; i >= 0 && this.settled === undefined; i--) {
+                this.settled = tryParse<T>(this.source.slice(0, this.cuts[i].index) + this.cuts[i].closing);
+            }
+        }
+
+        if (this.openString && this.settled !== undefined) this.overlayOpenString();
+        return { value: this.settled, complete: false };
+    }
+
+    private scan(char: string): void {
+        if (!this.started) {
+            if (char !== "{" && char !== "[") return;
+            this.started = true;
+        }
+
+        if (this.inString) {
+            this.scanString(char);
+            return;
+        }
+
+        if (this.pendingComma) {
+            if (char === " " || char === "\n" || char === "\r" || char === "\t") {
+                this.pendingWhitespace += char;
+                return;
+            }
+            // A comma right before a closer is dropped
+            if (char !== "}" && char !== "]") this.emitComma();
+            this.out += this.pendingWhitespace;
+            this.pendingComma = false;
+            this.pendingWhitespace = "";
+        }
+
+        const frame = this.frames[this.frames.length - 1];
+        if (char === ",") {
+            this.pendingComma = true;
+        } else if (char === "\"") {
+            this.out += char;
+            this.inString = true;
+            if (frame?.closer === "}" && frame.expectKey) {
+                this.key = "";
+            } else {
+                this.openString = { pending: "", decoded: "" };
+            }
+        } else if (char === "{" || char === "[") {
+            const key = !frame ? null : frame.closer === "}" ? frame.lastKey : frame.index;
+            this.frames.push({ closer: char === "{" ? "}" : "]", key, expectKey: char === "{", lastKey: null, index: 0 });
+            this.out += char;
+            this.addCut();
+        } else if (char === "}" || char === "]") {
+            this.frames.pop();
+            this.out += char;
+            if (this.frames.length === 0) {
+                this.flush();
+                this.done = true;
+                this.doneValue = tryParse<T>(this.source);
+            } else {
+                this.addCut();
+            }
+        } else {
+            this.out += char;
+        }
+    }
+
+    private scanString(char: string): void {
+        if (this.escaped) this.escaped = false;
+        else if (char === "\\") this.escaped = true;
+        else if (char === "\"") this.inString = false;
+
+        if (this.inString) {
+            const repaired = char === "\n" ? "\\n" : char === "\r" ? "\\r" : char === "\t" ? "\\t" : char;
+            this.out += repaired;
+            if (this.key !== null) this.key += repaired;
+            else if (this.openString) this.openString.pending += repaired;
+            return;
+        }
+
+        this.out += char;
+        if (this.key !== null) {
+            const frame = this.frames[this.frames.length - 1];
+            frame.lastKey = tryParse<string>(`"${this.key}"`) ?? null;
+            frame.expectKey = false;
+            this.key = null;
+        } else {
+            // The value is complete: the member can be kept from here on
+            this.openString = null;
+            this.addCut();
+        }
+    }
+
+    private emitComma(): void {
+        this.addCut();
+        this.out += ",";
+        const frame = this.frames[this.frames.length - 1];
+        if (frame.closer === "}") frame.expectKey = true;
+        else frame.index++;
+    }
+
+    private addCut(): void {
+        let closing = "";
+        for (let i = this.frames.length - 1; i >= 0; i--) closing += this.frames[i].closer;
+        this.cuts.push({ index: this.source.length + this.out.length, closing });
+    }
+
+    private flush(): void {
+        this.source += this.out;
+        this.out = "";
+    }
+
+    /**
+     * Decode what arrived of the open string since last time and set it where it belongs
+     */
+    private overlayOpenString(): void {
+        const open = this.openString!;
+        // Leave an escape sequence that is still arriving for next time
+        let end = open.pending.length;
+        if (this.escaped) {
+            end--;
+        } else {
+            const partialEscape = /\\u[0-9a-fA-F]{0,3}$/.exec(open.pending.slice(-6));
+            if (partialEscape) end -= partialEscape[0].length;
+        }
+        if (end > 0) {
+            const piece = tryParse<string>(`"${open.pending.slice(0, end)}"`);
+            if (piece !== undefined) {
+                open.decoded += piece;
+                open.pending = open.pending.slice(end);
+            }
+        }
+
+        let node: any = this.settled;
+        for (let i = 1; i < this.frames.length && node; i++) node = node[this.frames[i].key as any];
+        const frame = this.frames[this.frames.length - 1];
+        if (!node || typeof node !== "object") return;
+        if (frame.closer === "}") {
+            if (frame.lastKey !== null) node[frame.lastKey] = open.decoded;
+        } else {
+            node[frame.index] = open.decoded;
+        }
+    }
+}
+
+function closing(closers: string[]): string {
+    return [...closers].reverse().join("");
+}
+
+function tryParse<T>(text: string): T | undefined {
+    try {
+        return JSON.parse(text) as T;
+    } catch {
+        return undefined;
+    }
+}
+
+const TRAILING_COMMA = /\s*[}\]]/y;
+
+/**
+ * Fix the common near-misses: raw control characters inside strings and trailing commas
+ */
+function repairJson(text: string): string {
+    let out = "";
+    let inString = false;
+    let escaped = false;
+
+    for (let i = 0; i < text.length; i++) {
+        const char = text[i];
+        if (inString) {
+            if (escaped) escaped = false;
+            else if (char === "\\") escaped = true;
+            else if (char === "\"") inString = false;
+
+            if (char === "\n") out += "\\n";
+            else if (char === "\r") out += "\\r";
+            else if (char === "\t") out += "\\t";
+            else out += char;
+            continue;
+        }
+
+        if (char === "\"") inString = true;
+        if (char === ",") {
+            TRAILING_COMMA.lastIndex = i + 1;
+            if (TRAILING_COMMA.test(text)) continue;
+        }
+        out += char;
+    }
+    return out;
+}
+
+export type StructuredParseOutcome = "strict" | "repaired" | "partial" | "incomplete" | "failed";
+
+export interface StructuredOutputStats {
+    kind: string;
+    requests: number;
+    strict: number;         // Parsed as-is
+    repaired: number;       // Needed fence/prose stripping or syntax repair
+    partial: number;        // Truncated; the complete part was used
+    incomplete: number;     // Parsed, but required fields were missing - rejected
+    failed: number;         // Nothing usable - these are the ones that force a re-request
+}
+
+/**
+ * Parse outcomes per call kind, to check malformed-JSON re-requests stay at zero
+ */
+class StructuredOutputTracker {
+    private stats = new Map<string, Record<StructuredParseOutcome, number>>();
+
+    record(kind: string, outcome: StructuredParseOutcome): void {
+        let entry = this.stats.get(kind);
+        if (!entry) {
+            entry = { strict: 0, repaired: 0, partial: 0, incomplete: 0, failed: 0 };
+            this.stats.set(kind, entry);
+        }
+        entry[outcome]++;
+    }
+
+    getStats(): StructuredOutputStats[] {
+        return [...this.stats.entries()].map(([kind, entry]) => ({
+            kind,
+            requests: entry.strict + entry.repaired + entry.partial + entry.incomplete + entry.failed,
+            ...entry,
+        }));
+    }
+}
+
+export const structuredOutputTracker = new StructuredOutputTracker();
+
+/**
+ * Required fields of `schema` (dotted paths, nested objects included) that `value` lacks
+ */
+export function missingRequiredFields(schema: Schema, value: unknown, path: string = ""): string[] {
+    if (!value || typeof value !== "object" || Array.isArray(value)) {
+        return schema.type === Type.OBJECT ? [path || "(root)"] : [];
+    }
+
+    const missing: string[] = [];
+    const record = value as Record<string, unknown>;
+    for (const field of schema.required || []) {
+        const fieldPath = path ? `${path}.${field}` : field;
+        if (record[field] === undefined || record[field] === null) {
+            missing.push(fieldPath);
+            continue;
+        }
+        const property = schema.properties?.[field];
+        if (property?.type === Type.OBJECT) missing.push(...missingRequiredFields(property, record[field], fieldPath));
+    }
+    return missing;
+}
+
+// Values recovered from a truncated response: fine to show, never to cache or build on
+const partialResults = new WeakSet<object>();
+
+/**
+ * Whether a parsed value came from a truncated response (its last field may be cut off)
+ */
+export function isPartialResult(value: unknown): boolean {
+    return typeof value === "object" && value !== null && partialResults.has(value);
+}
+
+/**
+ * Parse a structured response; strict first, then the tolerant parser.
+ * Throws when no JSON object can be recovered, or when `schema` is given and
+ * a required field is missing. A value recovered from a truncated response is
+ * returned but flagged (see isPartialResult).
+ */
+export function parseStructuredJson<T = any>(kind: string, text: string, schema?: Schema): T {
+    const strict = tryParse<T>(text.trim());
+    const isStrict = strict !== undefined && typeof strict === "object" && strict !== null;
+    const { value, complete } = isStrict ? { value: strict, complete: true } : parsePartialJson<T>(text);
+    if (value === undefined || typeof value !== "object" || value === null) {
+        structuredOutputTracker.record(kind, "failed");
+        throw new Error(`Could not parse ${kind} response as JSON`);
+    }
+
+    const missing = schema ? missingRequiredFields(schema, value) : [];
+    if (missing.length > 0) {
+        structuredOutputTracker.record(kind, "incomplete");
+        throw new Error(`${kind} response is missing required field(s): ${missing.join(", ")}${complete ? "" : " (truncated)"}`);
+    }
+
+    if (isStrict) {
+        structuredOutputTracker.record(kind, "strict");
+        return value;
+    }
+
+    structuredOutputTracker.record(kind, complete ? "repaired" : "partial");
+    console.warn(`[StructuredOutput] ${kind}: recovered ${complete ? "malformed" : "truncated"} JSON (${text.length} chars)`);
+    if (!complete) partialResults.add(value);
+    return value;
+}
+
+export interface StructuredUpdate<T> {
+    value: Partial<T>;                      // Everything parsed so far
+    fields: Record<string, unknown>;        // Fields (under `root`) set to a new value since the last update
+    appends: Record<string, string>;        // String fields that grew since the last update: just the added text
+}
+
+/**
+ * Turn streamed JSON text into field-level updates of the object at `root`
+ * (e.g. "solution"), as each field fills in. Returns the fully parsed value,
+ * validated against `schema` like parseStructuredJson.
+ */
+export async function* streamStructuredFields<T = any>(
+    kind: string,
+    source: AsyncIterable<string>,
+    root?: string,
+    schema?: Schema
+): AsyncGenerator<StructuredUpdate<T>, T, unknown> {
+    let text = "";
+    const parser = new IncrementalJsonParser<T>();
+    // Last value sent per field: strings as-is (to send only what they gained), anything else serialized
+    const sentStrings = new Map<string, string>();
+    const sentValues = new Map<string, string>();
+
+    const changes = (value: any): Omit<StructuredUpdate<T>, "value"> | null => {
+        const target = root ? value?.[root] : value;
+        if (!target || typeof target !== "object") return null;
+
+        const fields: Record<string, unknown> = {};
+        const appends: Record<string, string> = {};
+        let changed = false;
+        for (const [field, fieldValue] of Object.entries(target)) {
+            if (typeof fieldValue === "string") {
+                const previous = sentStrings.get(field);
+                if (previous === fieldValue) continue;
+                if (previous !== undefined && fieldValue.length > previous.length && fieldValue.startsWith(previous)) {
+                    appends[field] = fieldValue.slice(previous.length);
+                } else {
+                    fields[field] = fieldValue;
+                }
+                sentStrings.set(field, fieldValue);
+            } else {
+                const serialized = JSON.stringify(fieldValue);
+                if (sentValues.get(field) === serialized) continue;
+                sentValues.set(field, serialized);
+                fields[field] = fieldValue;
+            }
+            changed = true;
+        }
+        return changed ? { fields, appends } : null;
+    };
+
+    for await (const chunk of source) {
+        text += chunk;
+        parser.push(chunk);
+        const { value } = parser.snapshot();
+        if (value === undefined) continue;
+
+        const update = changes(value);
+        if (update) yield { value, ...update };
+    }
+
+    const final = parseStructuredJson<T>(kind, text, schema);
+    // The final parse can settle a field the partial one had to leave incomplete
+    const update = changes(final);
+    if (update) yield { value: final, ...update };
+    return final;
+}
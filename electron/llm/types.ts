@@ -47,6 +47,89 @@ export const MODE_CONFIGS = {
     } as GenerationConfig,
 } as const;
 
+/**
+ * Latency budget for hedged requests
+ * The backup model is started once the primary has been silent for the
+ * `percentile` of its recent latency, clamped to [minDelayMs, maxDelayMs].
+ */
+export interface HedgeBudget {
+    percentile: number;
+    minDelayMs: number;
+    maxDelayMs: number;
+    defaultDelayMs: number; // Used until enough latency samples exist
+}
+
+/**
+ * Per-mode hedge budgets
+ */
+export const HEDGE_BUDGETS = {
+    chat: {
+        percentile: 0.9,
+        minDelayMs: 1500,
+        maxDelayMs: 6000,
+        defaultDelayMs: 4000,
+    } as HedgeBudget,
+
+    // Image uploads take longer before the first byte comes back
+    multimodal: {
+        percentile: 0.9,
+        minDelayMs: 3000,
+        maxDelayMs: 10000,
+        defaultDelayMs: 7000,
+    } as HedgeBudget,
+
+    // Mode LLMs going through the robust client (generateWithFallback)
+    mode: {
+        percentile: 0.95,
+        minDelayMs: 2000,
+        maxDelayMs: 8000,
+        defaultDelayMs: 5000,
+    } as HedgeBudget,
+};
+
+export type HedgeMode = keyof typeof HEDGE_BUDGETS;
+
+/**
+ * Per-mode input-token budgets for the dynamic part of a prompt (the system
+ * instruction is excluded - it is static and cached server-side).
+ * Transcript turns are trimmed to fit; larger prompts mean a slower first token.
+ */
+export const INPUT_TOKEN_BUDGETS = {
+    answer: 3000,
+    assist: 1500,
+    whatToAnswer: 2000,
+    followUp: 3000,
+    recap: 6000,
+    followUpQuestions: 2500,
+};
+
+export type PromptMode = keyof typeof INPUT_TOKEN_BUDGETS;
+
+/**
+ * Per-mode output-token budgets for local (Ollama) generation, sent as num_predict.
+ * On CPU every generated token costs real time, and the copilot answers are meant to be short.
+ */
+export const OUTPUT_TOKEN_BUDGETS: Record<PromptMode, number> = {
+    answer: 512,
+    assist: 384,
+    whatToAnswer: 256,
+    followUp: 512,
+    recap: 384,
+    followUpQuestions: 256,
+};
+
+/**
+ * What the budgeter did to a prompt (sizes are estimates, not tokenizer counts)
+ */
+export interface PromptBudgetReport {
+    mode: PromptMode;
+    budgetTokens: number;
+    originalTokens: number;     // Contents as they would have been sent untrimmed
+    estimatedTokens: number;    // Contents as sent
+    droppedTurns: number;
+    truncated: boolean;         // Kept turns still had to be cut mid-text
+}
+
 /**
  * Gemini content structure
  */
@@ -55,6 +138,16 @@ export interface GeminiContent {
     parts: { text: string }[];
 }
 
+/**
+ * A prompt split into its static system instruction and per-request contents.
+ * The system instruction must not vary between calls so it can be cached server-side.
+ */
+export interface PromptRequest {
+    systemInstruction: string;
+    contents: GeminiContent[];
+    report: PromptBudgetReport;
+}
+
 /**
  * LLM client interface for dependency injection
  */
@@ -1,4 +1,4 @@
-import { app, BrowserWindow, Tray, Menu, nativeImage } from "electron"
+import { app, BrowserWindow, Tray, Menu, nativeImage, powerMonitor } from "electron"
 
 // Handle stdout/stderr errors at the process level to prevent EIO crashes
 // This is critical for Electron apps that may have their terminal detached
@@ -80,11 +80,13 @@ export class AppState {
     INITIAL_START: "initial-start",
     PROBLEM_EXTRACTED: "problem-extracted",
     SOLUTION_SUCCESS: "solution-success",
+    SOLUTION_PARTIAL: "solution-partial",
     INITIAL_SOLUTION_ERROR: "solution-error",
 
     //states for processing the debugging
     DEBUG_START: "debug-start",
     DEBUG_SUCCESS: "debug-success",
+    DEBUG_PARTIAL: "debug-partial",
     DEBUG_ERROR: "debug-error"
   } as const
 
@@ -442,6 +444,8 @@ export class AppState {
   }
 
   public clearQueues(): void {
+    // Stop any in-flight extraction/debug call so its sockets close and no stale result lands
+    this.processingHelper.cancelOngoingRequests()
     this.screenshotHelper.clearQueues()
 
     // Clear problem info
@@ -459,6 +463,8 @@ export class AppState {
       () => this.hideMainWindow(),
       () => this.showMainWindow()
     )
+    // Encode and hash now, so analysis only reads the cache
+    this.processingHelper.getLLMHelper().prepareImages([screenshotPath])
 
     return screenshotPath
   }
@@ -609,6 +615,11 @@ async function initializeApp() {
     appState.connectNativeAudio().then(() => {
       console.log("Native audio client connected/connecting...")
     });
+
+    // Sockets don't survive sleep; reconnect before the next question needs them
+    powerMonitor.on("resume", () => {
+      appState.processingHelper.getLLMHelper().prewarmConnection().catch(() => { })
+    })
   })
 
   app.on("activate", () => {
@@ -625,7 +636,42 @@ async function initializeApp() {
     }
   })
 
-  app.on('will-quit', async (e) => {
+  // Longest the quit is held for the cleanup below (each step is best effort)
+  const QUIT_CLEANUP_TIMEOUT_MS = 3000
+  let quitCleanup: Promise<void> | null = null
+  let quitCleanupDone = false
+  app.on('will-quit', (e) => {
+    // Hold the quit until the async cleanup has finished (or timed out), then quit again
+    if (!quitCleanupDone) {
+      e.preventDefault()
+      if (quitCleanup) return
+
+      const llmHelper = AppState.getInstance().processingHelper.getLLMHelper()
+      const steps = [
+        // Buffered transcript lines (the writer bounds its own wait too)
+        AppState.getInstance().getIntelligenceManager().flushTranscriptLog(),
+        // Server-side Gemini prompt caches
+        llmHelper.disposePromptCache(),
+        // Evict the local Ollama model instead of leaving it pinned for keep_alive
+        llmHelper.releaseOllamaModel(),
+      ]
+      let timeout: NodeJS.Timeout | null = null
+      quitCleanup = Promise.race([
+        Promise.allSettled(steps).then(() => { }),
+        new Promise<void>(resolve => {
+          timeout = setTimeout(() => {
+            console.warn(`[main] Quit cleanup did not finish within ${QUIT_CLEANUP_TIMEOUT_MS}ms, quitting anyway`)
+            resolve()
+          }, QUIT_CLEANUP_TIMEOUT_MS)
+        }),
+      ]).finally(() => {
+        if (timeout) clearTimeout(timeout)
+        quitCleanupDone = true
+        app.quit()
+      })
+      return
+    }
+
     // Open the transcript file before quitting
     // Note: This is fire-and-forget since will-quit doesn't support async wait well without preventDefault
     // But openPath is usually fast enough or hands off to OS
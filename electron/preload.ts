@@ -21,10 +21,12 @@ interface ElectronAPI {
   onSolutionStart: (callback: () => void) => () => void
   onDebugStart: (callback: () => void) => () => void
   onDebugSuccess: (callback: (data: any) => void) => () => void
+  onDebugPartial: (callback: (data: { fields: Record<string, any>; appends?: Record<string, string> }) => void) => () => void
   onSolutionError: (callback: (error: string) => void) => () => void
   onProcessingNoScreenshots: (callback: () => void) => () => void
   onProblemExtracted: (callback: (data: any) => void) => () => void
   onSolutionSuccess: (callback: (data: any) => void) => () => void
+  onSolutionPartial: (callback: (data: { fields: Record<string, any>; appends?: Record<string, string> }) => void) => () => void
 
   onUnauthorized: (callback: () => void) => () => void
   onDebugError: (callback: (error: string) => void) => () => void
@@ -38,11 +40,24 @@ interface ElectronAPI {
   quitApp: () => Promise<void>
 
   // LLM Model Management
-  getCurrentLlmConfig: () => Promise<{ provider: "ollama" | "gemini"; model: string; isOllama: boolean }>
+  getCurrentLlmConfig: () => Promise<{ provider: "ollama" | "gemini"; model: string; isOllama: boolean; residency?: { model: string; state: "warm" | "cold" | "loading"; expiresAt: string | null; lastLoadMs: number | null } | null }>
   getAvailableOllamaModels: () => Promise<string[]>
   switchToOllama: (model?: string, url?: string) => Promise<{ success: boolean; error?: string }>
   switchToGemini: (apiKey?: string, modelId?: string) => Promise<{ success: boolean; error?: string }>
   testLlmConnection: () => Promise<{ success: boolean; error?: string }>
+  getModelRouterState: () => Promise<Array<{
+    model: string
+    state: "closed" | "open" | "half_open"
+    requests: number
+    errorRate: number
+    p50LatencyMs: number | null
+    p95LatencyMs: number | null
+    consecutiveFailures: number
+    trips: number
+    lastError: string | null
+    retryAt: number | null
+  }>>
+  resetModelRouter: () => Promise<{ success: boolean; error?: string }>
 
   // Native Audio Service Events
   onNativeAudioTranscript: (callback: (transcript: { speaker: string; text: string; final: boolean }) => void) => () => void
@@ -95,11 +110,13 @@ export const PROCESSING_EVENTS = {
   INITIAL_START: "initial-start",
   PROBLEM_EXTRACTED: "problem-extracted",
   SOLUTION_SUCCESS: "solution-success",
+  SOLUTION_PARTIAL: "solution-partial",
   INITIAL_SOLUTION_ERROR: "solution-error",
 
   //states for processing the debugging
   DEBUG_START: "debug-start",
   DEBUG_SUCCESS: "debug-success",
+  DEBUG_PARTIAL: "debug-partial",
   DEBUG_ERROR: "debug-error"
 } as const
 
@@ -170,6 +187,13 @@ contextBridge.exposeInMainWorld("electronAPI", {
       )
     }
   },
+  onDebugPartial: (callback: (data: { fields: Record<string, any>; appends?: Record<string, string> }) => void) => {
+    const subscription = (_: any, data: { fields: Record<string, any>; appends?: Record<string, string> }) => callback(data)
+    ipcRenderer.on(PROCESSING_EVENTS.DEBUG_PARTIAL, subscription)
+    return () => {
+      ipcRenderer.removeListener(PROCESSING_EVENTS.DEBUG_PARTIAL, subscription)
+    }
+  },
   onDebugError: (callback: (error: string) => void) => {
     const subscription = (_: any, error: string) => callback(error)
     ipcRenderer.on(PROCESSING_EVENTS.DEBUG_ERROR, subscription)
@@ -215,6 +239,16 @@ contextBridge.exposeInMainWorld("electronAPI", {
       )
     }
   },
+  onSolutionPartial: (callback: (data: { fields: Record<string, any>; appends?: Record<string, string> }) => void) => {
+    const subscription = (_: any, data: { fields: Record<string, any>; appends?: Record<string, string> }) => callback(data)
+    ipcRenderer.on(PROCESSING_EVENTS.SOLUTION_PARTIAL, subscription)
+    return () => {
+      ipcRenderer.removeListener(
+        PROCESSING_EVENTS.SOLUTION_PARTIAL,
+        subscription
+      )
+    }
+  },
   onUnauthorized: (callback: () => void) => {
     const subscription = () => callback()
     ipcRenderer.on(PROCESSING_EVENTS.UNAUTHORIZED, subscription)
@@ -257,6 +291,8 @@ contextBridge.exposeInMainWorld("electronAPI", {
   switchToOllama: (model?: string, url?: string) => ipcRenderer.invoke("switch-to-ollama", model, url),
   switchToGemini: (apiKey?: string, modelId?: string) => ipcRenderer.invoke("switch-to-gemini", apiKey, modelId),
   testLlmConnection: () => ipcRenderer.invoke("test-llm-connection"),
+  getModelRouterState: () => ipcRenderer.invoke("get-model-router-state"),
+  resetModelRouter: () => ipcRenderer.invoke("reset-model-router"),
 
   // Native Audio Service Events
   onNativeAudioTranscript: (callback: (transcript: { speaker: string; text: string; final: boolean }) => void) => {
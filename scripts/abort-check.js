@@ -0,0 +1,173 @@
+#!/usr/bin/env node
+// scripts/abort-check.js
+// Checks that cancelling an LLM call closes its socket, so the provider stops generating
+// Aborts callOllama, streamOllama and a Gemini stream mid-response against scripts/mock-llm-server.js
+//
+// Usage:
+//   npm run check:abort              (compiles electron/ first)
+//   node scripts/abort-check.js [--port 8788]
+//
+// Exits non-zero if the mock never saw a socket close or the pool stats miss the abort.
+
+const path = require('path');
+const { createServer, MockState } = require('./mock-llm-server');
+
+// Slow enough that every abort lands mid-response: ~200ms to the first token, then ~20s of tokens
+const PROFILE = {
+  default: { ttftMedianMs: 200, ttftSigma: 0.01, tokensPerSec: 20, responseTokens: 400, chunkTokens: 4 },
+};
+
+// ==========================================
+// ARGUMENTS
+// ==========================================
+function parseArgs(argv) {
+  const args = { port: 8788 };
+  for (let i = 0; i < argv.length; i++) {
+    const next = argv[i + 1];
+    switch (argv[i]) {
+      case '--port': args.port = Number(next); i++; break;
+      case '--help':
+        console.log('Usage: abort-check.js [--port N]');
+        process.exit(0);
+    }
+  }
+  return args;
+}
+
+function loadLLMHelper() {
+  try {
+    return require(path.join(__dirname, '..', 'dist-electron', 'LLMHelper.js')).LLMHelper;
+  } catch (err) {
+    console.error('[abort-check] dist-electron/LLMHelper.js not found; run `tsc -p electron/tsconfig.json` first');
+    console.error(err.message);
+    process.exit(1);
+  }
+}
+
+// ==========================================
+// HELPERS
+// ==========================================
+function delay(ms) {
+  return new Promise((resolve) => setTimeout(resolve, ms));
+}
+
+/**
+ * Poll until `predicate` holds (socket teardown reaches the server asynchronously)
+ */
+async function waitFor(predicate, timeoutMs = 2000) {
+  const deadline = Date.now() + timeoutMs;
+  while (Date.now() < deadline) {
+    if (predicate()) return true;
+    await delay(20);
+  }
+  return predicate();
+}
+
+function isAbortError(err) {
+  return !!err && (err.name === 'AbortError' || /abort/i.test(String(err.message)));
+}
+
+let failures = 0;
+
+function check(name, ok, detail) {
+  console.log(`  ${ok ? 'PASS' : 'FAIL'} ${name}${detail ? ` (${detail})` : ''}`);
+  if (!ok) failures++;
+}
+
+/**
+ * Run `call(signal)`, abort it once `abortWhen` resolves, and check that the
+ * call ends with an AbortError and the server sees the request's socket close
+ */
+async function expectAbort(name, state, call, abortWhen) {
+  console.log(`[abort-check] ${name}`);
+  const before = { ...state.stats };
+  const controller = new AbortController();
+
+  const settled = call(controller.signal).then(() => null, (err) => err);
+  // A call that fails before the abort point fails the check below instead of hanging
+  await Promise.race([abortWhen(), settled]);
+  const abortedAt = Date.now();
+  controller.abort();
+  const error = await settled;
+
+  check('call rejected with an AbortError', isAbortError(error), error ? error.message : 'resolved');
+  check('server stopped generating', await waitFor(() => state.stats.aborted > before.aborted),
+    `aborted ${before.aborted} -> ${state.stats.aborted}`);
+  check('server saw the socket close', await waitFor(() => state.stats.socketsClosed > before.socketsClosed),
+    `${Date.now() - abortedAt}ms after abort`);
+}
+
+// ==========================================
+// CHECKS
+// ==========================================
+async function checkOllama(LLMHelper, state, url) {
+  const helper = new LLMHelper(undefined, true, 'llama3.2:latest', url);
+  const aborted = () => helper.getOllamaPoolStats().abortedRequests;
+
+  // Non-streaming: abort while the server is still generating the body
+  let before = aborted();
+  await expectAbort('callOllama', state,
+    (signal) => helper.callOllama('Explain keep-alive sockets.', signal),
+    () => delay(600));
+  check('pool counted the request as aborted', aborted() === before + 1, `abortedRequests ${before} -> ${aborted()}`);
+
+  // Streaming: abort after the first token has arrived
+  before = aborted();
+  let firstToken;
+  const gotToken = new Promise((resolve) => { firstToken = resolve; });
+  await expectAbort('streamOllama', state,
+    async (signal) => {
+      for await (const token of helper.streamOllama('Explain keep-alive sockets.', signal)) {
+        firstToken(token);
+      }
+    },
+    () => gotToken);
+  check('pool counted the request as aborted', aborted() === before + 1, `abortedRequests ${before} -> ${aborted()}`);
+
+  const pool = helper.getOllamaPoolStats();
+  check('no socket left checked out', await waitFor(() => helper.getOllamaPoolStats().activeSockets === 0),
+    `active ${pool.activeSockets}, free ${pool.freeSockets}`);
+}
+
+async function checkGemini(LLMHelper, state) {
+  const helper = new LLMHelper('mock');
+
+  let firstChunk;
+  const gotChunk = new Promise((resolve) => { firstChunk = resolve; });
+  await expectAbort('Gemini generateContentStream', state,
+    async (signal) => {
+      for await (const chunk of helper.streamChatWithGemini('Explain keep-alive sockets.', undefined, undefined, true, { signal })) {
+        firstChunk(chunk);
+      }
+    },
+    () => gotChunk);
+}
+
+async function main() {
+  const args = parseArgs(process.argv.slice(2));
+  const url = `http://127.0.0.1:${args.port}`;
+  // Read by LLMHelper when it creates the Gemini client
+  process.env.GEMINI_BASE_URL = url;
+  const LLMHelper = loadLLMHelper();
+
+  const state = new MockState(PROFILE, 42);
+  state.profileName = 'abort-check';
+  const server = createServer(state);
+  await new Promise((resolve) => server.listen(args.port, '127.0.0.1', resolve));
+
+  try {
+    await checkOllama(LLMHelper, state, url);
+    await checkGemini(LLMHelper, state);
+  } finally {
+    server.close();
+  }
+
+  console.log(failures === 0 ? '[abort-check] All checks passed' : `[abort-check] ${failures} check(s) failed`);
+  // The helpers keep warm-up timers and pooled sockets around
+  process.exit(failures === 0 ? 0 : 1);
+}
+
+main().catch((err) => {
+  console.error('[abort-check]', err);
+  process.exit(1);
+});
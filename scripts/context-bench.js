@@ -0,0 +1,137 @@
+#!/usr/bin/env node
+// scripts/context-bench.js
+// Microbenchmark for IntelligenceManager's context storage under a live transcript stream
+// Compares the ring buffer (dist-electron/ContextRingBuffer.js) with the previous filter-based array
+//
+// Usage:
+//   npm run bench:context            (compiles electron/ first)
+//   node scripts/context-bench.js [--seconds 600] [--hz 10] [--capacity 500] [--queries-per-item 1]
+
+const path = require('path');
+
+// ==========================================
+// ARGUMENTS
+// ==========================================
+function parseArgs(argv) {
+  const args = { seconds: 600, hz: 10, capacity: 500, queriesPerItem: 1, windowSeconds: 120 };
+  for (let i = 0; i < argv.length; i++) {
+    const next = argv[i + 1];
+    switch (argv[i]) {
+      case '--seconds': args.seconds = Number(next); i++; break;
+      case '--hz': args.hz = Number(next); i++; break;
+      case '--capacity': args.capacity = Number(next); i++; break;
+      case '--queries-per-item': args.queriesPerItem = Number(next); i++; break;
+      case '--window': args.windowSeconds = Number(next); i++; break;
+      case '--help':
+        console.log('Usage: context-bench.js [--seconds N] [--hz N] [--capacity N] [--queries-per-item N] [--window N]');
+        process.exit(0);
+    }
+  }
+  return args;
+}
+
+function loadRingBuffer() {
+  try {
+    return require(path.join(__dirname, '..', 'dist-electron', 'ContextRingBuffer.js')).ContextRingBuffer;
+  } catch (err) {
+    console.error('[context-bench] dist-electron/ContextRingBuffer.js not found; run `tsc -p electron/tsconfig.json` first');
+    process.exit(1);
+  }
+}
+
+// ==========================================
+// IMPLEMENTATIONS
+// ==========================================
+// What IntelligenceManager did before: filter on every add and on every query
+class FilterArrayContext {
+  constructor(capacity, windowMs) {
+    this.items = [];
+    this.capacity = capacity;
+    this.windowMs = windowMs;
+  }
+
+  add(item, now) {
+    this.items.push(item);
+    const cutoff = now - this.windowMs;
+    this.items = this.items.filter((entry) => entry.timestamp >= cutoff);
+    if (this.items.length > this.capacity) this.items = this.items.slice(-this.capacity);
+  }
+
+  window(seconds, now) {
+    const cutoff = now - seconds * 1000;
+    return this.items.filter((entry) => entry.timestamp >= cutoff);
+  }
+}
+
+class RingBufferContext {
+  constructor(RingBuffer, capacity, windowMs) {
+    this.buffer = new RingBuffer(capacity);
+    this.windowMs = windowMs;
+  }
+
+  add(item, now) {
+    this.buffer.push(item);
+    this.buffer.evictBefore(now - this.windowMs);
+  }
+
+  window(seconds, now) {
+    return this.buffer.since(now - seconds * 1000);
+  }
+}
+
+// ==========================================
+// WORKLOAD
+// ==========================================
+const ROLES = ['interviewer', 'user', 'interviewer', 'assistant'];
+
+function buildStream(args) {
+  const count = Math.round(args.seconds * args.hz);
+  const stepMs = 1000 / args.hz;
+  const items = new Array(count);
+  for (let i = 0; i < count; i++) {
+    items[i] = { role: ROLES[i % ROLES.length], text: `segment ${i} of the transcript stream`, timestamp: Math.round(i * stepMs) };
+  }
+  return items;
+}
+
+function run(name, context, stream, args) {
+  let sink = 0;
+  let maxWindow = 0;
+  const startedAt = process.hrtime.bigint();
+  for (const item of stream) {
+    const now = item.timestamp;
+    context.add(item, now);
+    for (let q = 0; q < args.queriesPerItem; q++) {
+      // The modes ask for 60/120/180 second windows; rotate through them
+      const view = context.window(q % 3 === 0 ? 180 : q % 3 === 1 ? 120 : 60, now);
+      sink += view.length;
+      if (view.length > maxWindow) maxWindow = view.length;
+    }
+  }
+  const totalNs = Number(process.hrtime.bigint() - startedAt);
+  const ops = stream.length * (1 + args.queriesPerItem);
+  console.log(`  ${name.padEnd(12)} ${(totalNs / 1e6).toFixed(1).padStart(8)}ms total, ${Math.round(totalNs / ops).toString().padStart(6)}ns/op, max window ${maxWindow} items`);
+  return sink;
+}
+
+function main() {
+  const args = parseArgs(process.argv.slice(2));
+  const RingBuffer = loadRingBuffer();
+  const stream = buildStream(args);
+  const windowMs = args.windowSeconds * 1000;
+
+  console.log(`[context-bench] ${stream.length} items at ${args.hz} Hz, capacity ${args.capacity}, ${args.windowSeconds}s eviction window, ${args.queriesPerItem} window queries per item`);
+
+  // Warm up the JIT on both before measuring
+  run('warmup', new FilterArrayContext(args.capacity, windowMs), stream.slice(0, 2000), args);
+  run('warmup', new RingBufferContext(RingBuffer, args.capacity, windowMs), stream.slice(0, 2000), args);
+
+  const baseline = run('filter', new FilterArrayContext(args.capacity, windowMs), stream, args);
+  const ring = run('ring', new RingBufferContext(RingBuffer, args.capacity, windowMs), stream, args);
+  if (baseline !== ring) {
+    console.error(`[context-bench] Window sizes differ (${baseline} vs ${ring})`);
+    process.exit(1);
+  }
+}
+
+main();
@@ -0,0 +1,714 @@
+#!/usr/bin/env node
+// scripts/mock-llm-server.js
+// Deterministic stand-in for the Gemini REST API and the Ollama HTTP API
+// Used to benchmark LLMHelper / IntelligenceManager retry, hedge and fallback paths offline
+//
+// Usage:
+//   node scripts/mock-llm-server.js [--port 8787] [--profile typical] [--seed 42] [--profile-file my-profile.json]
+//                                   [--tls-cert cert.pem --tls-key key.pem]
+//
+// Point the app at it:
+//   GEMINI_API_KEY=mock GEMINI_BASE_URL=http://127.0.0.1:8787
+//   USE_OLLAMA=true OLLAMA_URL=http://127.0.0.1:8787
+//
+// With --tls-* it serves HTTPS (for connection warm-up / TLS handshake measurements);
+// trust the self-signed cert with NODE_EXTRA_CA_CERTS=cert.pem
+
+const http = require('http');
+const https = require('https');
+const fs = require('fs');
+const { URL } = require('url');
+
+// ==========================================
+// LATENCY PROFILES
+// ==========================================
+// Each profile has `default` parameters, optional per-model overrides matched by
+// substring (`models`), and an `ollama` override applied to /api/* traffic.
+//
+// Parameters:
+//   ttftMedianMs / ttftSigma  - log-normal time to first token
+//   tokensPerSec              - generation speed after the first token
+//   responseTokens            - length of a normal answer
+//   chunkTokens               - tokens per streamed chunk
+//   errorRate                 - probability of a 503 "overloaded" response
+//   burst503                  - { every, length }: requests n where n % every < length fail with 503
+//   emptyRate                 - probability of a candidate with no text
+//   maxTokensRate             - probability of a truncated MAX_TOKENS stop
+//   malformedJsonRate         - probability that a JSON answer requested in prose only (no responseSchema /
+//                               format) comes back wrapped in a code fence with trailing chatter
+//   loadMs                    - Ollama only: time to load a model that isn't resident (keep_alive expired)
+//   promptEvalTokensPerSec    - Ollama only: prefill speed for prompt tokens not already in the KV cache
+//                               (0 = prompt evaluation is free and folded into the TTFT)
+const BASE = {
+  ttftMedianMs: 500,
+  ttftSigma: 0.35,
+  tokensPerSec: 60,
+  responseTokens: 120,
+  chunkTokens: 8,
+  errorRate: 0,
+  burst503: null,
+  emptyRate: 0,
+  maxTokensRate: 0,
+  malformedJsonRate: 0,
+  loadMs: 0,
+  promptEvalTokensPerSec: 0,
+};
+
+const PROFILES = {
+  fast: {
+    default: { ttftMedianMs: 120, ttftSigma: 0.15, tokensPerSec: 150 },
+  },
+  typical: {
+    default: { ttftMedianMs: 600, ttftSigma: 0.4, tokensPerSec: 60, errorRate: 0.02, emptyRate: 0.01 },
+    models: {
+      pro: { ttftMedianMs: 1800, ttftSigma: 0.5, tokensPerSec: 30 },
+    },
+    ollama: { ttftMedianMs: 900, tokensPerSec: 25, loadMs: 2500, promptEvalTokensPerSec: 400 },
+  },
+  flaky: {
+    default: {
+      ttftMedianMs: 700, ttftSigma: 0.6, tokensPerSec: 50,
+      burst503: { every: 10, length: 3 }, emptyRate: 0.1, maxTokensRate: 0.05, malformedJsonRate: 0.2,
+    },
+  },
+  // Primary (Flash) hangs past its hedge deadline; Pro is healthy
+  'slow-primary': {
+    default: { ttftMedianMs: 7000, ttftSigma: 0.2 },
+    models: {
+      pro: { ttftMedianMs: 1500, ttftSigma: 0.3, tokensPerSec: 35 },
+    },
+  },
+  // CPU-only local inference
+  'ollama-cpu': {
+    default: { ttftMedianMs: 2500, ttftSigma: 0.3, tokensPerSec: 8, responseTokens: 80, loadMs: 6000, promptEvalTokensPerSec: 60 },
+  },
+};
+
+// ==========================================
+// ARGUMENTS
+// ==========================================
+function parseArgs(argv) {
+  const args = {
+    port: Number(process.env.MOCK_LLM_PORT) || 8787,
+    profile: process.env.MOCK_LLM_PROFILE || 'typical',
+    seed: Number(process.env.MOCK_LLM_SEED) || 42,
+    profileFile: null,
+    tlsCert: null,
+    tlsKey: null,
+  };
+  for (let i = 0; i < argv.length; i++) {
+    const next = argv[i + 1];
+    switch (argv[i]) {
+      case '--port': args.port = Number(next); i++; break;
+      case '--profile': args.profile = next; i++; break;
+      case '--seed': args.seed = Number(next); i++; break;
+      case '--profile-file': args.profileFile = next; i++; break;
+      case '--tls-cert': args.tlsCert = next; i++; break;
+      case '--tls-key': args.tlsKey = next; i++; break;
+      case '--help':
+        console.log('Usage: mock-llm-server.js [--port N] [--profile ' + Object.keys(PROFILES).join('|') + '] [--seed N] [--profile-file file.json] [--tls-cert cert.pem --tls-key key.pem]');
+        process.exit(0);
+    }
+  }
+  return args;
+}
+
+// ==========================================
+// SEEDED RANDOMNESS
+// ==========================================
+// mulberry32: small, fast, reproducible across runs for the same seed
+function createRng(seed) {
+  let state = seed >>> 0;
+  return () => {
+    state = (state + 0x6D2B79F5) >>> 0;
+    let t = state;
+    t = Math.imul(t ^ (t >>> 15), t | 1);
+    t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+}
+
+function sampleLogNormal(rng, median, sigma) {
+  // Box-Muller
+  const u1 = Math.max(rng(), 1e-12);
+  const u2 = rng();
+  const z = Math.sqrt(-2 * Math.log(u1)) * Math.cos(2 * Math.PI * u2);
+  return median * Math.exp(sigma * z);
+}
+
+const WORDS = (
+  'the system handles requests through a queue and each worker processes one item at a time ' +
+  'latency depends on batching caching and network round trips so we measure p50 and p95 ' +
+  'a good answer starts with the direct result then adds one supporting detail and stops'
+).split(' ');
+
+function generateWords(rng, count) {
+  const words = [];
+  for (let i = 0; i < count; i++) {
+    words.push(WORDS[Math.floor(rng() * WORDS.length)]);
+  }
+  return words;
+}
+
+// Prompts that demand JSON (extractProblemFromImages, generateSolution, debug) get valid JSON back
+function jsonAnswer(prompt) {
+  if (prompt.includes('"solution"')) {
+    return JSON.stringify({
+      solution: {
+        code: 'function solve(input) {\n  return input;\n}',
+        problem_statement: 'Mock problem statement.',
+        context: 'Mock context.',
+        suggested_responses: ['First mock response', 'Second mock response'],
+        reasoning: 'Mock reasoning.',
+      },
+    });
+  }
+  return JSON.stringify({
+    problem_statement: 'Mock problem statement.',
+    context: 'Mock context.',
+    suggested_responses: ['First mock response', 'Second mock response'],
+    reasoning: 'Mock reasoning.',
+  });
+}
+
+// ==========================================
+// SERVER STATE
+// ==========================================
+class MockState {
+  constructor(profile, seed) {
+    this.profile = profile;
+    this.seed = seed;
+    this.reset();
+  }
+
+  reset() {
+    this.rng = createRng(this.seed);
+    this.requestCounts = new Map();    // per model, drives burst503
+    this.caches = new Map();           // cachedContents/<id> -> { model, expireTime, systemInstruction }
+    this.nextCacheId = 1;
+    this.loadedModels = new Map();     // Ollama model -> expiresAt (ms), emulates keep_alive residency
+    this.kvCache = new Map();          // Ollama model -> text of the last evaluated sequence (prompt + answer)
+    this.loadedCtx = new Map();        // Ollama model -> num_ctx it was loaded with (a different one forces a reload)
+    this.stats = {
+      requests: 0,
+      streamed: 0,
+      errors503: 0,
+      empty: 0,
+      maxTokens: 0,
+      aborted: 0,
+      cacheCreates: 0,
+      cacheUpdates: 0,
+      cacheDeletes: 0,
+      cachedContentRequests: 0,
+      modelListRequests: 0,
+      modelLoads: 0,
+      modelUnloads: 0,
+      promptEvalTokens: 0,    // Ollama prompt tokens actually evaluated
+      cachedPromptTokens: 0,  // Ollama prompt tokens served from the KV cache prefix
+      connections: 0,     // New TCP (or TLS) connections; stays flat while keep-alive sockets are reused
+      socketsClosed: 0,   // Connections closed (by either side); an aborted request closes its socket
+      byModel: {},
+    };
+  }
+
+  paramsFor(model, isOllama) {
+    let params = { ...BASE, ...(this.profile.default || {}) };
+    if (isOllama && this.profile.ollama) {
+      params = { ...params, ...this.profile.ollama };
+    }
+    for (const [match, override] of Object.entries(this.profile.models || {})) {
+      if (model.includes(match)) params = { ...params, ...override };
+    }
+    return params;
+  }
+
+  /**
+   * Decide the fate of one request up front so the outcome only depends on seed + arrival order
+   */
+  plan(model, isOllama, maxOutputTokens) {
+    const params = this.paramsFor(model, isOllama);
+    const index = this.requestCounts.get(model) || 0;
+    this.requestCounts.set(model, index + 1);
+    this.stats.requests++;
+    this.stats.byModel[model] = (this.stats.byModel[model] || 0) + 1;
+
+    const inBurst = !!params.burst503 && index % params.burst503.every < params.burst503.length;
+    const roll = this.rng();
+    let outcome = 'ok';
+    if (inBurst || roll < params.errorRate) {
+      outcome = '503';
+    } else if (roll < params.errorRate + params.emptyRate) {
+      outcome = 'empty';
+    } else if (roll < params.errorRate + params.emptyRate + params.maxTokensRate) {
+      outcome = 'max_tokens';
+    }
+
+    let tokens = params.responseTokens;
+    if (maxOutputTokens && maxOutputTokens < tokens) {
+      tokens = maxOutputTokens;
+      if (outcome === 'ok') outcome = 'max_tokens';
+    } else if (outcome === 'max_tokens') {
+      tokens = Math.max(4, Math.floor(tokens / 3));
+    }
+
+    return {
+      outcome,
+      tokens,
+      // Only roll when enabled so existing profiles replay the same sequence for a seed
+      malformedJson: params.malformedJsonRate > 0 && this.rng() < params.malformedJsonRate,
+      ttftMs: Math.round(sampleLogNormal(this.rng, params.ttftMedianMs, params.ttftSigma)),
+      msPerToken: 1000 / params.tokensPerSec,
+      chunkTokens: params.chunkTokens,
+      words: generateWords(this.rng, tokens),
+    };
+  }
+}
+
+// ==========================================
+// HELPERS
+// ==========================================
+function readBody(req) {
+  return new Promise((resolve, reject) => {
+    const chunks = [];
+    req.on('data', (chunk) => chunks.push(chunk));
+    req.on('end', () => {
+      const raw = Buffer.concat(chunks).toString('utf8');
+      if (!raw) return resolve({});
+      try {
+        resolve(JSON.parse(raw));
+      } catch (err) {
+        reject(err);
+      }
+    });
+    req.on('error', reject);
+  });
+}
+
+function sendJson(res, status, body) {
+  const payload = JSON.stringify(body);
+  res.writeHead(status, { 'Content-Type': 'application/json', 'Content-Length': Buffer.byteLength(payload) });
+  res.end(payload);
+}
+
+/**
+ * Wait `ms`; resolves false if the client went away meanwhile (aborted / hedged loser)
+ */
+function sleep(ms, res) {
+  return new Promise((resolve) => {
+    if (res.destroyed) return resolve(false);
+    if (ms <= 0) return resolve(true);
+    const onClose = () => {
+      clearTimeout(timer);
+      resolve(false);
+    };
+    const timer = setTimeout(() => {
+      res.off('close', onClose);
+      resolve(true);
+    }, ms);
+    res.once('close', onClose);
+  });
+}
+
+function promptText(body) {
+  const texts = [];
+  const collect = (content) => {
+    if (!content) return;
+    if (typeof content === 'string') return texts.push(content);
+    if (Array.isArray(content)) return content.forEach(collect);
+    if (content.text) texts.push(content.text);
+    if (content.parts) collect(content.parts);
+  };
+  collect(body.systemInstruction);
+  collect(body.contents);
+  if (body.prompt) texts.push(body.prompt);
+  if (body.system) texts.push(body.system);
+  if (body.messages) body.messages.forEach((m) => texts.push(m.content || ''));
+  return texts.join('\n');
+}
+
+function splitChunks(plan, text) {
+  if (text.startsWith('{')) {
+    // Stream JSON in fixed-size slices so partial parsers get exercised
+    const slices = [];
+    for (let i = 0; i < text.length; i += 24) slices.push(text.slice(i, i + 24));
+    return slices;
+  }
+  const chunks = [];
+  for (let i = 0; i < plan.words.length; i += plan.chunkTokens) {
+    const slice = plan.words.slice(i, i + plan.chunkTokens).join(' ');
+    chunks.push(i === 0 ? slice : ' ' + slice);
+  }
+  return chunks;
+}
+
+function answerText(plan, body) {
+  const prompt = promptText(body);
+  // Schema-constrained decoding always yields bare JSON; a MAX_TOKENS stop cuts it off mid-value
+  const constrained = !!((body.generationConfig && body.generationConfig.responseSchema) || body.format);
+  if (constrained) {
+    const json = jsonAnswer(prompt);
+    return plan.outcome === 'max_tokens' ? json.slice(0, Math.floor(json.length * 0.6)) : json;
+  }
+  if (plan.outcome !== 'max_tokens' && /JSON (format|object)/.test(prompt)) {
+    const json = jsonAnswer(prompt);
+    return plan.malformedJson ? '```json\n' + json + '\n```\nLet me know if you need anything else!' : json;
+  }
+  return plan.words.join(' ');
+}
+
+// ==========================================
+// GEMINI
+// ==========================================
+const OVERLOADED = {
+  error: { code: 503, message: 'The model is overloaded. Please try again later.', status: 'UNAVAILABLE' },
+};
+
+function geminiChunk(text, finishReason, usage) {
+  const candidate = { content: { role: 'model', parts: text ? [{ text }] : [] }, index: 0 };
+  if (finishReason) candidate.finishReason = finishReason;
+  const chunk = { candidates: [candidate] };
+  if (usage) chunk.usageMetadata = usage;
+  return chunk;
+}
+
+async function handleGeminiGenerate(state, req, res, model, streaming, body) {
+  if (body.cachedContent) {
+    state.stats.cachedContentRequests++;
+    const cache = state.caches.get(body.cachedContent);
+    if (!cache || Date.parse(cache.expireTime) <= Date.now()) {
+      return sendJson(res, 404, {
+        error: { code: 404, message: `CachedContent not found: ${body.cachedContent}`, status: 'NOT_FOUND' },
+      });
+    }
+    if (body.systemInstruction) {
+      return sendJson(res, 400, {
+        error: { code: 400, message: 'CachedContent can not be used with GenerateContent request setting system_instruction', status: 'INVALID_ARGUMENT' },
+      });
+    }
+  }
+
+  const maxOutputTokens = body.generationConfig && body.generationConfig.maxOutputTokens;
+  const plan = state.plan(model, false, maxOutputTokens);
+
+  if (!(await sleep(plan.ttftMs, res))) {
+    state.stats.aborted++;
+    return;
+  }
+
+  if (plan.outcome === '503') {
+    state.stats.errors503++;
+    return sendJson(res, 503, OVERLOADED);
+  }
+
+  const finishReason = plan.outcome === 'max_tokens' ? 'MAX_TOKENS' : 'STOP';
+  const text = plan.outcome === 'empty' ? '' : answerText(plan, body);
+  if (plan.outcome === 'empty') state.stats.empty++;
+  if (plan.outcome === 'max_tokens') state.stats.maxTokens++;
+
+  const usage = {
+    promptTokenCount: Math.ceil(promptText(body).length / 4),
+    candidatesTokenCount: plan.outcome === 'empty' ? 0 : plan.tokens,
+    cachedContentTokenCount: body.cachedContent ? Math.ceil((state.caches.get(body.cachedContent).systemInstruction || '').length / 4) : undefined,
+  };
+
+  if (!streaming) {
+    if (!(await sleep(Math.round(plan.tokens * plan.msPerToken), res))) {
+      state.stats.aborted++;
+      return;
+    }
+    return sendJson(res, 200, geminiChunk(text, finishReason, usage));
+  }
+
+  state.stats.streamed++;
+  res.writeHead(200, { 'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache' });
+  const chunks = text ? splitChunks(plan, text) : [''];
+  const perChunkMs = Math.round((plan.tokens * plan.msPerToken) / chunks.length);
+
+  for (let i = 0; i < chunks.length; i++) {
+    if (i > 0 && !(await sleep(perChunkMs, res))) {
+      state.stats.aborted++;
+      return;
+    }
+    const last = i === chunks.length - 1;
+    res.write(`data: ${JSON.stringify(geminiChunk(chunks[i], last ? finishReason : null, last ? usage : null))}\n\n`);
+  }
+  res.end();
+}
+
+async function handleGeminiCaches(state, req, res, method, cacheName, body) {
+  if (method === 'POST' && !cacheName) {
+    const ttlSeconds = parseFloat(body.ttl || '3600');
+    const name = `cachedContents/mock-${state.nextCacheId++}`;
+    const cache = {
+      name,
+      model: body.model,
+      displayName: body.displayName,
+      systemInstruction: promptText({ systemInstruction: body.systemInstruction }),
+      expireTime: new Date(Date.now() + ttlSeconds * 1000).toISOString(),
+    };
+    state.caches.set(name, cache);
+    state.stats.cacheCreates++;
+    return sendJson(res, 200, { name, model: cache.model, displayName: cache.displayName, expireTime: cache.expireTime });
+  }
+
+  const cache = cacheName && state.caches.get(cacheName);
+  if (!cache) {
+    return sendJson(res, 404, { error: { code: 404, message: `CachedContent not found: ${cacheName}`, status: 'NOT_FOUND' } });
+  }
+
+  if (method === 'PATCH') {
+    const ttlSeconds = parseFloat(body.ttl || '3600');
+    cache.expireTime = new Date(Date.now() + ttlSeconds * 1000).toISOString();
+    state.stats.cacheUpdates++;
+    return sendJson(res, 200, { name: cache.name, model: cache.model, expireTime: cache.expireTime });
+  }
+  if (method === 'DELETE') {
+    state.caches.delete(cacheName);
+    state.stats.cacheDeletes++;
+    return sendJson(res, 200, {});
+  }
+  return sendJson(res, 200, { name: cache.name, model: cache.model, expireTime: cache.expireTime });
+}
+
+// ==========================================
+// OLLAMA
+// ==========================================
+// keep_alive: duration string ("30m", "90s", "1h"), seconds as a number, negative = forever, 0 = unload
+function parseKeepAlive(value) {
+  if (value === undefined || value === null) return 5 * 60 * 1000;
+  if (typeof value === 'number') return value < 0 ? Infinity : value * 1000;
+  const match = String(value).trim().match(/^(-?\d+(?:\.\d+)?)(ms|s|m|h)?$/);
+  if (!match) return 5 * 60 * 1000;
+  const amount = Number(match[1]);
+  if (amount < 0) return Infinity;
+  const unit = { ms: 1, s: 1000, m: 60000, h: 3600000 }[match[2] || 's'];
+  return amount * unit;
+}
+
+// How Ollama's chat template lays out a message history, close enough for prefix matching
+function renderOllamaPrompt(body) {
+  if (body.messages) return body.messages.map((m) => `<|${m.role}|>\n${m.content || ''}\n`).join('');
+  return (body.system ? body.system + '\n' : '') + (body.prompt || '');
+}
+
+function commonPrefixLength(a, b) {
+  const max = Math.min(a.length, b.length);
+  let i = 0;
+  while (i < max && a.charCodeAt(i) === b.charCodeAt(i)) i++;
+  return i;
+}
+
+function isResident(state, model) {
+  const expiresAt = state.loadedModels.get(model);
+  return expiresAt !== undefined && expiresAt > Date.now();
+}
+
+async function handleOllamaGenerate(state, req, res, path, body) {
+  const model = body.model || 'mock';
+  const isChat = path === '/api/chat';
+  const numPredict = body.options && body.options.num_predict;
+  const streaming = body.stream !== false;
+  const keepAliveMs = parseKeepAlive(body.keep_alive);
+  const noInput = !body.prompt && !(body.messages && body.messages.length);
+
+  // keep_alive: 0 with no input unloads the model
+  if (keepAliveMs === 0 && noInput) {
+    state.loadedModels.delete(model);
+    state.stats.modelUnloads++;
+    return sendJson(res, 200, { model, created_at: new Date().toISOString(), response: '', done: true, done_reason: 'unload' });
+  }
+
+  // Loading a model that isn't resident (or reloading it with a different num_ctx) costs loadMs
+  const numCtx = (body.options && body.options.num_ctx) || 2048;
+  let loadMs = 0;
+  if (!isResident(state, model) || state.loadedCtx.get(model) !== numCtx) {
+    loadMs = state.paramsFor(model, true).loadMs || 0;
+    state.stats.modelLoads++;
+    if (!(await sleep(loadMs, res))) {
+      state.stats.aborted++;
+      return;
+    }
+  }
+  if (loadMs > 0 || keepAliveMs === 0) state.kvCache.delete(model);
+  state.loadedCtx.set(model, numCtx);
+  state.loadedModels.set(model, keepAliveMs === 0 ? 0 : Date.now() + keepAliveMs);
+
+  // No input just loads the model
+  if (noInput) {
+    return sendJson(res, 200, {
+      model, created_at: new Date().toISOString(), response: '', done: true, done_reason: 'load',
+      total_duration: loadMs * 1e6, load_duration: loadMs * 1e6,
+    });
+  }
+
+  const plan = state.plan(model, true, numPredict > 0 ? numPredict : undefined);
+
+  // Ollama has no 503 semantics; overload shows up as a 500
+  if (plan.outcome === '503') {
+    await sleep(plan.ttftMs, res);
+    state.stats.errors503++;
+    return sendJson(res, 500, { error: 'model is overloaded' });
+  }
+  if (plan.outcome === 'empty') state.stats.empty++;
+  if (plan.outcome === 'max_tokens') state.stats.maxTokens++;
+
+  const text = plan.outcome === 'empty' ? '' : answerText(plan, body);
+
+  // Only the part of the prompt past the longest prefix shared with the previous
+  // sequence is evaluated; the rest comes out of the KV cache
+  const params = state.paramsFor(model, true);
+  const rendered = renderOllamaPrompt(body);
+  const cachedChars = commonPrefixLength(rendered, state.kvCache.get(model) || '');
+  const promptTokens = Math.max(1, Math.ceil((rendered.length - cachedChars) / 4));
+  const promptEvalMs = params.promptEvalTokensPerSec > 0 ? Math.round((promptTokens / params.promptEvalTokensPerSec) * 1000) : 0;
+  const ttftMs = plan.ttftMs + promptEvalMs;
+  state.stats.promptEvalTokens += promptTokens;
+  state.stats.cachedPromptTokens += Math.floor(cachedChars / 4);
+  state.kvCache.set(model, rendered + (body.messages ? `<|assistant|>\n${text}\n` : text));
+
+  const generationMs = Math.round(plan.tokens * plan.msPerToken);
+  const final = {
+    model,
+    created_at: new Date().toISOString(),
+    done: true,
+    done_reason: plan.outcome === 'max_tokens' ? 'length' : 'stop',
+    total_duration: (loadMs + ttftMs + generationMs) * 1e6,
+    load_duration: loadMs * 1e6,
+    prompt_eval_count: promptTokens,
+    prompt_eval_duration: ttftMs * 1e6,
+    eval_count: plan.tokens,
+    eval_duration: generationMs * 1e6,
+  };
+  const piece = (content) => (isChat ? { message: { role: 'assistant', content } } : { response: content });
+
+  if (!(await sleep(ttftMs, res))) {
+    state.stats.aborted++;
+    return;
+  }
+
+  if (!streaming) {
+    if (!(await sleep(generationMs, res))) {
+      state.stats.aborted++;
+      return;
+    }
+    return sendJson(res, 200, { ...final, created_at: new Date().toISOString(), ...piece(text) });
+  }
+
+  state.stats.streamed++;
+  res.writeHead(200, { 'Content-Type': 'application/x-ndjson' });
+  const chunks = text ? splitChunks(plan, text) : [];
+  const perChunkMs = chunks.length ? Math.round(generationMs / chunks.length) : 0;
+  for (let i = 0; i < chunks.length; i++) {
+    if (i > 0 && !(await sleep(perChunkMs, res))) {
+      state.stats.aborted++;
+      return;
+    }
+    res.write(JSON.stringify({ model, created_at: new Date().toISOString(), done: false, ...piece(chunks[i]) }) + '\n');
+  }
+  res.end(JSON.stringify({ ...final, created_at: new Date().toISOString(), ...piece('') }) + '\n');
+}
+
+// ==========================================
+// ROUTING
+// ==========================================
+function createServer(state, tls = null) {
+  const handler = async (req, res) => {
+    const url = new URL(req.url, 'http://localhost');
+    const path = url.pathname;
+
+    try {
+      const body = req.method === 'POST' || req.method === 'PATCH' ? await readBody(req) : {};
+
+      // Mock control
+      if (path === '/__mock/stats') return sendJson(res, 200, { profile: state.profileName, seed: state.seed, ...state.stats });
+      if (path === '/__mock/reset' && req.method === 'POST') {
+        state.reset();
+        return sendJson(res, 200, { ok: true });
+      }
+
+      // Gemini: /{version}/models/{model}:{method}
+      const generate = path.match(/^\/[^/]+\/models\/([^/:]+):(generateContent|streamGenerateContent)$/);
+      if (generate && req.method === 'POST') {
+        return await handleGeminiGenerate(state, req, res, generate[1], generate[2] === 'streamGenerateContent', body);
+      }
+
+      // Gemini: /{version}/models (cheap, no generation - used as a connection warm-up probe)
+      if (/^\/[^/]+\/models$/.test(path) && req.method === 'GET') {
+        state.stats.modelListRequests++;
+        return sendJson(res, 200, {
+          models: ['gemini-3-flash-preview', 'gemini-3-pro-preview'].map(name => ({ name: `models/${name}` })),
+        });
+      }
+
+      // Gemini: /{version}/cachedContents[/{id}]
+      const caches = path.match(/^\/[^/]+\/(cachedContents(?:\/[^/]+)?)$/);
+      if (caches) {
+        const cacheName = caches[1] === 'cachedContents' ? null : caches[1];
+        return await handleGeminiCaches(state, req, res, req.method, cacheName, body);
+      }
+
+      // Ollama
+      if ((path === '/api/generate' || path === '/api/chat') && req.method === 'POST') {
+        return await handleOllamaGenerate(state, req, res, path, body);
+      }
+      if (path === '/api/ps') {
+        const models = [...state.loadedModels.entries()]
+          .filter(([, expiresAt]) => expiresAt > Date.now())
+          .map(([name, expiresAt]) => ({
+            name,
+            model: name,
+            expires_at: expiresAt === Infinity ? '2318-01-01T00:00:00Z' : new Date(expiresAt).toISOString(),
+          }));
+        return sendJson(res, 200, { models });
+      }
+      if (path === '/api/tags') {
+        return sendJson(res, 200, { models: [{ name: 'llama3.2:latest' }, { name: 'gemma:latest' }] });
+      }
+
+      sendJson(res, 404, { error: { code: 404, message: `Unknown route ${req.method} ${path}`, status: 'NOT_FOUND' } });
+    } catch (err) {
+      if (!res.headersSent) {
+        sendJson(res, 400, { error: { code: 400, message: String(err && err.message), status: 'INVALID_ARGUMENT' } });
+      } else {
+        res.end();
+      }
+    }
+  };
+
+  const server = tls ? https.createServer(tls, handler) : http.createServer(handler);
+  server.on(tls ? 'secureConnection' : 'connection', (socket) => {
+    state.stats.connections++;
+    socket.once('close', () => { state.stats.socketsClosed++; });
+  });
+  return server;
+}
+
+function loadProfile(args) {
+  if (args.profileFile) {
+    return { name: args.profileFile, profile: JSON.parse(fs.readFileSync(args.profileFile, 'utf8')) };
+  }
+  const profile = PROFILES[args.profile];
+  if (!profile) {
+    throw new Error(`Unknown profile "${args.profile}". Available: ${Object.keys(PROFILES).join(', ')}`);
+  }
+  return { name: args.profile, profile };
+}
+
+if (require.main === module) {
+  const args = parseArgs(process.argv.slice(2));
+  const { name, profile } = loadProfile(args);
+  const state = new MockState(profile, args.seed);
+  state.profileName = name;
+
+  const tls = args.tlsCert && args.tlsKey
+    ? { cert: fs.readFileSync(args.tlsCert), key: fs.readFileSync(args.tlsKey) }
+    : null;
+  const scheme = tls ? 'https' : 'http';
+
+  createServer(state, tls).listen(args.port, '127.0.0.1', () => {
+    console.log(`[MockLLM] Listening on ${scheme}://127.0.0.1:${args.port} (profile: ${name}, seed: ${args.seed})`);
+    console.log(`[MockLLM] GEMINI_BASE_URL=${scheme}://127.0.0.1:${args.port}  OLLAMA_URL=${scheme}://127.0.0.1:${args.port}`);
+  });
+}
+
+module.exports = { createServer, MockState, PROFILES };
@@ -0,0 +1,210 @@
+#!/usr/bin/env node
+// scripts/ollama-bench.js
+// Sweeps Ollama request options (num_ctx, num_thread, num_predict) against a local model
+// Reports reload cost, TTFT, prompt-eval and generation speed per combination
+//
+// Usage:
+//   node scripts/ollama-bench.js [--url http://localhost:11434] [--model llama3.2] [--runs 3]
+//                                [--ctx 2048,4096,8192] [--threads 2,4,8] [--predict 128,256,512]
+//                                [--prompt-tokens 1500] [--json results.json]
+//
+// Run it with the app closed (or at least idle): anything else on the CPU skews the numbers.
+// Works against scripts/mock-llm-server.js too, for checking the harness itself.
+
+const http = require('http');
+const https = require('https');
+const os = require('os');
+const fs = require('fs');
+const { URL } = require('url');
+
+// ==========================================
+// ARGUMENTS
+// ==========================================
+function defaultThreads() {
+  const logical = os.availableParallelism ? os.availableParallelism() : os.cpus().length;
+  const physical = logical >= 4 ? Math.floor(logical / 2) : logical;
+  return [...new Set([Math.max(1, Math.floor(physical / 2)), Math.max(1, physical - 1), physical, logical])];
+}
+
+function parseList(value) {
+  return value.split(',').map(Number).filter((n) => n > 0);
+}
+
+function parseArgs(argv) {
+  const args = {
+    url: process.env.OLLAMA_URL || 'http://localhost:11434',
+    model: process.env.OLLAMA_MODEL || 'llama3.2',
+    runs: 3,
+    ctx: [2048, 4096, 8192],
+    threads: defaultThreads(),
+    predict: [128, 256, 512],
+    promptTokens: 1500,
+    json: null,
+  };
+  for (let i = 0; i < argv.length; i++) {
+    const next = argv[i + 1];
+    switch (argv[i]) {
+      case '--url': args.url = next; i++; break;
+      case '--model': args.model = next; i++; break;
+      case '--runs': args.runs = Number(next); i++; break;
+      case '--ctx': args.ctx = parseList(next); i++; break;
+      case '--threads': args.threads = parseList(next); i++; break;
+      case '--predict': args.predict = parseList(next); i++; break;
+      case '--prompt-tokens': args.promptTokens = Number(next); i++; break;
+      case '--json': args.json = next; i++; break;
+      case '--help':
+        console.log('Usage: ollama-bench.js [--url URL] [--model NAME] [--runs N] [--ctx a,b] [--threads a,b] [--predict a,b] [--prompt-tokens N] [--json file]');
+        process.exit(0);
+    }
+  }
+  return args;
+}
+
+// ==========================================
+// PROMPT
+// ==========================================
+// A meeting-transcript-shaped prompt of roughly `tokens` tokens (~4 chars per token)
+const LINES = [
+  '[INTERVIEWER]: Can you walk me through how you would design a rate limiter for a public API?',
+  '[ME]: Sure, I would start with a token bucket per API key, stored in Redis so every node sees the same counts.',
+  '[INTERVIEWER]: How would you handle bursts from a single client without hurting everyone else?',
+  '[ME]: The bucket size absorbs short bursts, and the refill rate caps the sustained throughput per key.',
+  '[INTERVIEWER]: What happens when Redis is unavailable?',
+  '[ME]: I would fail open with a local in-memory limiter so we degrade gracefully instead of rejecting traffic.',
+];
+
+function buildPrompt(tokens) {
+  const lines = [];
+  let chars = 0;
+  for (let i = 0; chars < tokens * 4; i++) {
+    const line = LINES[i % LINES.length];
+    lines.push(line);
+    chars += line.length + 1;
+  }
+  return `CONTEXT:\n${lines.join('\n')}\n\nUSER QUESTION:\nWhat should I say next?`;
+}
+
+// ==========================================
+// REQUEST
+// ==========================================
+function streamGenerate(baseUrl, body) {
+  const url = new URL('/api/generate', baseUrl);
+  const client = url.protocol === 'https:' ? https : http;
+  const payload = JSON.stringify({ ...body, stream: true });
+
+  return new Promise((resolve, reject) => {
+    const startedAt = process.hrtime.bigint();
+    let ttftMs = null;
+    let final = null;
+    let pending = '';
+
+    const req = client.request(url, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', 'Content-Length': Buffer.byteLength(payload) },
+    }, (res) => {
+      if (res.statusCode < 200 || res.statusCode >= 300) {
+        res.resume();
+        return reject(new Error(`Ollama API error: ${res.statusCode}`));
+      }
+      res.setEncoding('utf8');
+      res.on('data', (chunk) => {
+        pending += chunk;
+        let newline;
+        while ((newline = pending.indexOf('\n')) !== -1) {
+          const line = pending.slice(0, newline).trim();
+          pending = pending.slice(newline + 1);
+          if (!line) continue;
+          const data = JSON.parse(line);
+          if (data.error) return reject(new Error(data.error));
+          if (ttftMs === null && data.response) ttftMs = Number(process.hrtime.bigint() - startedAt) / 1e6;
+          if (data.done) final = data;
+        }
+      });
+      res.on('end', () => {
+        if (pending.trim()) final = JSON.parse(pending);
+        resolve({ ttftMs, wallMs: Number(process.hrtime.bigint() - startedAt) / 1e6, final });
+      });
+    });
+    req.on('error', reject);
+    req.end(payload);
+  });
+}
+
+// ==========================================
+// SWEEP
+// ==========================================
+const ms = (ns) => (ns ? ns / 1e6 : 0);
+const rate = (count, ns) => (count && ns ? count / (ns / 1e9) : 0);
+
+function median(values) {
+  const sorted = values.filter((v) => v !== null && !Number.isNaN(v)).sort((a, b) => a - b);
+  if (sorted.length === 0) return null;
+  const mid = Math.floor(sorted.length / 2);
+  return sorted.length % 2 ? sorted[mid] : (sorted[mid - 1] + sorted[mid]) / 2;
+}
+
+async function runCombination(args, prompt, options) {
+  const body = { model: args.model, prompt, keep_alive: '10m', options };
+
+  // First request with new options pays the (re)load; report it separately
+  const warmup = await streamGenerate(args.url, body);
+  const samples = [];
+  for (let i = 0; i < args.runs; i++) {
+    // Vary the tail so the measured runs don't just hit the KV cache
+    samples.push(await streamGenerate(args.url, { ...body, prompt: `${prompt}\n(run ${i})` }));
+  }
+
+  return {
+    ...options,
+    loadMs: Math.round(ms(warmup.final && warmup.final.load_duration)),
+    ttftMs: Math.round(median(samples.map((s) => s.ttftMs))),
+    promptEvalTokPerSec: Math.round(median(samples.map((s) => rate(s.final && s.final.prompt_eval_count, s.final && s.final.prompt_eval_duration)))),
+    evalTokPerSec: Math.round(median(samples.map((s) => rate(s.final && s.final.eval_count, s.final && s.final.eval_duration))) * 10) / 10,
+    wallMs: Math.round(median(samples.map((s) => s.wallMs))),
+  };
+}
+
+async function main() {
+  const args = parseArgs(process.argv.slice(2));
+  const prompt = buildPrompt(args.promptTokens);
+
+  console.log(`[ollama-bench] ${args.model} at ${args.url}, ~${args.promptTokens} prompt tokens, ${args.runs} runs per combination`);
+  console.log(`[ollama-bench] num_ctx ${args.ctx.join('/')}  num_thread ${args.threads.join('/')}  num_predict ${args.predict.join('/')}`);
+
+  const results = [];
+  for (const numCtx of args.ctx) {
+    if (numCtx < args.promptTokens) {
+      console.log(`[ollama-bench] Skipping num_ctx ${numCtx}: smaller than the prompt`);
+      continue;
+    }
+    for (const numThread of args.threads) {
+      for (const numPredict of args.predict) {
+        const options = { temperature: 0.7, top_p: 0.9, num_ctx: numCtx, num_thread: numThread, num_predict: numPredict };
+        try {
+          const result = await runCombination(args, prompt, options);
+          results.push(result);
+          console.log(`  ctx ${numCtx} thr ${numThread} pred ${numPredict}: load ${result.loadMs}ms, ttft ${result.ttftMs}ms, ` +
+            `prompt ${result.promptEvalTokPerSec} tok/s, gen ${result.evalTokPerSec} tok/s, total ${result.wallMs}ms`);
+        } catch (err) {
+          console.error(`  ctx ${numCtx} thr ${numThread} pred ${numPredict}: failed - ${err.message}`);
+        }
+      }
+    }
+  }
+
+  if (results.length > 0) {
+    const fastest = results.reduce((best, r) => (r.wallMs < best.wallMs ? r : best));
+    console.log(`[ollama-bench] Fastest: num_ctx ${fastest.num_ctx}, num_thread ${fastest.num_thread}, num_predict ${fastest.num_predict} (${fastest.wallMs}ms)`);
+    console.log('[ollama-bench] Apply with OLLAMA_MIN_CTX / OLLAMA_NUM_THREAD; num_predict comes from OUTPUT_TOKEN_BUDGETS');
+  }
+
+  if (args.json) {
+    fs.writeFileSync(args.json, JSON.stringify({ model: args.model, url: args.url, promptTokens: args.promptTokens, results }, null, 2));
+    console.log(`[ollama-bench] Wrote ${args.json}`);
+  }
+}
+
+main().catch((err) => {
+  console.error('[ollama-bench] Failed:', err.message);
+  process.exit(1);
+});
@@ -273,6 +273,7 @@ const Debug: React.FC<DebugProps> = ({ isProcessing, setIsProcessing }) => {
       old_code: string
       new_code: string
       thoughts: string[]
+      reasoning?: string
       time_complexity: string
       space_complexity: string
     } | null
@@ -281,10 +282,9 @@ const Debug: React.FC<DebugProps> = ({ isProcessing, setIsProcessing }) => {
     if (newSolution) {
       setOldCode(newSolution.old_code || null)
       setNewCode(newSolution.new_code || null)
-      setThoughtsData(newSolution.thoughts || null)
+      setThoughtsData(newSolution.thoughts || (newSolution.reasoning ? [newSolution.reasoning] : null))
       setTimeComplexityData(newSolution.time_complexity || null)
       setSpaceComplexityData(newSolution.space_complexity || null)
-      setIsProcessing(false)
     }
 
     // Set up event listeners
@@ -297,6 +297,17 @@ const Debug: React.FC<DebugProps> = ({ isProcessing, setIsProcessing }) => {
       window.electronAPI.onDebugStart(() => {
         setIsProcessing(true)
       }),
+      //fill the view in as the debug answer streams
+      window.electronAPI.onDebugPartial(({ fields, appends = {} }) => {
+        if ("old_code" in fields) setOldCode(fields.old_code || null)
+        if ("new_code" in fields || "code" in fields) setNewCode(fields.new_code ?? fields.code ?? null)
+        if ("code" in appends) setNewCode(previous => (previous ?? "") + appends.code)
+        if ("thoughts" in fields) setThoughtsData(fields.thoughts || null)
+        else if ("reasoning" in fields) setThoughtsData(fields.reasoning ? [fields.reasoning] : null)
+        if ("reasoning" in appends) setThoughtsData(previous => [(previous?.[0] ?? "") + appends.reasoning])
+        if ("time_complexity" in fields) setTimeComplexityData(fields.time_complexity || null)
+        if ("space_complexity" in fields) setSpaceComplexityData(fields.space_complexity || null)
+      }),
       window.electronAPI.onDebugError((error: string) => {
         showToast(
           "Processing Failed",
@@ -136,6 +136,7 @@ const Solutions: React.FC<SolutionsProps> = ({ setView }) => {
   const [audioResult, setAudioResult] = useState<AudioResult | null>(null)
 
   const [debugProcessing, setDebugProcessing] = useState(false)
+  const [debugStreaming, setDebugStreaming] = useState(false)
   const [problemStatementData, setProblemStatementData] =
     useState<ProblemStatementData | null>(null)
   const [solutionData, setSolutionData] = useState<string | null>(null)
@@ -237,6 +238,7 @@ const Solutions: React.FC<SolutionsProps> = ({ setView }) => {
         // Clear the queries
         queryClient.removeQueries(["solution"])
         queryClient.removeQueries(["new_solution"])
+        setDebugStreaming(false)
 
         // Reset other states
         refetch()
@@ -300,7 +302,7 @@ const Solutions: React.FC<SolutionsProps> = ({ setView }) => {
 
         const solutionData = {
           code: data.solution.code,
-          thoughts: data.solution.thoughts,
+          thoughts: data.solution.thoughts ?? (data.solution.reasoning ? [data.solution.reasoning] : undefined),
           time_complexity: data.solution.time_complexity,
           space_complexity: data.solution.space_complexity
         }
@@ -311,6 +313,16 @@ const Solutions: React.FC<SolutionsProps> = ({ setView }) => {
         setTimeComplexityData(solutionData.time_complexity || null)
         setSpaceComplexityData(solutionData.space_complexity || null)
       }),
+      //fields of the solution JSON as they stream in, so the view fills in before the whole answer is back
+      window.electronAPI.onSolutionPartial(({ fields, appends = {} }) => {
+        if ("code" in fields) setSolutionData(fields.code || null)
+        if ("code" in appends) setSolutionData(previous => (previous ?? "") + appends.code)
+        if ("thoughts" in fields) setThoughtsData(fields.thoughts || null)
+        else if ("reasoning" in fields) setThoughtsData(fields.reasoning ? [fields.reasoning] : null)
+        if ("reasoning" in appends) setThoughtsData(previous => [(previous?.[0] ?? "") + appends.reasoning])
+        if ("time_complexity" in fields) setTimeComplexityData(fields.time_complexity || null)
+        if ("space_complexity" in fields) setSpaceComplexityData(fields.space_complexity || null)
+      }),
 
       //########################################################
       //DEBUG EVENTS
@@ -323,9 +335,24 @@ const Solutions: React.FC<SolutionsProps> = ({ setView }) => {
       window.electronAPI.onDebugSuccess((data) => {
         console.log({ debug_data: data })
 
-        queryClient.setQueryData(["new_solution"], data.solution)
+        queryClient.setQueryData(["new_solution"], {
+          ...data.solution,
+          new_code: data.solution.new_code ?? data.solution.code
+        })
+        setDebugStreaming(false)
         setDebugProcessing(false)
       }),
+      //the debug answer streams field by field; switch to the debug view on the first one and keep the cache current
+      window.electronAPI.onDebugPartial(({ fields, appends = {} }) => {
+        const previous = queryClient.getQueryData(["new_solution"]) as Record<string, any> | undefined
+        const next: Record<string, any> = { ...previous, ...fields }
+        for (const [field, text] of Object.entries(appends)) {
+          next[field] = (next[field] ?? "") + text
+        }
+        if ("code" in fields || "code" in appends) next.new_code = next.code
+        queryClient.setQueryData(["new_solution"], next)
+        setDebugStreaming(true)
+      }),
       //when there was an error in the initial debugging, we'll show a toast and stop the little generating pulsing thing.
       window.electronAPI.onDebugError(() => {
         showToast(
@@ -333,6 +360,7 @@ const Solutions: React.FC<SolutionsProps> = ({ setView }) => {
           "There was an error debugging your code.",
           "error"
         )
+        setDebugStreaming(false)
         setDebugProcessing(false)
       }),
       window.electronAPI.onProcessingNoScreenshots(() => {
@@ -414,7 +442,7 @@ const Solutions: React.FC<SolutionsProps> = ({ setView }) => {
 
   return (
     <>
-      {!isResetting && queryClient.getQueryData(["new_solution"]) ? (
+      {!isResetting && (debugStreaming || queryClient.getQueryData(["new_solution"])) ? (
         <>
           <Debug
             isProcessing={debugProcessing}
@@ -13,10 +13,12 @@ export interface ElectronAPI {
   onSolutionStart: (callback: () => void) => () => void
   onDebugStart: (callback: () => void) => () => void
   onDebugSuccess: (callback: (data: any) => void) => () => void
+  onDebugPartial: (callback: (data: { fields: Record<string, any>; appends?: Record<string, string> }) => void) => () => void
   onSolutionError: (callback: (error: string) => void) => () => void
   onProcessingNoScreenshots: (callback: () => void) => () => void
   onProblemExtracted: (callback: (data: any) => void) => () => void
   onSolutionSuccess: (callback: (data: any) => void) => () => void
+  onSolutionPartial: (callback: (data: { fields: Record<string, any>; appends?: Record<string, string> }) => void) => () => void
   onUnauthorized: (callback: () => void) => () => void
   onDebugError: (callback: (error: string) => void) => () => void
   takeScreenshot: () => Promise<void>
@@ -33,11 +35,24 @@ export interface ElectronAPI {
   onSettingsVisibilityChange: (callback: (isVisible: boolean) => void) => () => void
 
   // LLM Model Management
-  getCurrentLlmConfig: () => Promise<{ provider: "ollama" | "gemini"; model: string; isOllama: boolean }>
+  getCurrentLlmConfig: () => Promise<{ provider: "ollama" | "gemini"; model: string; isOllama: boolean; residency?: { model: string; state: "warm" | "cold" | "loading"; expiresAt: string | null; lastLoadMs: number | null } | null }>
   getAvailableOllamaModels: () => Promise<string[]>
   switchToOllama: (model?: string, url?: string) => Promise<{ success: boolean; error?: string }>
   switchToGemini: (apiKey?: string, modelId?: string) => Promise<{ success: boolean; error?: string }>
   testLlmConnection: () => Promise<{ success: boolean; error?: string }>
+  getModelRouterState: () => Promise<Array<{
+    model: string
+    state: "closed" | "open" | "half_open"
+    requests: number
+    errorRate: number
+    p50LatencyMs: number | null
+    p95LatencyMs: number | null
+    consecutiveFailures: number
+    trips: number
+    lastError: string | null
+    retryAt: number | null
+  }>>
+  resetModelRouter: () => Promise<{ success: boolean; error?: string }>
 
   // Native Audio Service Events
   onNativeAudioTranscript: (callback: (transcript: { speaker: string; text: string; final: boolean }) => void) => () => void